@@ -81,6 +81,31 @@ class Runner:
             print(f"Error running tests: {e}")
             sys.exit(1)
 
+    def bench_routes(self):
+        """Benchmark interceptor route classification."""
+        subprocess.run([sys.executable, "src/scripts/benchmark_routes.py"])
+
+    def bench_queue(self):
+        """Benchmark Redis publish latency."""
+        subprocess.run([sys.executable, "src/scripts/benchmark_queue.py"])
+
+    def bench_trailing(self):
+        """Benchmark the trailing stop cycle."""
+        subprocess.run([sys.executable, "src/scripts/benchmark_trailing.py"])
+
+    def replay(self, args):
+        """Replay a captured session through the pipeline on a simulated MT5."""
+        subprocess.run([sys.executable, "src/scripts/replay_flows.py", *args])
+
+    def load_test(self, args):
+        """Ramp synthetic TradingView traffic through the pipeline on a simulated MT5."""
+        subprocess.run([sys.executable, "src/scripts/load_test.py", *args])
+
+    def bench(self, args):
+        """Run the pytest-benchmark suite, saving the results for later comparison."""
+        subprocess.run([sys.executable, "-m", "pytest", "tests/benchmarks", "--benchmark-only",
+                        "--benchmark-autosave", *args])
+
     def clean_redis(self):
         """Clean Redis data."""
         subprocess.run(["python", "src/scripts/clean_redis.py"])
@@ -101,6 +126,12 @@ class Runner:
             "test-tv": "Test TradingView service",
             "test-all": "Run all infrastructure tests",
             "clean-redis": "Clean Redis data",
+            "bench-routes": "Benchmark interceptor route classification",
+            "bench-queue": "Benchmark Redis publish latency (needs local Redis)",
+            "bench-trailing": "Benchmark the trailing stop cycle (500 positions, 30 symbols)",
+            "replay": "Replay a mitmproxy dump or .jsonl capture (needs Redis and Postgres)",
+            "load-test": "Find the sustained orders/s with synthetic traffic (needs Redis and Postgres)",
+            "bench": "Run the benchmark suite (sqlite, fakeredis, simulated MT5)",
             "help": "Show this help message"
         }
         for cmd, desc in commands.items():
@@ -131,6 +162,12 @@ def main():
         'test-tv': runner.test_tv,
         'test-all': runner.test_all,
         'clean-redis': runner.clean_redis,
+        'bench-routes': runner.bench_routes,
+        'bench-queue': runner.bench_queue,
+        'bench-trailing': runner.bench_trailing,
+        'replay': lambda: runner.replay(args.args),
+        'load-test': lambda: runner.load_test(args.args),
+        'bench': lambda: runner.bench(args.args),
         'help': runner.show_help
     }
 
@@ -0,0 +1,15 @@
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+env_path = Path(__file__).parent.parent.parent / '.env'
+load_dotenv(env_path)
+
+# Prometheus text endpoints (GET /metrics); a port of 0 turns that process's endpoint off
+METRICS_CONFIG = {
+    'host': os.getenv('METRICS_HOST', '127.0.0.1'),
+    'proxy_port': int(os.getenv('METRICS_PROXY_PORT', '9101')),
+    'worker_port': int(os.getenv('METRICS_WORKER_PORT', '9102')),
+}
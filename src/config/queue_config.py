@@ -0,0 +1,40 @@
+import os
+import socket
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+env_path = Path(__file__).parent.parent.parent / '.env'
+load_dotenv(env_path)
+
+# Trade transport between proxy and worker:
+#   'pubsub'  - fire-and-forget PUBLISH on trades:channel (default)
+#   'streams' - durable Redis Stream read through a consumer group
+QUEUE_CONFIG = {
+    'host': os.getenv('REDIS_HOST', 'localhost'),
+    'port': int(os.getenv('REDIS_PORT', '6379')),
+    'transport': os.getenv('REDIS_TRANSPORT', 'pubsub').strip().lower(),
+
+    # Prepended to every channel, stream and hash name; lets test harnesses share a Redis safely
+    'key_prefix': os.getenv('REDIS_KEY_PREFIX', ''),
+
+    # Streams settings
+    'stream': os.getenv('REDIS_TRADE_STREAM', 'trades:stream'),
+    'dead_letter_stream': os.getenv('REDIS_DEAD_LETTER_STREAM', 'trades:dead'),
+    'group': os.getenv('REDIS_CONSUMER_GROUP', 'mt5-workers'),
+    # Stable per host so a restarted worker picks up its own unacked entries
+    'consumer': os.getenv('REDIS_CONSUMER_NAME', f"mt5-worker-{socket.gethostname()}"),
+    'batch_size': int(os.getenv('REDIS_STREAM_BATCH_SIZE', '50')),
+    'block_ms': int(os.getenv('REDIS_STREAM_BLOCK_MS', '1000')),
+    'claim_idle_ms': int(os.getenv('REDIS_STREAM_CLAIM_IDLE_MS', '30000')),
+    'max_deliveries': int(os.getenv('REDIS_STREAM_MAX_DELIVERIES', '5')),
+    'maxlen': int(os.getenv('REDIS_STREAM_MAXLEN', '100000')),
+
+    # Open positions published by the worker: hash of MT5 ticket -> {volume, side, symbol}
+    'position_state_key': os.getenv('REDIS_POSITION_STATE_KEY', 'positions:state'),
+
+    # Worker-side dispatch of received messages
+    'dispatch_concurrency': int(os.getenv('QUEUE_DISPATCH_CONCURRENCY', '8')),
+    'dispatch_queue_size': int(os.getenv('QUEUE_DISPATCH_QUEUE_SIZE', '1000')),
+}
@@ -0,0 +1,42 @@
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+env_path = Path(__file__).parent.parent.parent / '.env'
+load_dotenv(env_path)
+
+
+def _parse_failures(value: str) -> dict:
+    """'10004=0.02,10024=0.01' -> {10004: 0.02, 10024: 0.01}"""
+    failures = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        retcode, _, rate = item.partition('=')
+        failures[int(retcode)] = float(rate or 1.0)
+    return failures
+
+
+# MT5 backend: 'terminal' (MetaTrader5 package, Windows) or 'simulator' (in-process, any OS)
+MT5_BACKEND = os.getenv('MT5_BACKEND', 'terminal').strip().lower()
+
+SIMULATOR_CONFIG = {
+    'enabled': MT5_BACKEND == 'simulator',
+    'seed': int(os.getenv('MT5_SIM_SEED', '7')),
+
+    # Simulated IPC round trip per call, and extra time for order_send to reach the server
+    'latency_ms': float(os.getenv('MT5_SIM_LATENCY_MS', '0.5')),
+    'jitter_ms': float(os.getenv('MT5_SIM_JITTER_MS', '0.2')),
+    'order_latency_ms': float(os.getenv('MT5_SIM_ORDER_LATENCY_MS', '20')),
+
+    # Adverse slippage on fills (0..N points) and random-walk step per tick request
+    'slippage_points': int(os.getenv('MT5_SIM_SLIPPAGE_POINTS', '2')),
+    'volatility_points': int(os.getenv('MT5_SIM_VOLATILITY_POINTS', '3')),
+    'spread_points': int(os.getenv('MT5_SIM_SPREAD_POINTS', '10')),
+
+    # Injected order_send failures: retcode=probability pairs
+    'failures': _parse_failures(os.getenv('MT5_SIM_FAILURES', '')),
+
+    # Optional JSONL of {"symbol", "bid", "ask"} ticks replayed before the random walk
+    'ticks_file': os.getenv('MT5_SIM_TICKS_FILE') or None,
+}
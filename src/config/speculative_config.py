@@ -0,0 +1,18 @@
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+env_path = Path(__file__).parent.parent.parent / '.env'
+load_dotenv(env_path)
+
+# Speculative mode: market orders are copied to MT5 as soon as TradingView
+# accepts them, then confirmed by the matching execution or reversed with a
+# close if no execution arrives within the timeout. Off unless opted in.
+SPECULATIVE_CONFIG = {
+    'enabled': os.getenv('SPECULATIVE_EXECUTION', 'false').strip().lower() in ('1', 'true', 'yes'),
+    'timeout_ms': int(os.getenv('SPECULATIVE_TIMEOUT_MS', '10000')),
+    # A reversed order is remembered this long so a late fill is still copied
+    'late_fill_window_ms': int(os.getenv('SPECULATIVE_LATE_FILL_MS', '60000')),
+}
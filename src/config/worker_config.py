@@ -0,0 +1,27 @@
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+env_path = Path(__file__).parent.parent.parent / '.env'
+load_dotenv(env_path)
+
+WORKER_CONFIG = {
+    # Trades for different positions executed at once; one position is always serial
+    'max_concurrency': int(os.getenv('WORKER_MAX_CONCURRENCY', '8')),
+
+    # positions_get cadence: faster while positions are open, slower when flat
+    'position_poll_active_ms': int(os.getenv('POSITION_POLL_ACTIVE_MS', '500')),
+    'position_poll_idle_ms': int(os.getenv('POSITION_POLL_IDLE_MS', '2000')),
+
+    # Trailing stop evaluation cadence (100 ms minimum)
+    'trailing_cycle_ms': int(os.getenv('TRAILING_CYCLE_MS', '250')),
+
+    # Symbol settings (digits, filling, volume limits...) are reloaded after this
+    'symbol_cache_ttl_minutes': int(os.getenv('SYMBOL_CACHE_TTL_MINUTES', '240')),
+
+    # Terminal health: heartbeat cadence and the cap on jittered reconnect backoff
+    'mt5_heartbeat_ms': int(os.getenv('MT5_HEARTBEAT_MS', '5000')),
+    'mt5_reconnect_max_s': float(os.getenv('MT5_RECONNECT_MAX_S', '30')),
+}
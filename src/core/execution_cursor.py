@@ -0,0 +1,83 @@
+from typing import Any, Dict, List, Optional
+
+# Fills inside this window behind the newest one are re-offered on every
+# poll until consumed, which covers a fill that is polled before its order
+# is registered and fills the broker reports out of order.
+DEFAULT_GRACE_MS = 60_000
+
+
+class _InstrumentCursor:
+    __slots__ = ('last_time', 'consumed')
+
+    def __init__(self):
+        self.last_time: Optional[int] = None
+        self.consumed: Dict[Any, int] = {}  # execution key -> time, inside the grace window
+
+
+class ExecutionCursor:
+    """Remembers how far each instrument's execution history has been read.
+
+    TradingView returns the full fill history on every `/executions` poll.
+    Walking it newest-first, the first entry older than the high-water mark
+    minus the grace window ends the scan, so history covered by earlier
+    polls is skipped without being inspected.
+    """
+
+    def __init__(self, grace_ms: int = DEFAULT_GRACE_MS):
+        self.grace_ms = grace_ms
+        self._cursors: Dict[str, _InstrumentCursor] = {}
+
+    @staticmethod
+    def _execution_key(execution: Dict[str, Any]) -> Any:
+        return execution.get('id') or (execution.get('orderId'), execution.get('time'))
+
+    @staticmethod
+    def _newest_first(executions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if len(executions) > 1 and (executions[0].get('time') or 0) < (executions[-1].get('time') or 0):
+            return executions[::-1]
+        return executions
+
+    def new_executions(self, instrument: str, executions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return executions not yet consumed and not behind the cursor, oldest first."""
+        cursor = self._cursors.get(instrument)
+        if cursor is None:
+            cursor = self._cursors[instrument] = _InstrumentCursor()
+
+        floor = cursor.last_time - self.grace_ms if cursor.last_time is not None else None
+        newest = cursor.last_time
+        fresh = []
+        for execution in self._newest_first(executions):
+            exec_time = execution.get('time')
+            if exec_time is not None:
+                if floor is not None and exec_time < floor:
+                    break  # everything past this point was covered by earlier polls
+                if newest is None or exec_time > newest:
+                    newest = exec_time
+
+            if self._execution_key(execution) not in cursor.consumed:
+                fresh.append(execution)
+
+        if newest is not None and newest != cursor.last_time:
+            cursor.last_time = newest
+            floor = newest - self.grace_ms
+            cursor.consumed = {key: t for key, t in cursor.consumed.items() if t >= floor}
+
+        fresh.reverse()
+        return fresh
+
+    def consume(self, instrument: str, execution: Dict[str, Any]) -> None:
+        """Mark an execution as handled so later polls no longer return it."""
+        cursor = self._cursors.get(instrument)
+        if cursor is None:
+            cursor = self._cursors[instrument] = _InstrumentCursor()
+        exec_time = execution.get('time')
+        if exec_time is None:
+            exec_time = cursor.last_time or 0
+        cursor.consumed[self._execution_key(execution)] = exec_time
+
+    def reset(self, instrument: Optional[str] = None) -> None:
+        """Forget the cursor for one instrument, or all of them."""
+        if instrument is None:
+            self._cursors.clear()
+        else:
+            self._cursors.pop(instrument, None)
@@ -9,7 +9,10 @@ from dotenv import load_dotenv
 
 from backup.instrument_sync import InstrumentSynchronizer
 from mitmproxy import http
+from src.core.routes import RouteClassifier, RouteType
 from src.core.trade_handler import TradeHandler
+from src.utils import json_codec
+from src.utils.tracing import TraceContext
 from src.utils.token_manager import GLOBAL_TOKEN_MANAGER, TokenManager
 
 project_root = str(Path(__file__).parent.parent.parent)
@@ -19,6 +22,13 @@ load_dotenv()
 TV_BROKER_URL = os.getenv('TV_BROKER_URL')
 TV_ACCOUNT_ID = os.getenv('TV_ACCOUNT_ID')
 
+# Routes whose response body is consumed; closes and TP/SL deletes are handled on request
+RESPONSE_ROUTES = frozenset({
+    RouteType.ORDER_PLACE,
+    RouteType.EXECUTION_POLL,
+    RouteType.POSITION_MODIFY
+})
+
 # Create a global token manager instance
 GLOBAL_TOKEN_MANAGER = TokenManager()
 
@@ -28,18 +38,21 @@ class TradingViewInterceptor:
     _instance = None
     _initialized = False
 
-    def __new__(cls):
+    def __new__(cls, *args, **kwargs):
         if cls._instance is None:
             cls._instance = super(TradingViewInterceptor, cls).__new__(cls)
         return cls._instance
 
 
-    def __init__(self):
+    def __init__(self, sync_instruments: bool = True, trade_handler: TradeHandler = None):
         if not self._initialized:  # Only initialize once
             self.base_path = f"{TV_BROKER_URL}/accounts/{TV_ACCOUNT_ID}"
-            self.trade_handler = TradeHandler()
+            self.route_classifier = RouteClassifier(self.base_path)
+            self.trade_handler = trade_handler or TradeHandler()
             self.token_manager = GLOBAL_TOKEN_MANAGER
-            self._sync_instruments_sync()
+            # Replays skip this so they never call TradingView or rewrite instruments.json
+            if sync_instruments:
+                self._sync_instruments_sync()
 
             broker_url = os.getenv('TV_BROKER_URL', 'Unknown Broker')
             account_id = os.getenv('TV_ACCOUNT_ID', 'Unknown Account')
@@ -135,26 +148,11 @@ class TradingViewInterceptor:
 
     def should_log_request(self, flow: http.HTTPFlow) -> bool:
         """Strictly check if we should log this request."""
-        url = flow.request.pretty_url
-        
-        if self.base_path not in url:
-            return False
-        
-        # Match orders, executions, position closures, and position updates
-        if '/orders?locale=' in url and 'requestId=' in url:
-            return True
-        if '/executions?locale=' in url and 'instrument=' in url:
-            return True
-        if '/positions/' in url:
-            return flow.request.method in ["DELETE", "PUT"]
-        if '.TP.' in url or '.SL.' in url:
-            return flow.request.method == "DELETE"   
-            
-        return False
+        return self.route_classifier.classify(flow).is_tracked
 
-    async def async_process_order(self, request_data: dict, response_data: dict) -> None:
+    async def async_process_order(self, request_data: dict, response_data: dict, trace: TraceContext = None) -> None:
         """Asynchronously process order."""
-        await self.trade_handler.process_order(request_data, response_data)
+        await self.trade_handler.process_order(request_data, response_data, trace)
 
     async def async_process_position_update(self, position_id: str, update_data: dict) -> None:
         """Asynchronously process position update."""
@@ -164,9 +162,9 @@ class TradingViewInterceptor:
         """Asynchronously process position close."""
         await self.trade_handler.process_position_close(position_id, close_data)
 
-    async def async_process_execution(self, response_data: dict) -> None:
+    async def async_process_execution(self, response_data: dict, instrument: str = None) -> None:
         """Asynchronously process execution."""
-        await self.trade_handler.process_execution(response_data)
+        await self.trade_handler.process_execution(response_data, instrument)
 
     async def async_process_tpsl_delete(self, order_id: str, order_type: str) -> None:
         """Process TP/SL deletion request."""
@@ -174,85 +172,79 @@ class TradingViewInterceptor:
 
     def request(self, flow: http.HTTPFlow) -> None:
         """Handle requests."""
-        if self.base_path in flow.request.pretty_url:
+        route = self.route_classifier.classify(flow)
+        if route.type is RouteType.ORDER_PLACE and flow.request.method == "POST":
+            # Latency trace for this order; carried to the worker and stored with the trade
+            flow.metadata['trace'] = TraceContext.start()
+        if route.on_account:
             auth_header = flow.request.headers.get('authorization')
             if auth_header:
                 self.token_manager.update_token(auth_header)
         
-        if not self.should_log_request(flow):
-            return
-        
-        if flow.request.method == "DELETE":
-            url = flow.request.pretty_url
-        
-            # Handle TP/SL deletion
-            if '.TP.' in url or '.SL.' in url:
-                # Extract order ID from the URL
-                # Format: orders/orderId.TP|SL.timestamp
-                parts = url.split('/')[-1].split('.')
-                order_id = parts[0]  # This is what we need
-                level_type = parts[1]  # 'TP' or 'SL'
-                
-                print(f"\n💱 Processing {level_type} deletion for OrderID#: {order_id}")
-                asyncio.create_task(
-                    self.async_process_tpsl_delete(order_id, level_type)
-                )
-            else:
-                # Only process position close for non-TP/SL deletions
-                url_parts = flow.request.pretty_url.split('/')
-                position_id = url_parts[-1].split('?')[0]
-                
-                # Get close data if exists
-                close_data = {}
-                if flow.request.urlencoded_form:
-                    close_data = dict(flow.request.urlencoded_form)
-                
-                # Create and run the coroutine in the event loop
-                asyncio.create_task(
-                    self.async_process_position_close(position_id, close_data)
-                )
+        # Handle TP/SL deletion
+        if route.type is RouteType.TPSL_DELETE:
+            print(f"\n💱 Processing {route.level_type} deletion for OrderID#: {route.order_id}")
+            asyncio.create_task(
+                self.async_process_tpsl_delete(route.order_id, route.level_type)
+            )
+        elif route.type is RouteType.POSITION_CLOSE:
+            # Get close data if exists
+            close_data = {}
+            if flow.request.urlencoded_form:
+                close_data = dict(flow.request.urlencoded_form)
+            
+            # Create and run the coroutine in the event loop
+            asyncio.create_task(
+                self.async_process_position_close(route.position_id, close_data)
+            )
 
     def response(self, flow: http.HTTPFlow) -> None:
         """Handle responses."""
-        if not self.should_log_request(flow):
+        route = self.route_classifier.classify(flow)
+        if route.type not in RESPONSE_ROUTES:
             return
             
         if flow.response and flow.response.content:
             try:
-                response_data = json.loads(flow.response.content.decode('utf-8'))
-                
-                if '/positions/' in flow.request.pretty_url:
-                    if flow.request.method == "PUT":
-                        # Extract position ID from URL
-                        url_parts = flow.request.pretty_url.split('/')
-                        position_id = url_parts[-1].split('?')[0]
-                        
-                        # Get update data and merge with response
-                        update_data = dict(flow.request.urlencoded_form)
-                        
-                        if 's' in response_data and response_data['s'] == 'error':
-                            update_data.update(response_data)
-                        
+                if route.type is RouteType.EXECUTION_POLL:
+                    # Only decode fills for orders we are waiting on
+                    response_data = json_codec.decode_executions(
+                        flow.response.content,
+                        self.trade_handler.pending_orders
+                    )
+                    if response_data.get('d'):
                         asyncio.create_task(
-                            self.async_process_position_update(
-                                position_id, 
-                                update_data
-                            )
+                            self.async_process_execution(response_data, route.instrument)
                         )
+                    return
 
-                elif '/orders?' in flow.request.pretty_url and flow.request.method == "POST":
+                response_data = json_codec.loads(flow.response.content)
+                
+                if route.type is RouteType.POSITION_MODIFY:
+                    # Get update data and merge with response
+                    update_data = dict(flow.request.urlencoded_form)
+                    
+                    if 's' in response_data and response_data['s'] == 'error':
+                        update_data.update(response_data)
+                    
                     asyncio.create_task(
-                        self.async_process_order(
-                            dict(flow.request.urlencoded_form), 
-                            response_data
+                        self.async_process_position_update(
+                            route.position_id, 
+                            update_data
                         )
                     )
-                elif '/executions?' in flow.request.pretty_url:
+
+                elif route.type is RouteType.ORDER_PLACE and flow.request.method == "POST":
+                    trace = flow.metadata.get('trace')
+                    if trace is not None:
+                        trace.mark('order_response')
                     asyncio.create_task(
-                        self.async_process_execution(response_data)
+                        self.async_process_order(
+                            dict(flow.request.urlencoded_form), 
+                            response_data,
+                            trace
+                        )
                     )
                     
             except Exception as e:
                 print(f"❌ Error processing response: {e}")
-
-addons = [TradingViewInterceptor()]
\ No newline at end of file
@@ -0,0 +1,48 @@
+from typing import Optional
+
+from src.utils.tracing import TraceContext
+
+
+class OrderContext:
+    """What process_execution needs to publish a fill, captured at order time.
+
+    Kept in TradeHandler.pending_orders so the execution path never has to
+    read the order back from Postgres.
+    """
+
+    __slots__ = (
+        'trade_id',
+        'order_id',
+        'instrument',
+        'side',
+        'qty',
+        'type',
+        'take_profit',
+        'stop_loss',
+        'intercepted_at',
+        'speculative',
+        'reversal_timer',
+        'reversed',
+        'trace'
+    )
+
+    def __init__(self, trade_id: str, order_id: str, instrument: str, side: str, qty: str,
+                 type: str, take_profit: Optional[float] = None, stop_loss: Optional[float] = None,
+                 intercepted_at: Optional[float] = None, speculative: bool = False,
+                 trace: Optional[TraceContext] = None):
+        self.trade_id = trade_id
+        self.order_id = order_id
+        self.instrument = instrument
+        self.side = side
+        self.qty = qty
+        self.type = type
+        self.take_profit = take_profit
+        self.stop_loss = stop_loss
+        self.intercepted_at = intercepted_at  # perf_counter() when the order was intercepted
+        self.speculative = speculative  # already copied to MT5 as a provisional position
+        self.reversal_timer = None  # asyncio.TimerHandle that reverses the copy if no fill arrives
+        self.reversed = False
+        self.trace = trace  # TraceContext started when the order was intercepted
+
+    def __repr__(self):
+        return f"<OrderContext(trade_id='{self.trade_id}', instrument='{self.instrument}', side='{self.side}', qty='{self.qty}')>"
@@ -0,0 +1,127 @@
+from enum import Enum
+from typing import NamedTuple, Optional
+from urllib.parse import unquote_plus
+
+
+class RouteType(Enum):
+    """Kinds of TradingView broker requests the interceptor acts on."""
+    IGNORE = 'ignore'
+    ORDER_PLACE = 'order_place'
+    EXECUTION_POLL = 'execution_poll'
+    POSITION_CLOSE = 'position_close'
+    POSITION_MODIFY = 'position_modify'
+    TPSL_DELETE = 'tpsl_delete'
+
+
+class Route(NamedTuple):
+    """Result of classifying a single flow."""
+    type: RouteType
+    on_account: bool = False           # URL belongs to our broker account
+    position_id: Optional[str] = None  # positions/{id}
+    order_id: Optional[str] = None     # orders/{id}.TP|SL.{timestamp}
+    level_type: Optional[str] = None   # 'TP' or 'SL'
+    instrument: Optional[str] = None   # executions?instrument=
+
+    @property
+    def is_tracked(self) -> bool:
+        return self.type is not RouteType.IGNORE
+
+
+# Shared instances for the common no-op cases so they cost no allocation
+IGNORED = Route(RouteType.IGNORE)
+ACCOUNT_IGNORED = Route(RouteType.IGNORE, on_account=True)
+
+# Key under which the route is cached in flow.metadata
+ROUTE_METADATA_KEY = 'tv_route'
+
+
+class RouteClassifier:
+    """Parses each flow once into a typed Route.
+
+    Flows for other hosts are rejected on a plain attribute comparison,
+    before mitmproxy has to assemble `pretty_url`. Broker flows are then
+    classified from the request path alone, so chart, websocket and static
+    asset traffic costs one string compare per flow.
+    """
+
+    def __init__(self, base_path: str):
+        self.base_path = base_path
+        # base_path is "<broker host>/accounts/<account id>"
+        host, _, account_path = base_path.partition('/')
+        self.host = host
+        self.account_prefix = f"/{account_path}"
+        self._prefix_len = len(self.account_prefix)
+
+    def classify_path(self, path: str, method: str) -> Route:
+        """Classify a broker-host request path (including its query string)."""
+        if not path.startswith(self.account_prefix):
+            return IGNORED
+
+        # Remainder looks like "/orders?locale=en&requestId=..."
+        path, _, query = path[self._prefix_len:].partition('?')
+        if path and path[0] != '/':
+            return IGNORED  # a different account sharing our id as a prefix
+
+        if path == '/orders':
+            if 'locale=' in query and 'requestId=' in query:
+                return Route(RouteType.ORDER_PLACE, on_account=True)
+            return ACCOUNT_IGNORED
+
+        if path == '/executions':
+            if 'locale=' in query and 'instrument=' in query:
+                return Route(
+                    RouteType.EXECUTION_POLL,
+                    on_account=True,
+                    instrument=self._query_param(query, 'instrument')
+                )
+            return ACCOUNT_IGNORED
+
+        if path.startswith('/positions/'):
+            position_id = path.rsplit('/', 1)[-1]
+            if method == 'DELETE':
+                return Route(RouteType.POSITION_CLOSE, on_account=True, position_id=position_id)
+            if method == 'PUT':
+                return Route(RouteType.POSITION_MODIFY, on_account=True, position_id=position_id)
+            return ACCOUNT_IGNORED
+
+        if method == 'DELETE' and ('.TP.' in path or '.SL.' in path):
+            # Format: orders/orderId.TP|SL.timestamp
+            parts = path.rsplit('/', 1)[-1].split('.')
+            return Route(
+                RouteType.TPSL_DELETE,
+                on_account=True,
+                order_id=parts[0],
+                level_type=parts[1]
+            )
+
+        return ACCOUNT_IGNORED
+
+    def classify_url(self, url: str, method: str) -> Route:
+        """Classify a full URL; used by tooling that has no flow object."""
+        _, _, rest = url.partition('://')
+        host, slash, path = rest.partition('/')
+        if host.split(':', 1)[0] != self.host:
+            return IGNORED
+        return self.classify_path(slash + path, method)
+
+    def classify(self, flow) -> Route:
+        """Classify a flow, reusing the cached route if already parsed."""
+        metadata = flow.metadata
+        route = metadata.get(ROUTE_METADATA_KEY)
+        if route is None:
+            request = flow.request
+            if request.host != self.host:
+                route = IGNORED
+            else:
+                route = self.classify_path(request.path, request.method)
+            metadata[ROUTE_METADATA_KEY] = route
+        return route
+
+    @staticmethod
+    def _query_param(query: str, name: str) -> Optional[str]:
+        key = f"{name}="
+        for pair in query.split('&'):
+            if pair.startswith(key):
+                value = pair[len(key):]
+                return unquote_plus(value) if '%' in value or '+' in value else value
+        return None
@@ -1,12 +1,18 @@
 import asyncio
 import logging
+import time
 from datetime import datetime
-from typing import Any, Dict
-
-import MetaTrader5 as mt5
+from typing import Any, Dict, Optional
 
+from src.config.speculative_config import SPECULATIVE_CONFIG
+from src.core.execution_cursor import ExecutionCursor
+from src.core.order_context import OrderContext
 from src.utils.database_handler import DatabaseHandler
+from src.utils.latency import LatencyHistogram
+from src.utils.metrics import REGISTRY
 from src.utils.queue_handler import RedisQueue
+from src.utils.tracing import TraceContext
+from src.utils.write_behind import JournalWriteError, WriteBehindJournal
 
 logging.basicConfig(
     level=logging.DEBUG,
@@ -15,22 +21,43 @@ logging.basicConfig(
 
 logger = logging.getLogger('TradeHandler')
 
+ORDERS_INTERCEPTED = REGISTRY.counter('tvcopier_orders_intercepted_total', 'Orders placed on TradingView and picked up by the proxy', ('type',))
+EXECUTIONS_MATCHED = REGISTRY.counter('tvcopier_executions_matched_total', 'Fills matched to an intercepted order', ('mode',))
+INTERCEPT_TO_PUBLISH = REGISTRY.histogram('tvcopier_intercept_to_publish_ms', 'Order interception to the trade being handed to Redis')
+PENDING_ORDERS = REGISTRY.gauge('tvcopier_pending_orders', 'Orders (and their TP/SL ids) waiting for a fill')
+JOURNAL_PENDING = REGISTRY.gauge('tvcopier_journal_pending', 'Write-behind journal entries not yet in Postgres')
+
 class TradeHandler:
-    def __init__(self):
-        self.db = DatabaseHandler()
-        self.queue = RedisQueue()
-        self.pending_orders = {}  # Track order->execution mapping
+    def __init__(self, db: Optional[DatabaseHandler] = None, queue: Optional[RedisQueue] = None):
+        # Stand-ins (sqlite, fakeredis) can be passed in by the benchmarks
+        self.db = db or DatabaseHandler()
+        self.journal = WriteBehindJournal(self.db)
+        self.queue = queue or RedisQueue()
+        self.pending_orders: Dict[str, OrderContext] = {}  # Track order->execution mapping
+        self.publish_latency = LatencyHistogram('Intercept to publish')
+        self.execution_cursor = ExecutionCursor()
         self.loop = asyncio.get_event_loop()
+        PENDING_ORDERS.set_function(lambda: len(self.pending_orders))
+        JOURNAL_PENDING.set_function(lambda: self.journal.pending)
     
-    async def process_order(self, request_data: Dict[str, Any], response_data: Dict[str, Any]) -> None:
+    async def process_order(self, request_data: Dict[str, Any], response_data: Dict[str, Any],
+                            trace: Optional[TraceContext] = None) -> None:
         """Process new order from TradingView asynchronously."""
+        if response_data.get('s') == 'error':
+            await self.process_order_rejection(request_data, response_data)
+            return
         try:
+            intercepted_at = time.perf_counter()
+            trace = trace or TraceContext.start()
             trade_id = f"TV_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{response_data['d']['orderId']}"
             
             # Convert TP/SL to float if present
             take_profit = float(request_data['takeProfit']) if 'takeProfit' in request_data else None
             stop_loss = float(request_data['stopLoss']) if 'stopLoss' in request_data else None
             
+            # Market orders can be copied before TradingView reports the fill
+            speculative = SPECULATIVE_CONFIG['enabled'] and request_data['type'] == 'market'
+            
             # Store the order ID for TP/SL separately
             tp_order_id = response_data['d'].get('takeProfitOrderId')
             sl_order_id = response_data['d'].get('stopLossOrderId')
@@ -51,6 +78,8 @@ class TradeHandler:
                 'status': 'pending',
                 'tv_request': request_data,
                 'tv_response': response_data,
+                'execution_mode': 'speculative' if speculative else 'standard',
+                'provisional_sent_at': datetime.utcnow() if speculative else None,
                 'created_at': datetime.utcnow()
             }
             
@@ -62,46 +91,81 @@ class TradeHandler:
             if take_profit or stop_loss:
                 print(f"🎯 TP: {take_profit} | SL: {stop_loss}")
             
-            # Store in database asynchronously
-            await self.db.async_save_trade(trade_data)
-            self.pending_orders[response_data['d']['orderId']] = trade_id
+            # Make the order visible to process_execution before any I/O
+            context = OrderContext(
+                trade_id=trade_id,
+                order_id=response_data['d']['orderId'],
+                instrument=request_data['instrument'],
+                side=request_data['side'],
+                qty=request_data['qty'],
+                type=request_data['type'],
+                take_profit=take_profit,
+                stop_loss=stop_loss,
+                intercepted_at=intercepted_at,
+                speculative=speculative,
+                trace=trace
+            )
+            self.pending_orders[context.order_id] = context
+            ORDERS_INTERCEPTED.inc(type=request_data['type'])
             
             if tp_order_id:
-                self.pending_orders[tp_order_id] = trade_id
+                self.pending_orders[tp_order_id] = context
             if sl_order_id:
-                self.pending_orders[sl_order_id] = trade_id
+                self.pending_orders[sl_order_id] = context
+
+            # Persist via the write-behind journal; queued before any await so a
+            # fill handled meanwhile can never queue its update ahead of the insert
+            await self.journal.save_trade(trade_data)
+
+            if not speculative:
+                # Let the worker select the symbol and build its order request while TradingView fills
+                await self.queue.async_push_prepare(request_data['instrument'], request_data['side'])
+
+            if speculative:
+                await self._send_provisional(context)
             
         except Exception as e:
             logger.error(f"Error processing order: {e}")
             print(f"❌ Order failed: {e}")
 
-    async def process_execution(self, execution_data: Dict[str, Any]) -> None:
+    async def process_execution(self, execution_data: Dict[str, Any], instrument: Optional[str] = None) -> None:
         """Process execution update from TradingView asynchronously."""
+        claimed = None
         try:
-            executions = execution_data.get('d', [])
+            # Only look at fills newer than what earlier polls already covered
+            cursor_key = instrument or '*'
+            executions = self.execution_cursor.new_executions(cursor_key, execution_data.get('d', []))
             for execution in executions:
                 order_id = execution.get('orderId')
-                if order_id and order_id in self.pending_orders:
-                    trade_id = self.pending_orders[order_id]
+                # Claim the order before any await so an overlapping poll cannot copy the same fill
+                context = self.pending_orders.pop(order_id, None) if order_id else None
+                claimed = (order_id, context) if context is not None else None
+                if context is not None and context.speculative and not context.reversed and order_id == context.order_id:
+                    await self._confirm_provisional(context, execution)
+                    EXECUTIONS_MATCHED.inc(mode='speculative')
+                    self.execution_cursor.consume(cursor_key, execution)
+                elif context is not None:
+                    trade_id = context.trade_id
                     position_id = execution.get('positionId')
+                    trace = context.trace
+                    if trace is not None:
+                        trace.mark('execution_seen')
+                    EXECUTIONS_MATCHED.inc(mode='standard')
+                    if context.reversed:
+                        context.reversal_timer.cancel()
+                        print(f"⚠  Late fill for reversed speculative order {order_id}, copying it now")
                     
-                    # Get original trade data asynchronously
-                    original_trade = await self.db.async_get_trade(trade_id)
-                    if not original_trade:
-                        logger.error(f"Trade not found: {trade_id}")
-                        continue
-                    
-                    # Prepare trade data
+                    # Prepare trade data from the context captured at order time
                     trade_data = {
                         'trade_id': trade_id,
                         'execution_data': execution,
                         'position_id': position_id,
-                        'instrument': original_trade.get('instrument'),
-                        'side': original_trade.get('side'),
-                        'qty': original_trade.get('quantity'),
-                        'type': original_trade.get('type'),
-                        'take_profit': original_trade.get('take_profit'),
-                        'stop_loss': original_trade.get('stop_loss')
+                        'instrument': context.instrument,
+                        'side': context.side,
+                        'qty': context.qty,
+                        'type': context.type,
+                        'take_profit': context.take_profit,
+                        'stop_loss': context.stop_loss
                     }
 
                     # Update database asynchronously
@@ -113,19 +177,157 @@ class TradeHandler:
                         'is_closed': execution.get('isClose', False)
                     }
                     
-                    await self.db.async_update_trade_status(trade_id, 'executed', update_data)
+                    await self.journal.update_trade_status(
+                        trade_id, 'executed', update_data, from_statuses=('pending',)
+                    )
+
+                    # The worker updates this row by trade_id; only waits if the
+                    # insert is still queued (normally flushed long before the fill)
+                    await self.journal.wait_saved(trade_id)
                     
                     # Publish trade for execution asynchronously
+                    if trace is not None:
+                        # The publish itself shows up in db_write->worker_receive
+                        trace.mark('db_write')
+                        trade_data['trace'] = trace.to_wire()
                     await self.queue.async_push_trade(trade_data)
                     print(f"✔  Trade executed - TV PositionID#: {position_id}")
                     print(f"💲 Average Fill Price - {update_data['execution_price']}")
 
+                    if context.intercepted_at is not None:
+                        elapsed_ms = (time.perf_counter() - context.intercepted_at) * 1000
+                        self.publish_latency.record(elapsed_ms)
+                        INTERCEPT_TO_PUBLISH.observe(elapsed_ms)
+                        print(f"⚡ {self.publish_latency.format_summary()}")
+
+                    self.execution_cursor.consume(cursor_key, execution)
+                claimed = None
                     
-                    del self.pending_orders[order_id]
-                    
+        except JournalWriteError as e:
+            # Without its row the worker cannot record the copy; drop the order rather than retry
+            logger.error(f"Error processing execution: {e}")
+            print(f"❌ Trade not copied: {e}")
         except Exception as e:
+            if claimed is not None:
+                # Not copied; leave the order for the next poll to retry
+                self.pending_orders.setdefault(*claimed)
             logger.error(f"Error processing execution: {e}")
 
+    async def _send_provisional(self, context: OrderContext) -> None:
+        """Copy an accepted market order to MT5 before its fill shows up in an execution poll."""
+        trade_data = {
+            'trade_id': context.trade_id,
+            'speculative': True,
+            'speculative_order_id': context.order_id,
+            'execution_data': {
+                'orderId': context.order_id,
+                'instrument': context.instrument,
+                'side': context.side,
+                'qty': context.qty
+            },
+            'instrument': context.instrument,
+            'side': context.side,
+            'qty': context.qty,
+            'type': context.type,
+            'take_profit': context.take_profit,
+            'stop_loss': context.stop_loss
+        }
+
+        # The worker updates this row by trade_id
+        await self.journal.wait_saved(context.trade_id)
+        if context.trace is not None:
+            context.trace.mark('db_write')
+            trade_data['trace'] = context.trace.to_wire()
+        await self.queue.async_push_trade(trade_data)
+        print(f"⚡ Provisional copy sent - OrderID#: {context.order_id}")
+
+        if context.intercepted_at is not None:
+            elapsed_ms = (time.perf_counter() - context.intercepted_at) * 1000
+            self.publish_latency.record(elapsed_ms)
+            INTERCEPT_TO_PUBLISH.observe(elapsed_ms)
+            print(f"⚡ {self.publish_latency.format_summary()}")
+
+        context.reversal_timer = self.loop.call_later(
+            SPECULATIVE_CONFIG['timeout_ms'] / 1000,
+            lambda: asyncio.ensure_future(self._reverse_provisional(context.order_id, 'no execution before timeout'))
+        )
+
+    async def _confirm_provisional(self, context: OrderContext, execution: Dict[str, Any]) -> None:
+        """The fill for a provisional copy arrived: keep the MT5 position."""
+        if context.reversal_timer is not None:
+            context.reversal_timer.cancel()
+        position_id = execution.get('positionId')
+
+        update_data = {
+            'position_id': position_id,
+            'execution_price': execution.get('price'),
+            'execution_data': execution,
+            'executed_at': datetime.utcnow(),
+            'confirmed_at': datetime.utcnow(),
+            'is_closed': execution.get('isClose', False)
+        }
+        await self.journal.update_trade_status(
+            context.trade_id, 'executed', update_data, from_statuses=('pending',)
+        )
+
+        # Carries the full order so the worker can still open it if the provisional copy failed
+        await self.queue.async_push_trade({
+            'type': 'confirm',
+            'trade_id': context.trade_id,
+            'speculative_order_id': context.order_id,
+            'execution_data': execution,
+            'position_id': position_id,
+            'instrument': context.instrument,
+            'side': context.side,
+            'qty': context.qty,
+            'take_profit': context.take_profit,
+            'stop_loss': context.stop_loss
+        })
+        print(f"✔  Speculative trade confirmed - TV PositionID#: {position_id}")
+        print(f"💲 Average Fill Price - {update_data['execution_price']}")
+
+    async def _reverse_provisional(self, order_id: str, reason: str) -> None:
+        """Undo a provisional copy whose order never filled."""
+        try:
+            context = self.pending_orders.get(order_id)
+            if context is None or not context.speculative or context.reversed:
+                return
+            context.reversed = True
+            print(f"↩  Reversing speculative copy - OrderID#: {order_id} ({reason})")
+            if context.reversal_timer is not None:
+                context.reversal_timer.cancel()
+            # Remembered for a while so a late fill is still copied, then dropped
+            context.reversal_timer = self.loop.call_later(
+                SPECULATIVE_CONFIG['late_fill_window_ms'] / 1000, self._forget_order, context
+            )
+            await self.queue.async_push_trade({
+                'type': 'cancel',
+                'trade_id': context.trade_id,
+                'speculative_order_id': order_id,
+                'instrument': context.instrument,
+                'qty': context.qty,
+                'reason': reason
+            })
+        except Exception as e:
+            logger.error(f"Error reversing speculative order {order_id}: {e}")
+
+    async def process_order_rejection(self, request_data: Dict[str, Any], response_data: Dict[str, Any]) -> None:
+        """TradingView rejected an order: reverse its provisional copy if one was sent."""
+        reason = f"rejected by TradingView: {response_data.get('errmsg', 'no reason given')}"
+        details = response_data.get('d')
+        order_id = details.get('orderId') if isinstance(details, dict) else None
+        context = self.pending_orders.get(order_id) if order_id else None
+        if context is not None and context.speculative:
+            await self._reverse_provisional(order_id, reason)
+            return
+        # Copies are only sent once TradingView accepts an order, so nothing reached MT5
+        print(f"\n❌ Order {reason}: {request_data.get('side', '').upper()} {request_data.get('instrument')} x {request_data.get('qty')}")
+
+    def _forget_order(self, context: OrderContext) -> None:
+        """Drop every pending_orders entry (order, TP and SL ids) that points at `context`."""
+        for order_id in [key for key, value in self.pending_orders.items() if value is context]:
+            del self.pending_orders[order_id]
+
     async def process_position_close(self, position_id: str, close_data: Dict[str, Any] = None) -> None:
         """Process position close request from TradingView asynchronously."""
         try:
@@ -133,6 +335,7 @@ class TradeHandler:
             print(f"\n📤 Closing PositionID#: {position_id}")
             
             # Get trade data asynchronously
+            await self.journal.drain()
             trade = await self.db.async_get_trade_by_position(position_id)
             if not trade:
                 logger.error(f"No trade found for position {position_id}")
@@ -143,42 +346,32 @@ class TradeHandler:
                 logger.error(f"No MT5 ticket found for trade {trade['trade_id']}")
                 return
 
-            try:
-                # Initialize MT5 connection if needed
-                if not mt5.initialize():
-                    logger.error("Failed to initialize MT5")
-                    return
+            # Volume from the position state the worker publishes; never ask MT5 from the proxy
+            state = await self.queue.async_get_position_state(mt5_ticket)
 
-                # Get specific position
-                positions = mt5.positions_get(ticket=int(mt5_ticket))
-
-                if not positions:
-                    # If position not found in MT5, add the closing log here
-                    direction_emoji = "BUY🔼" if trade['side'].lower() == 'buy' else "SELL🔻"
-                    print(f"📌 Closed {direction_emoji} {trade['instrument']} x {trade['quantity']}")
-                    return
-                    
-            except Exception as e:
-                logger.error(f"Error getting MT5 position: {e}")
-                logger.error(f"MT5 last error: {mt5.last_error()}")
-                return
-            
-            current_volume = float(positions[0].volume)
-            
             # Get direction emoji
             direction_emoji = "BUY🔼" if trade['side'].lower() == 'buy' else "SELL🔻"
 
             # Handle partial close
             try:
-                close_amount = float(close_data.get('amount', current_volume))
-                
-                # Validate close amount
-                if close_amount <= 0 or close_amount > current_volume:
-                    logger.error(f"Invalid close amount: {close_amount} (current volume: {current_volume})")
-                    return
-                    
-                # Check if this closes the entire remaining position
-                is_partial = close_amount < current_volume
+                if state is None:
+                    # Unknown to the cache (not polled yet, or already gone): the worker validates
+                    close_amount = float(close_data['amount']) if 'amount' in close_data else None
+                    if close_amount is not None and close_amount <= 0:
+                        logger.error(f"Invalid close amount: {close_amount}")
+                        return
+                    is_partial = False
+                else:
+                    current_volume = float(state['volume'])
+                    close_amount = float(close_data.get('amount', current_volume))
+
+                    # Validate close amount
+                    if close_amount <= 0 or close_amount > current_volume:
+                        logger.error(f"Invalid close amount: {close_amount} (current volume: {current_volume})")
+                        return
+
+                    # Check if this closes the entire remaining position
+                    is_partial = close_amount < current_volume
             except Exception as e:
                 logger.error(f"Error processing close amount: {e}")
                 return
@@ -189,13 +382,14 @@ class TradeHandler:
                 'mt5_ticket': mt5_ticket,
                 'instrument': trade['instrument'],
                 'type': 'market',
-                'qty': str(close_amount),
+                'qty': str(close_amount) if close_amount is not None else '',
                 'is_partial': is_partial,
+                'validate': state is None,
                 'side': 'sell' if trade['side'] == 'buy' else 'buy',
                 'execution_data': {
                     'instrument': trade['instrument'],
                     'positionId': position_id,
-                    'qty': str(close_amount),
+                    'qty': str(close_amount) if close_amount is not None else '',
                     'side': 'sell' if trade['side'] == 'buy' else 'buy',
                     'isClose': True
                 }
@@ -204,20 +398,22 @@ class TradeHandler:
             # Publish close request asynchronously
             await self.queue.async_push_trade(close_request)
             
-            # Update status asynchronously
-            close_status = 'closing' if is_partial else 'closed'
+            # Update status asynchronously; a deferred close is settled by the worker
+            close_status = 'closing' if is_partial or state is None else 'closed'
             status_update = {
                 'close_requested_at': datetime.utcnow().isoformat(),
-                'is_closed': not is_partial  # Only mark as closed for full closes
+                'is_closed': close_status == 'closed'  # Only mark as closed for full closes
             }
-            await self.db.async_update_trade_status(
+            await self.journal.update_trade_status(
                 trade['trade_id'], 
                 close_status, 
                 status_update
             )
             
             # Log close action with consistent format
-            if is_partial:
+            if state is None:
+                print(f"⏳ Close of {direction_emoji} {trade['instrument']} sent to worker for validation")
+            elif is_partial:
                 print(f"⭕ Partially closing {direction_emoji} {trade['instrument']} x {close_amount}")
             else:
                 print(f"📌 Closed {direction_emoji} {trade['instrument']} x {close_amount}")
@@ -239,6 +435,7 @@ class TradeHandler:
             update_data = update_data or {}
             
             # Get trade data asynchronously
+            await self.journal.drain()
             trade = await self.db.async_get_trade_by_position(position_id)
             if not trade:
                 logger.error(f"No trade found for position {position_id}")
@@ -292,7 +489,7 @@ class TradeHandler:
                 'trailing_stop_pips': trailing_stop_pips,  # Save trailing stop
                 'updated_at': datetime.utcnow()
             }
-            await self.db.async_update_trade_status(trade['trade_id'], 'updated', db_update)
+            await self.journal.update_trade_status(trade['trade_id'], 'updated', db_update)
             
             # Push to MT5
             await self.queue.async_push_trade(update_trade_data)
@@ -307,6 +504,7 @@ class TradeHandler:
         """Process deletion of TP or SL level."""
         try:
             # Get active trades from database
+            await self.journal.drain()
             trade = await self.db.async_get_latest_active_trade()
             if not trade:
                 logger.error("No active trades found")
@@ -346,11 +544,14 @@ class TradeHandler:
                 'stop_loss': None if level_type == 'SL' else current_sl,
                 'updated_at': datetime.utcnow()
             }
-            await self.db.async_update_trade_status(trade['trade_id'], 'updated', db_update)
+            await self.journal.update_trade_status(trade['trade_id'], 'updated', db_update)
 
         except Exception as e:
             logger.error(f"Error processing {level_type} deletion: {e}")
 
     def cleanup(self):
         """Cleanup resources."""
+        self.journal.flush_sync()
+        if self.publish_latency.count:
+            print(f"⚡ {self.publish_latency.format_summary()}")
         self.db.cleanup()
\ No newline at end of file
@@ -17,7 +17,12 @@ project_root = str(Path(__file__).parent.parent)
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
+from src.config.metrics_config import METRICS_CONFIG
 from src.core.interceptor import TradingViewInterceptor
+from src.utils.metrics import start_metrics_server
+
+# Prometheus endpoint for the proxy; lives in the mitmdump process with the addon
+start_metrics_server(METRICS_CONFIG['proxy_port'], METRICS_CONFIG['host'])
 
 # Add the interceptor to mitmproxy
 addons = [TradingViewInterceptor()]
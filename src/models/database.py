@@ -8,13 +8,13 @@ from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-from src.config.database import DATABASE_URL
-
 logger = logging.getLogger(__name__)
 
 # Create SQLAlchemy engine with retries
 def create_db_engine(retries=5, delay=2):
     """Create database engine with retry logic."""
+    from src.config.database import DATABASE_URL
+
     for attempt in range(retries):
         try:
             engine = create_engine(
@@ -37,9 +37,28 @@ def create_db_engine(retries=5, delay=2):
             logger.warning(f"Database connection attempt {attempt + 1} failed, retrying in {delay} seconds...")
             time.sleep(delay)
             
-# Create engine with retry logic
-engine = create_db_engine()
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Created on first use, so importing the models (DatabaseHandler, the
+# sqlite benchmarks) never needs a reachable Postgres
+_engine = None
+_session_factory = None
+
+def get_engine():
+    """Shared engine for DATABASE_URL, created with retry logic on first call."""
+    global _engine
+    if _engine is None:
+        _engine = create_db_engine()
+    return _engine
+
+def __getattr__(name):
+    # `engine` and `SessionLocal` stay importable from here as before
+    global _session_factory
+    if name == 'engine':
+        return get_engine()
+    if name == 'SessionLocal':
+        if _session_factory is None:
+            _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+        return _session_factory
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Create base class for declarative models
 Base = declarative_base()
@@ -77,12 +96,20 @@ class Trade(Base):
     is_closed = Column(Boolean, default=False)
     close_requested_at = Column(DateTime(timezone=True))
     execution_time_ms = Column(Integer)
+
+    # Speculative execution audit trail
+    execution_mode = Column(String(20), default='standard')  # 'standard' or 'speculative'
+    provisional_sent_at = Column(DateTime(timezone=True))
+    confirmed_at = Column(DateTime(timezone=True))
+    reversed_at = Column(DateTime(timezone=True))
+    reversal_reason = Column(Text)
     
     # JSON data
     tv_request = Column(JSON)
     tv_response = Column(JSON)
     execution_data = Column(JSON)
     mt5_response = Column(JSON)
+    latency_trace = Column(JSON)  # per-stage µs offsets from interception (src/utils/tracing.py)
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
@@ -96,7 +123,7 @@ class Trade(Base):
 def init_db():
     """Initialize database tables."""
     try:
-        Base.metadata.create_all(bind=engine)
+        Base.metadata.create_all(bind=get_engine())
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Error creating database tables: {e}")
@@ -0,0 +1,110 @@
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.insert(0, project_root)
+
+from src.utils.latency import LatencyHistogram
+from src.utils.queue_handler import RedisQueue
+
+
+def _sample_trade(i: int) -> dict:
+    """A message shaped like the ones TradeHandler publishes."""
+    return {
+        'trade_id': f"TV_BENCH_{i}",
+        'execution_data': {
+            'id': str(i),
+            'instrument': 'EURUSD',
+            'orderId': str(1_000_000 + i),
+            'positionId': str(2_000_000 + i),
+            'price': 1.08512,
+            'qty': '0.1',
+            'side': 'buy',
+            'time': 1_700_000_000_000 + i
+        },
+        'position_id': str(2_000_000 + i),
+        'instrument': 'EURUSD',
+        'side': 'buy',
+        'qty': '0.1',
+        'type': 'market',
+        'take_profit': 1.0900,
+        'stop_loss': 1.0800
+    }
+
+
+async def _publish_executor(queue: RedisQueue, trade: dict) -> None:
+    """The run_in_executor path RedisQueue used before the asyncio client."""
+    await asyncio.get_running_loop().run_in_executor(None, queue.push_trade, trade)
+
+
+async def _publish_native(queue: RedisQueue, trade: dict) -> None:
+    await queue.async_push_trade(trade)
+
+
+async def _measure(name: str, publish, queue: RedisQueue, count: int, concurrency: int) -> dict:
+    """Sequential publishes for latency, then concurrent batches for throughput."""
+    histogram = LatencyHistogram(name)
+
+    for i in range(count):
+        start = time.perf_counter()
+        await publish(queue, _sample_trade(i))
+        histogram.record((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    for offset in range(0, count, concurrency):
+        await asyncio.gather(*(
+            publish(queue, _sample_trade(i))
+            for i in range(offset, min(offset + concurrency, count))
+        ))
+    elapsed = time.perf_counter() - start
+
+    stats = histogram.summary()
+    return {
+        'p50': stats['p50'],
+        'p99': stats['p99'],
+        'throughput': count / elapsed
+    }
+
+
+async def run_benchmark(host: str, port: int, count: int, concurrency: int) -> dict:
+    queue = RedisQueue(host=host, port=port)
+    queue.loop = asyncio.get_running_loop()
+    # Keep publish logging out of the measurement
+    queue.logger.disabled = True
+    try:
+        results = {}
+        for name, publish in (('executor', _publish_executor), ('native', _publish_native)):
+            # Warm up connections and the thread pool
+            for i in range(50):
+                await publish(queue, _sample_trade(i))
+            results[name] = await _measure(name, publish, queue, count, concurrency)
+        return results
+    finally:
+        if queue.async_redis is not None:
+            client, queue.async_redis = queue.async_redis, None
+            await (getattr(client, 'aclose', None) or client.close)()
+        queue.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare RedisQueue publish paths against a local Redis")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=6379)
+    parser.add_argument('--count', type=int, default=5000, help="Messages per measurement")
+    parser.add_argument('--concurrency', type=int, default=50, help="In-flight publishes for throughput")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args.host, args.port, args.count, args.concurrency))
+
+    print(f"\n📊 RedisQueue publish ({args.count} messages, concurrency {args.concurrency})")
+    print(f"{'Path':<10} {'p50 (ms)':>10} {'p99 (ms)':>10} {'msg/s':>10}")
+    for name, stats in results.items():
+        print(f"{name:<10} {stats['p50']:>10.3f} {stats['p99']:>10.3f} {stats['throughput']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
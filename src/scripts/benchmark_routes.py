@@ -0,0 +1,162 @@
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.insert(0, project_root)
+
+from src.core.routes import RouteClassifier
+
+BROKER_URL = 'papertrading-broker.tradingview.com'
+ACCOUNT_ID = '123456'
+BASE_PATH = f"{BROKER_URL}/accounts/{ACCOUNT_ID}"
+
+
+DEFAULT_PORTS = {'http': 80, 'https': 443, 'ws': 80, 'wss': 443}
+
+
+class _Request:
+    """Minimal stand-in for mitmproxy's Request.
+
+    `pretty_url` is rebuilt on every access from the Host header, port and
+    path, the same way mitmproxy assembles it.
+    """
+
+    def __init__(self, scheme: str, host: str, path: str, method: str):
+        self.scheme = scheme
+        self.host = host
+        self.port = DEFAULT_PORTS[scheme]
+        self.path = path
+        self.method = method
+        self.headers = {'host': host, 'user-agent': 'Mozilla/5.0', 'accept': '*/*'}
+
+    @property
+    def pretty_host(self) -> str:
+        return self.headers.get('host') or self.host
+
+    @property
+    def pretty_url(self) -> str:
+        host = self.pretty_host
+        if DEFAULT_PORTS.get(self.scheme) != self.port:
+            host = f"{host}:{self.port}"
+        return f"{self.scheme}://{host}{self.path}"
+
+
+class _Flow:
+    def __init__(self, request: _Request):
+        self.request = request
+        self.metadata = {}
+
+
+def _legacy_should_log(flow) -> bool:
+    """The substring chain used before the route table."""
+    url = flow.request.pretty_url
+    if BASE_PATH not in url:
+        return False
+    if '/orders?locale=' in url and 'requestId=' in url:
+        return True
+    if '/executions?locale=' in url and 'instrument=' in url:
+        return True
+    if '/positions/' in url:
+        return flow.request.method in ["DELETE", "PUT"]
+    if '.TP.' in url or '.SL.' in url:
+        return flow.request.method == "DELETE"
+    return False
+
+
+def _legacy_flow(flow) -> None:
+    """Replay the work request() and response() did per flow."""
+    if BASE_PATH in flow.request.pretty_url:
+        pass
+    if _legacy_should_log(flow) and flow.request.method == "DELETE":
+        url = flow.request.pretty_url
+        if '.TP.' in url or '.SL.' in url:
+            url.split('/')[-1].split('.')
+        else:
+            flow.request.pretty_url.split('/')[-1].split('?')[0]
+    if _legacy_should_log(flow):
+        url = flow.request.pretty_url
+        if '/positions/' in url:
+            url.split('/')[-1].split('?')[0]
+        elif '/orders?' in url:
+            pass
+        elif '/executions?' in url:
+            pass
+
+
+def _classified_flow(classifier: RouteClassifier, flow) -> None:
+    """request() and response() both ask for the route; the second is a cache hit."""
+    classifier.classify(flow)
+    classifier.classify(flow)
+
+
+def generate_flows(count: int, seed: int = 42) -> list:
+    """Build a synthetic mix of TradingView traffic."""
+    rng = random.Random(seed)
+    account = f"/accounts/{ACCOUNT_ID}"
+    templates = [
+        # Chart, widget and static traffic dominates a real session
+        (40, lambda: ('https', 'www.tradingview.com', f"/chart/{rng.randint(1, 10**6)}/", 'GET')),
+        (15, lambda: ('https', 'static.tradingview.com', f"/static/bundles/{rng.randint(1, 9999)}.js", 'GET')),
+        (10, lambda: ('wss', 'data.tradingview.com', f"/socket.io/websocket?from=chart&date={rng.randint(1, 10**9)}", 'GET')),
+        (5, lambda: ('https', 'scanner.tradingview.com', '/america/scan', 'POST')),
+        # Broker account traffic
+        (12, lambda: ('https', BROKER_URL, f"{account}/executions?locale=en&instrument=EURUSD", 'GET')),
+        (6, lambda: ('https', BROKER_URL, f"{account}/state?locale=en", 'GET')),
+        (4, lambda: ('https', BROKER_URL, f"{account}/positions?locale=en", 'GET')),
+        (3, lambda: ('https', BROKER_URL, f"{account}/orders?locale=en&requestId={rng.randint(1, 10**9)}", 'POST')),
+        (2, lambda: ('https', BROKER_URL, f"{account}/positions/{rng.randint(1, 10**9)}?locale=en", 'DELETE')),
+        (2, lambda: ('https', BROKER_URL, f"{account}/positions/{rng.randint(1, 10**9)}?locale=en", 'PUT')),
+        (1, lambda: ('https', BROKER_URL, f"{account}/orders/{rng.randint(1, 10**9)}.TP.{rng.randint(1, 10**12)}?locale=en", 'DELETE')),
+    ]
+    weights = [weight for weight, _ in templates]
+    makers = [maker for _, maker in templates]
+
+    flows = []
+    for maker in rng.choices(makers, weights=weights, k=count):
+        scheme, host, path, method = maker()
+        flows.append(_Flow(_Request(scheme, host, path, method)))
+    return flows
+
+
+def run_benchmark(count: int, rounds: int) -> dict:
+    """Time the legacy and classified paths over the same flows."""
+    classifier = RouteClassifier(BASE_PATH)
+    results = {}
+
+    for name in ('legacy', 'classified'):
+        best = float('inf')
+        for _ in range(rounds):
+            flows = generate_flows(count)
+            start = time.perf_counter()
+            if name == 'legacy':
+                for flow in flows:
+                    _legacy_flow(flow)
+            else:
+                for flow in flows:
+                    _classified_flow(classifier, flow)
+            best = min(best, time.perf_counter() - start)
+        results[name] = best / count * 1e9  # ns per flow
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-flow route classification")
+    parser.add_argument('--flows', type=int, default=10_000, help="Number of synthetic flows")
+    parser.add_argument('--rounds', type=int, default=5, help="Rounds per variant (best is reported)")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.flows, args.rounds)
+
+    print(f"\n📊 Per-flow overhead over {args.flows} TradingView URLs (best of {args.rounds})")
+    print(f"Legacy    : {results['legacy']:.0f} ns/flow")
+    print(f"Classified: {results['classified']:.0f} ns/flow")
+    print(f"Speedup   : {results['legacy'] / results['classified']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.insert(0, project_root)
+
+from src.services import trailing_engine
+from src.services.trailing_engine import TrailingStopEngine
+from src.services.trailing_stop_registry import TrailingStopRegistry
+from src.utils.latency import LatencyHistogram
+
+_Position = namedtuple('_Position', 'ticket symbol type volume sl tp price_open')
+_SymbolInfo = namedtuple('_SymbolInfo', 'point digits')
+_Tick = namedtuple('_Tick', 'bid ask')
+
+
+class _Terminal:
+    """Synthetic stand-in for the MT5 terminal: random-walk prices, counted calls.
+
+    `ipc_us` spins for that long per call to model the terminal round trip.
+    """
+
+    POSITION_TYPE_BUY = 0
+    POSITION_TYPE_SELL = 1
+
+    def __init__(self, symbols, ipc_us: float):
+        self.ipc = ipc_us / 1_000_000
+        self.calls = 0
+        self.info = {}
+        self.prices = {}
+        for i, symbol in enumerate(symbols):
+            digits = 3 if symbol.endswith('JPY') else 5
+            self.info[symbol] = _SymbolInfo(10 ** -digits, digits)
+            self.prices[symbol] = 150.0 + i if digits == 3 else 1.0 + i * 0.05
+
+    def _round_trip(self):
+        self.calls += 1
+        if self.ipc:
+            end = time.perf_counter() + self.ipc
+            while time.perf_counter() < end:
+                pass
+
+    def symbol_info(self, symbol):
+        self._round_trip()
+        return self.info[symbol]
+
+    def symbol_info_tick(self, symbol):
+        self._round_trip()
+        info = self.info[symbol]
+        mid = self.prices[symbol]
+        return _Tick(round(mid - info.point * 5, info.digits), round(mid + info.point * 5, info.digits))
+
+    def step(self, rng: random.Random):
+        for symbol, info in self.info.items():
+            self.prices[symbol] += rng.randint(-20, 30) * info.point
+
+
+class _Instruments:
+    def get_pip_size(self, symbol):
+        return 0.01 if symbol.endswith('JPY') else 0.0001
+
+
+class _MT5Service:
+    def __init__(self, registry):
+        self.trailing_stops = registry
+        self.instrument_manager = _Instruments()
+        self.sent = []
+
+    async def _update_stop_loss_mt5(self, ticket, sl_price, tp, symbol):
+        self.sent.append((str(ticket), sl_price))
+
+
+class _Snapshots:
+    def __init__(self, positions):
+        self.snapshot = {str(position.ticket): position for position in positions}
+
+    def subscribe(self, handler):
+        pass
+
+
+def _build_book(count: int, symbol_count: int, seed: int):
+    rng = random.Random(seed)
+    bases = ['EUR', 'GBP', 'AUD', 'NZD', 'USD', 'CAD', 'CHF', 'JPY']
+    symbols = []
+    for base in bases:
+        for quote in bases:
+            if base != quote and len(symbols) < symbol_count:
+                symbols.append(base + quote)
+    positions = [
+        _Position(100_000 + i, symbols[i % len(symbols)], rng.randint(0, 1), 0.1, 0.0, 0.0, 0.0)
+        for i in range(count)
+    ]
+    trailing = {str(position.ticket): float(rng.choice((10, 15, 20, 30, 50))) for position in positions}
+    return symbols, positions, trailing
+
+
+def _legacy_cycle(terminal, positions, trailing, instruments):
+    """The pre-engine monitor: symbol_info and symbol_info_tick for every position."""
+    sent = []
+    for position in positions:
+        pips = trailing.get(str(position.ticket))
+        if not pips:
+            continue
+        symbol_info = terminal.symbol_info(position.symbol)
+        prices = terminal.symbol_info_tick(position.symbol)
+        distance = round(pips * instruments.get_pip_size(position.symbol), symbol_info.digits)
+        if position.type == terminal.POSITION_TYPE_BUY:
+            new_sl = round(prices.bid - distance, symbol_info.digits)
+            if position.sl == 0 or new_sl > position.sl:
+                sent.append((str(position.ticket), new_sl))
+        else:
+            new_sl = round(prices.ask + distance, symbol_info.digits)
+            if position.sl == 0 or new_sl < position.sl:
+                sent.append((str(position.ticket), new_sl))
+    return sent
+
+
+def _apply(positions, sent):
+    """Pretend every modification succeeded, as the next snapshot would show."""
+    moved = dict(sent)
+    return [position._replace(sl=moved.get(str(position.ticket), position.sl)) for position in positions]
+
+
+async def run_benchmark(count: int, symbol_count: int, cycles: int, ipc_us: float, seed: int) -> dict:
+    symbols, positions, trailing = _build_book(count, symbol_count, seed)
+    results = {}
+
+    # Legacy per-position loop
+    terminal = _Terminal(symbols, ipc_us)
+    rng = random.Random(seed)
+    histogram = LatencyHistogram('legacy')
+    book = positions
+    legacy_sent = []
+    for _ in range(cycles):
+        terminal.step(rng)
+        start = time.perf_counter()
+        sent = _legacy_cycle(terminal, book, trailing, _Instruments())
+        histogram.record((time.perf_counter() - start) * 1000)
+        legacy_sent.append(sorted(sent))
+        book = _apply(book, sent)
+    results['legacy'] = {**histogram.summary(), 'calls': terminal.calls / cycles}
+
+    # Engine: one tick per symbol and a vectorised pass
+    terminal = _Terminal(symbols, ipc_us)
+    trailing_engine.mt5 = terminal
+    rng = random.Random(seed)
+    registry = TrailingStopRegistry()
+    registry.load(trailing)
+    service = _MT5Service(registry)
+    snapshots = _Snapshots(positions)
+    engine = TrailingStopEngine(service, snapshots, cycle_ms=100)
+    histogram = LatencyHistogram('engine')
+    engine_sent = []
+    for _ in range(cycles):
+        terminal.step(rng)
+        service.sent = []
+        start = time.perf_counter()
+        await engine.run_cycle()
+        histogram.record((time.perf_counter() - start) * 1000)
+        # Let the modify tasks finish, then show their result in the next snapshot
+        await asyncio.sleep(0)
+        engine_sent.append(sorted(service.sent))
+        snapshots.snapshot = {str(p.ticket): p for p in _apply(snapshots.snapshot.values(), service.sent)}
+        engine._sent.clear()
+    results['engine'] = {**histogram.summary(), 'calls': terminal.calls / cycles}
+    results['identical'] = legacy_sent == engine_sent
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the per-position trailing loop with the vectorised engine")
+    parser.add_argument('--positions', type=int, default=500)
+    parser.add_argument('--symbols', type=int, default=30)
+    parser.add_argument('--cycles', type=int, default=200)
+    parser.add_argument('--ipc-us', type=float, default=50.0, help="Simulated terminal round trip per call")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args.positions, args.symbols, args.cycles, args.ipc_us, args.seed))
+
+    print(f"\n📊 Trailing stop cycle ({args.positions} positions, {args.symbols} symbols, "
+          f"{args.cycles} cycles, {args.ipc_us:.0f}µs per terminal call)")
+    print(f"{'Path':<8} {'p50 (ms)':>10} {'p99 (ms)':>10} {'calls/cycle':>12}")
+    for name in ('legacy', 'engine'):
+        stats = results[name]
+        print(f"{name:<8} {stats['p50']:>10.3f} {stats['p99']:>10.3f} {stats['calls']:>12.0f}")
+    speedup = results['legacy']['p50'] / results['engine']['p50'] if results['engine']['p50'] else float('inf')
+    print(f"⚡ Speedup (p50): {speedup:.1f}x")
+    print(f"{'✅' if results['identical'] else '❌'} Same SL modifications: {results['identical']}")
+
+
+if __name__ == "__main__":
+    main()
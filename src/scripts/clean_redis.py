@@ -7,17 +7,21 @@ import redis
 project_root = str(Path(__file__).parent.parent.parent)
 sys.path.insert(0, project_root)
 
+from src.config.queue_config import QUEUE_CONFIG
+
 def clean_redis():
     """Clean all trade queues."""
     try:
-        r = redis.Redis(host='localhost', port=6379, db=0)
+        r = redis.Redis(host=QUEUE_CONFIG['host'], port=QUEUE_CONFIG['port'], db=0)
         
-        # Clean all queues
+        # Clean all queues, including the trade stream and its dead letters
         queues = [
             'trades:pending',
             'trades:processing',
             'trades:completed',
-            'trades:failed'
+            'trades:failed',
+            QUEUE_CONFIG['stream'],
+            QUEUE_CONFIG['dead_letter_stream']
         ]
         
         for queue in queues:
@@ -6,6 +6,7 @@ project_root = str(Path(__file__).parent.parent.parent)
 sys.path.insert(0, project_root)
 
 from src.utils.database_handler import DatabaseHandler
+from src.utils.tracing import TraceContext, stage_histograms
 
 
 def main():
@@ -31,6 +32,15 @@ def main():
     else:
         print("No trades in last 24 hours")
 
+    print("\nPipeline stages (last 100 traced trades):")
+    traces = [TraceContext.from_wire(trace) for trace in db.get_latency_traces(limit=100)]
+    traces = [trace for trace in traces if trace is not None]
+    if traces:
+        for histogram in stage_histograms(traces).values():
+            print(histogram.format_summary())
+    else:
+        print("No traced trades found")
+
 if __name__ == "__main__":
     print("\n=== Trade Execution Statistics ===")
     main()
@@ -102,10 +102,18 @@ def generate_requirements():
                 if package in installed_packages:
                     f.write(f"{package}=={installed_packages[package]}\n")
         
+        # Write optional performance dependencies (JSON fast paths)
+        f.write("\n# Optional performance dependencies\n")
+        for package in ['orjson', 'msgspec']:
+            if package in installed_packages:
+                f.write(f"# {package}=={installed_packages[package]}\n")
+
         # Write development dependencies
         f.write("\n# Development dependencies\n")
         dev_packages = [
             'pytest',
+            'pytest-benchmark',
+            'fakeredis',
             'pylint',
             'black',
             'autopep8'
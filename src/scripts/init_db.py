@@ -60,10 +60,17 @@ def reset_database():
             close_requested_at TIMESTAMP WITH TIME ZONE,
             execution_time_ms INTEGER,
             
+            execution_mode VARCHAR(20) DEFAULT 'standard',
+            provisional_sent_at TIMESTAMP WITH TIME ZONE,
+            confirmed_at TIMESTAMP WITH TIME ZONE,
+            reversed_at TIMESTAMP WITH TIME ZONE,
+            reversal_reason TEXT,
+            
             tv_request JSONB,
             tv_response JSONB,
             execution_data JSONB,
             mt5_response JSONB,
+            latency_trace JSONB,
             
             created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP WITH TIME ZONE,
@@ -132,7 +139,46 @@ def reset_database():
         if 'conn' in locals():
             conn.close()
 
+# Columns added after the initial schema; applied in place by --upgrade
+UPGRADE_COLUMNS = [
+    ("execution_mode", "VARCHAR(20) DEFAULT 'standard'"),
+    ("provisional_sent_at", "TIMESTAMP WITH TIME ZONE"),
+    ("confirmed_at", "TIMESTAMP WITH TIME ZONE"),
+    ("reversed_at", "TIMESTAMP WITH TIME ZONE"),
+    ("reversal_reason", "TEXT"),
+    ("latency_trace", "JSONB"),
+]
+
+
+def upgrade_database():
+    """Add any missing columns to an existing trades table without dropping data."""
+    try:
+        conn = psycopg2.connect(
+            host=DB_CONFIG['host'],
+            port=DB_CONFIG['port'],
+            database=DB_CONFIG['database'],
+            user=DB_CONFIG['user'],
+            password=DB_CONFIG['password']
+        )
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        cur = conn.cursor()
+        for name, definition in UPGRADE_COLUMNS:
+            cur.execute(f"ALTER TABLE trades ADD COLUMN IF NOT EXISTS {name} {definition};")
+            print(f"✓ {name}")
+        print("Database upgrade completed successfully!")
+    except Exception as e:
+        print(f"Upgrade failed: {e}")
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+
 if __name__ == "__main__":
+    if '--upgrade' in sys.argv:
+        print("\n=== Upgrading Database ===")
+        upgrade_database()
+        sys.exit(0)
+
     print("\n=== Resetting Database ===")
     confirm = input("This will delete all existing trade data. Continue? (Y/N): ")
     if confirm.lower() == 'y':
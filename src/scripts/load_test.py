@@ -0,0 +1,385 @@
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.insert(0, project_root)
+
+# Load tests always run against the simulated terminal; set before anything imports mt5_api
+os.environ['MT5_BACKEND'] = 'simulator'
+
+from sqlalchemy.engine import make_url
+
+from src.config.mt5_symbol_config import SymbolMapper
+from src.core.interceptor import TV_ACCOUNT_ID, TV_BROKER_URL, TradingViewInterceptor
+from src.services.mt5_api import mt5
+from src.scripts.replay_flows import (
+    _flow_from_record, _format_stats, build_events, drive, harness_trade_handler, scratch_backends, settle_proxy,
+    wait_for_worker, wait_until_ready
+)
+from src.utils.instrument_manager import InstrumentManager
+from src.utils.latency import LatencyHistogram
+from src.utils.tracing import TraceContext
+from src.workers.mt5_worker import MT5Worker
+
+# Majors first; the rest of data/instruments.json fills up larger --instruments counts
+PREFERRED_INSTRUMENTS = (
+    'EURUSD', 'GBPUSD', 'USDJPY', 'AUDUSD', 'USDCAD', 'USDCHF', 'NZDUSD', 'EURJPY',
+    'GBPJPY', 'EURGBP', 'AUDJPY', 'EURAUD', 'XAUUSD', 'BTCUSD'
+)
+
+# TradingView answers order, modify and close requests in about this long
+RESPONSE_SECONDS = 0.03
+
+# Stops and targets sit this many pips from the pinned price so the random walk never invalidates them
+LEVEL_PIPS = 300
+
+
+class TrafficGenerator:
+    """Synthesises TradingView broker traffic as replay_flows JSONL records.
+
+    Orders arrive in bursts at the requested rate. Each one is followed by
+    an `/executions` poll showing the fill after the broker lag, and stays
+    open about `positions / rate` seconds (Little's law keeps roughly
+    `positions` open at once). While open it may get a TP/SL PUT, a TP or
+    SL delete and a partial close before the final close. Execution polls
+    return the whole recent fill history of their instrument, newest first,
+    as TradingView does.
+    """
+
+    def __init__(self, instruments: List[Tuple[str, float]], positions: int, burst: int,
+                 exec_lag_ms: float, qty: float, history: int, min_hold: float, seed: int):
+        self.instruments = instruments
+        self.positions = positions
+        self.burst = burst
+        self.exec_lag = exec_lag_ms / 1000
+        self.qty = qty
+        self.history = history
+        self.min_hold = min_hold
+        self.rng = random.Random(seed)
+        self.base = f"https://{TV_BROKER_URL}/accounts/{TV_ACCOUNT_ID}"
+        self.epoch_ms = int(time.time() * 1000)
+        self.clock = 0.0  # seconds of synthetic time already generated
+        self.next_id = 1
+        # instrument -> fill times (ms) and fills, oldest first
+        self._fill_times: Dict[str, List[int]] = {name: [] for name, _ in instruments}
+        self._fills: Dict[str, List[Dict[str, Any]]] = {name: [] for name, _ in instruments}
+        # instrument -> price the simulated terminal is pinned to
+        self.prices = {name: round(pip_size * 10_000 * 1.1, 6) for name, pip_size in instruments}
+
+    def _id(self) -> str:
+        self.next_id += 1
+        return str(self.next_id)
+
+    def _record(self, at: float, method: str, path: str, body: Optional[Dict[str, str]], response: Any) -> Dict[str, Any]:
+        return {
+            'method': method, 'url': f"{self.base}/{path}", 'headers': {}, 'body': body or '',
+            'started': at, 'status': 200, 'response': response, 'ended': at + RESPONSE_SECONDS
+        }
+
+    def _fill(self, at: float, instrument: str, order_id: str, position_id: str, side: str,
+              qty: float, is_close: bool = False) -> None:
+        fill_ms = self.epoch_ms + int(at * 1000)
+        execution = {
+            'id': self._id(), 'instrument': instrument, 'orderId': order_id, 'positionId': position_id,
+            'price': self.prices[instrument], 'qty': qty, 'side': side, 'time': fill_ms
+        }
+        if is_close:
+            execution['isClose'] = True
+        index = bisect.bisect_right(self._fill_times[instrument], fill_ms)
+        self._fill_times[instrument].insert(index, fill_ms)
+        self._fills[instrument].insert(index, execution)
+
+    def _levels(self, instrument: str, pip_size: float, side: str, pips: float) -> Tuple[str, str]:
+        """(takeProfit, stopLoss) `pips` away from the pinned price."""
+        distance = pips * pip_size
+        price = self.prices[instrument]
+        sign = 1 if side == 'buy' else -1
+        return f"{price + sign * distance:.6g}", f"{price - sign * distance:.6g}"
+
+    def _position(self, at: float, hold: float) -> List[Tuple[Dict[str, Any], Optional[str], float]]:
+        """One order's lifecycle as (record, instrument polled, poll time) entries."""
+        instrument, pip_size = self.rng.choice(self.instruments)
+        side = self.rng.choice(('buy', 'sell'))
+        order_id, position_id = self._id(), self._id()
+        qty = self.qty
+        entries = []
+
+        body = {
+            'instrument': instrument, 'qty': str(qty), 'side': side, 'type': 'market',
+            'currentAsk': str(self.prices[instrument]), 'currentBid': str(self.prices[instrument])
+        }
+        response = {'orderId': order_id}
+        with_levels = self.rng.random() < 0.5
+        if with_levels:
+            body['takeProfit'], body['stopLoss'] = self._levels(instrument, pip_size, side, LEVEL_PIPS)
+            response['takeProfitOrderId'], response['stopLossOrderId'] = self._id(), self._id()
+        entries.append((self._record(at, 'POST', f"orders?locale=en&requestId={order_id}", body,
+                                     {'s': 'ok', 'd': response}), None, 0.0))
+
+        filled = at + RESPONSE_SECONDS
+        self._fill(filled, instrument, order_id, position_id, side, qty)
+        poll = filled + self.exec_lag * self.rng.uniform(0.5, 1.5)
+        entries.append((None, instrument, poll))
+
+        if self.rng.random() < 0.4:
+            take_profit, stop_loss = self._levels(instrument, pip_size, side, LEVEL_PIPS * self.rng.uniform(1.0, 1.5))
+            entries.append((self._record(at + hold * 0.3, 'PUT', f"positions/{position_id}?locale=en",
+                                         {'takeProfit': take_profit, 'stopLoss': stop_loss}, {'s': 'ok'}), None, 0.0))
+        if with_levels and self.rng.random() < 0.3:
+            level = self.rng.choice(('TP', 'SL'))
+            stamp = self.epoch_ms + int((at + hold * 0.5) * 1000)
+            entries.append((self._record(at + hold * 0.5, 'DELETE', f"orders/{order_id}.{level}.{stamp}?locale=en",
+                                         None, {'s': 'ok'}), None, 0.0))
+        close_side = 'sell' if side == 'buy' else 'buy'
+        if self.rng.random() < 0.3:
+            amount = round(qty / 2, 2)
+            entries.append((self._record(at + hold * 0.6, 'DELETE', f"positions/{position_id}?locale=en",
+                                         {'amount': str(amount)}, {'s': 'ok'}), None, 0.0))
+            self._fill(at + hold * 0.6 + RESPONSE_SECONDS, instrument, self._id(), position_id, close_side, amount, True)
+            qty = round(qty - amount, 2)
+        entries.append((self._record(at + hold, 'DELETE', f"positions/{position_id}?locale=en", None, {'s': 'ok'}),
+                        None, 0.0))
+        self._fill(at + hold + RESPONSE_SECONDS, instrument, self._id(), position_id, close_side, qty, True)
+        return entries
+
+    def _poll(self, at: float, instrument: str) -> Dict[str, Any]:
+        now_ms = self.epoch_ms + int(at * 1000)
+        upto = bisect.bisect_right(self._fill_times[instrument], now_ms)
+        history = self._fills[instrument][max(0, upto - self.history):upto][::-1]
+        return self._record(at, 'GET', f"executions?locale=en&instrument={instrument}", None, {'s': 'ok', 'd': history})
+
+    def step(self, rate: float, duration: float) -> Tuple[List[Dict[str, Any]], int]:
+        """Records for `duration` seconds of orders at `rate` per second, plus their lifecycles.
+
+        Returns (records, orders placed). Synthetic time carries over between steps.
+        """
+        start = self.clock
+        hold = max(self.positions / rate, self.min_hold)
+        entries = []
+        orders = 0
+        at = start
+        while at < start + duration:
+            for _ in range(self.burst):
+                entries.extend(self._position(at, hold))
+                orders += 1
+            at += self.burst / rate
+
+        records = [
+            record if record is not None else self._poll(poll_at, instrument)
+            for record, instrument, poll_at in entries
+        ]
+        self.clock = max(record['ended'] for record in records) + 1.0
+        return records, orders
+
+
+def pick_instruments(count: int) -> List[Tuple[str, float]]:
+    """(TradingView name, pip size) for `count` instruments the simulator knows."""
+    manager = InstrumentManager()
+    known = {
+        pair['name']: float(pair['pip_size'])
+        for section in ('instruments', 'custom')
+        for pair in manager.instruments.get(section, {}).get('pairs', [])
+    }
+    names = [name for name in PREFERRED_INSTRUMENTS if name in known]
+    names += sorted(name for name in known if name not in names)
+    if not names:
+        raise ValueError("No instruments in data/instruments.json")
+    return [(name, known[name]) for name in names[:count]]
+
+
+def pin_prices(generator: TrafficGenerator) -> None:
+    """Move each simulated symbol to the price the generator quotes, so its TP/SL levels are valid."""
+    mapper = SymbolMapper()
+    for name, _ in generator.instruments:
+        mt5.set_price(mapper.map_symbol(name), generator.prices[name])
+
+
+def analyse_step(traces: List[TraceContext], rate: float, orders: int, seconds: float,
+                 growth_ms: float) -> Dict[str, Any]:
+    """Fill latency of one step and whether it grew from the first to the last third of the orders."""
+    traces = sorted(traces, key=lambda trace: trace.wall_ms)
+    third = max(1, len(traces) // 3)
+    first, last = LatencyHistogram('first'), LatencyHistogram('last')
+    for trace in traces[:third]:
+        first.record(trace.total_ms())
+    for trace in traces[-third:]:
+        last.record(trace.total_ms())
+    fills = LatencyHistogram('Intercept to fill')
+    for trace in traces:
+        fills.record(trace.total_ms())
+
+    growth = last.percentile(50) - first.percentile(50)
+    missing = orders - len(traces)
+    return {
+        'rate': rate,
+        'orders': orders,
+        'fills': len(traces),
+        'orders_per_sec': len(traces) / seconds if seconds else 0.0,
+        'p50_ms': fills.percentile(50),
+        'p99_ms': fills.percentile(99),
+        'lag_growth_ms': growth,
+        # Lost fills or a fill latency that keeps climbing both mean the pipeline fell behind
+        'saturated': missing > orders * 0.01 or growth > growth_ms,
+        'histogram': fills
+    }
+
+
+def run_ramp(worker: MT5Worker, generator: TrafficGenerator, rates: List[float], duration: float,
+             settle: float, timeout: float, growth_ms: float, results: Dict[str, Any]) -> None:
+    """Proxy side of the load test; runs on its own thread and event loop, then stops the worker."""
+    try:
+        wait_until_ready(worker)
+        pin_prices(generator)
+
+        async def _proxy() -> None:
+            interceptor = TradingViewInterceptor(sync_instruments=False, trade_handler=harness_trade_handler(worker))
+            for rate in rates:
+                records, orders = generator.step(rate, duration)
+                events = build_events([_flow_from_record(record) for record in records])
+                print(f"\n🚀 {rate:g} orders/s for {duration:g}s: {orders} orders, {len(events)} events")
+
+                step_started = datetime.utcnow()
+                await drive(interceptor, events, 1.0)
+                await settle_proxy(interceptor)
+                await asyncio.to_thread(wait_for_worker, worker, settle, timeout)
+
+                traces = [
+                    trace for trace in map(TraceContext.from_wire, worker.db.get_latency_traces(
+                        limit=orders * 2 + 100, since=step_started
+                    )) if trace is not None
+                ]
+                step = analyse_step(traces, rate, orders, duration, growth_ms)
+                results['steps'].append(step)
+                state = "❌ saturated" if step['saturated'] else "✅ keeping up"
+                print(f"{state}: {step['fills']}/{orders} filled, {_format_stats(step['histogram'])}, "
+                      f"lag growth {step['lag_growth_ms']:+.1f}ms")
+                if step['saturated']:
+                    break
+
+        asyncio.run(_proxy())
+    except Exception as e:
+        results['error'] = e
+    finally:
+        worker.handle_shutdown(signal.SIGTERM, None)
+
+
+def sustained_rate(steps: List[Dict[str, Any]]) -> float:
+    """Highest achieved orders/s among the steps that kept up."""
+    return max((step['orders_per_sec'] for step in steps if not step['saturated']), default=0.0)
+
+
+def compare_baseline(path: str, sustained: float, tolerance: float) -> bool:
+    with open(path) as f:
+        baseline = json.load(f)
+    expected = baseline['sustained_orders_per_sec']
+    floor = expected * (1 - tolerance)
+    ok = sustained >= floor
+    print(f"\n{'✅' if ok else '❌'} Sustained {sustained:.1f} orders/s vs baseline {expected:.1f} "
+          f"(allowed down to {floor:.1f})")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ramp synthetic TradingView traffic through the proxy, Redis and the worker on a simulated MT5 "
+                    "until fill latency starts to climb"
+    )
+    parser.add_argument('--instruments', type=int, default=8, help="Instruments traded")
+    parser.add_argument('--positions', type=int, default=50, help="Positions kept open at once")
+    parser.add_argument('--burst', type=int, default=5, help="Orders placed together in each burst")
+    parser.add_argument('--exec-lag-ms', type=float, default=250.0, help="Mean delay before a fill shows in /executions")
+    parser.add_argument('--history', type=int, default=100, help="Fills returned per /executions poll")
+    parser.add_argument('--qty', type=float, default=0.1, help="Lots per order")
+    parser.add_argument('--min-hold', type=float, default=2.0, help="Shortest time a position stays open (s)")
+    parser.add_argument('--start-rate', type=float, default=5.0, help="First offered rate (orders/s)")
+    parser.add_argument('--factor', type=float, default=1.5, help="Rate multiplier between steps")
+    parser.add_argument('--max-rate', type=float, default=500.0, help="Stop ramping past this rate")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds of orders per step")
+    parser.add_argument('--growth-ms', type=float, default=100.0,
+                        help="Fill latency rise within a step that counts as falling behind")
+    parser.add_argument('--settle', type=float, default=2.0, help="Seconds the worker must be idle after a step")
+    parser.add_argument('--timeout', type=float, default=120.0, help="Upper bound on waiting for the worker per step")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--baseline', help="Baseline JSON to compare the sustained rate against")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="Allowed drop below the baseline (fraction)")
+    parser.add_argument('--save-baseline', help="Write this run's results as the new baseline")
+    parser.add_argument('--db-url', help="Scratch database for the run (default: a throwaway sqlite file)")
+    parser.add_argument('--queue-prefix', help="Redis key prefix for the run (default: unique to this run)")
+    args = parser.parse_args()
+
+    try:
+        db_url, queue_prefix = scratch_backends('load-test', args.db_url, args.queue_prefix)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    rates = []
+    rate = args.start_rate
+    while rate <= args.max_rate:
+        rates.append(round(rate, 2))
+        rate *= args.factor
+
+    generator = TrafficGenerator(
+        pick_instruments(args.instruments), args.positions, args.burst, args.exec_lag_ms,
+        args.qty, args.history, args.min_hold, args.seed
+    )
+    print(f"\n🔥 Load test: {len(generator.instruments)} instruments, ~{args.positions} open positions, "
+          f"bursts of {args.burst}, {args.exec_lag_ms:g}ms fill lag, {len(rates)} steps up to {rates[-1]:g} orders/s")
+
+    # The worker installs signal handlers, so it keeps the main thread; the proxy side gets its own
+    print(f"🗄  Database: {make_url(db_url).render_as_string(hide_password=True)}, Redis prefix: {queue_prefix}")
+    worker = MT5Worker(tradingview_dry_run=True, db_url=db_url, queue_prefix=queue_prefix)
+    results: Dict[str, Any] = {'steps': []}
+    ramp = threading.Thread(
+        target=run_ramp,
+        args=(worker, generator, rates, args.duration, args.settle, args.timeout, args.growth_ms, results),
+        name='load-test',
+        daemon=True
+    )
+    ramp.start()
+    worker.run()
+    ramp.join()
+
+    if 'error' in results:
+        print(f"\n❌ Load test failed: {results['error']}")
+        sys.exit(1)
+
+    steps = results['steps']
+    print(f"\n📊 Load test results")
+    print(f"{'Offered':>8} {'Filled/s':>9} {'Fills':>11} {'p50 (ms)':>9} {'p99 (ms)':>9} {'Growth':>9}")
+    for step in steps:
+        print(f"{step['rate']:>8g} {step['orders_per_sec']:>9.1f} {step['fills']:>5}/{step['orders']:<5} "
+              f"{step['p50_ms']:>9.1f} {step['p99_ms']:>9.1f} {step['lag_growth_ms']:>+9.1f}"
+              f"{'  ❌' if step['saturated'] else ''}")
+    sustained = sustained_rate(steps)
+    print(f"⚡ Sustained: {sustained:.1f} orders/s")
+
+    if args.save_baseline:
+        report = {
+            'sustained_orders_per_sec': sustained,
+            'profile': {key: value for key, value in vars(args).items()
+                        if key not in ('baseline', 'save_baseline', 'db_url', 'queue_prefix')},
+            'steps': [{key: value for key, value in step.items() if key != 'histogram'} for step in steps]
+        }
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Baseline written to {args.save_baseline}")
+
+    if args.baseline and not compare_baseline(args.baseline, sustained, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
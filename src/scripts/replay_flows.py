@@ -0,0 +1,301 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.insert(0, project_root)
+
+# Replays always run against the simulated terminal; set before anything imports mt5_api
+os.environ['MT5_BACKEND'] = 'simulator'
+
+from mitmproxy import connection, http, io
+from sqlalchemy.engine import make_url
+
+from src.config.queue_config import QUEUE_CONFIG
+from src.core.interceptor import TradingViewInterceptor
+from src.core.trade_handler import EXECUTIONS_MATCHED, ORDERS_INTERCEPTED, TradeHandler
+from src.models.database import Base
+from src.services.mt5_api import ORDER_SEND_LATENCY
+from src.utils.database_handler import WRITE_LATENCY, DatabaseHandler
+from src.utils.queue_handler import PUBLISH_LATENCY, RedisQueue
+from src.utils.tracing import TraceContext, stage_histograms
+from src.workers.mt5_worker import MT5Worker
+
+# (seconds since the first flow, 'request' | 'response', flow)
+ReplayEvent = Tuple[float, str, http.HTTPFlow]
+
+
+def scratch_backends(name: str, db_url: Optional[str], queue_prefix: Optional[str]) -> Tuple[str, str]:
+    """Database URL and Redis key prefix for a harness run, never the live ones from .env.
+
+    Without --db-url the run gets a throwaway sqlite file; without --queue-prefix
+    it gets a prefix unique to this run.
+    """
+    if db_url is None:
+        db_url = f"sqlite:///{Path(tempfile.mkdtemp(prefix=f'{name}-')) / f'{name}.db'}"
+    else:
+        url = make_url(db_url)
+        live = (os.getenv('DB_HOST'), os.getenv('DB_PORT'), os.getenv('DB_NAME'))
+        if url.get_backend_name() == 'postgresql' and (url.host, str(url.port or 5432), url.database) == \
+                (live[0], live[1] or '5432', live[2]):
+            raise ValueError(f"--db-url points at the live database {url.database} from .env")
+
+    if queue_prefix is None:
+        queue_prefix = f"{name}:{uuid.uuid4().hex[:8]}:"
+    elif not queue_prefix or queue_prefix == QUEUE_CONFIG['key_prefix']:
+        raise ValueError("--queue-prefix must differ from REDIS_KEY_PREFIX so the live worker never sees replayed trades")
+
+    handler = DatabaseHandler(db_url)
+    Base.metadata.create_all(bind=handler.engine)
+    handler.engine.dispose()
+    return db_url, queue_prefix
+
+
+def harness_trade_handler(worker: MT5Worker) -> TradeHandler:
+    """Proxy-side handler on the worker's database and queue namespace; call inside the proxy loop."""
+    return TradeHandler(db=DatabaseHandler(worker.db_url), queue=RedisQueue(key_prefix=worker.queue_prefix))
+
+
+def _flow_from_record(record: Dict[str, Any]) -> http.HTTPFlow:
+    """Build a flow from one JSONL record.
+
+    {"method", "url", "headers", "body", "started", "status", "response", "ended"}
+    `body` is a form string or a dict of form fields; `response` is the JSON
+    body (object or string) or null for a request that got no response.
+    """
+    headers = dict(record.get('headers') or {})
+    body = record.get('body') or ''
+    if isinstance(body, dict):
+        body = urlencode(body)
+    if body and not any(name.lower() == 'content-type' for name in headers):
+        headers['content-type'] = 'application/x-www-form-urlencoded'
+
+    started = float(record.get('started') or 0.0)
+    request = http.Request.make(record['method'], record['url'], body, headers)
+    request.timestamp_start = request.timestamp_end = started
+
+    flow = http.HTTPFlow(
+        connection.Client(peername=('127.0.0.1', 0), sockname=('127.0.0.1', 8080), timestamp_start=started),
+        connection.Server(address=(request.host, request.port))
+    )
+    flow.request = request
+
+    if record.get('response') is not None:
+        content = record['response']
+        if not isinstance(content, str):
+            content = json.dumps(content)
+        flow.response = http.Response.make(
+            record.get('status', 200), content, {'content-type': 'application/json'}
+        )
+        flow.response.timestamp_start = flow.response.timestamp_end = float(record.get('ended') or started)
+    return flow
+
+
+def load_flows(path: str) -> List[http.HTTPFlow]:
+    """HTTP flows from a mitmproxy dump (`mitmdump -w`) or a JSONL of request/response records."""
+    if path.endswith('.jsonl'):
+        with open(path) as f:
+            return [_flow_from_record(json.loads(line)) for line in f if line.strip()]
+    with open(path, 'rb') as f:
+        return [flow for flow in io.FlowReader(f).stream() if isinstance(flow, http.HTTPFlow)]
+
+
+def build_events(flows: List[http.HTTPFlow]) -> List[ReplayEvent]:
+    """Request and response hooks in the order the proxy originally saw them."""
+    events = []
+    for flow in flows:
+        # Captured tokens must never replace the stored TradingView token
+        flow.request.headers.pop('authorization', None)
+        requested = flow.request.timestamp_start or 0.0
+        events.append((requested, 'request', flow))
+        if flow.response is not None:
+            responded = flow.response.timestamp_end or flow.response.timestamp_start or requested
+            events.append((max(responded, requested), 'response', flow))
+    events.sort(key=lambda event: event[0])
+    origin = events[0][0] if events else 0.0
+    return [(at - origin, hook, flow) for at, hook, flow in events]
+
+
+async def drive(interceptor: TradingViewInterceptor, events: List[ReplayEvent], speed: Optional[float]) -> float:
+    """Call request()/response() on schedule; speed=None replays as fast as possible.
+
+    Returns the seconds it took to issue every event.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for offset, hook, flow in events:
+        if speed:
+            delay = started + offset / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        getattr(interceptor, hook)(flow)
+        # Let the handler tasks reach their first await, as they would between live flows
+        await asyncio.sleep(0)
+    return loop.time() - started
+
+
+async def settle_proxy(interceptor: TradingViewInterceptor) -> None:
+    """Wait for the handler tasks the hooks spawned, then for the journal to reach Postgres."""
+    journal = interceptor.trade_handler.journal
+    while True:
+        pending = [
+            task for task in asyncio.all_tasks()
+            if task is not asyncio.current_task() and task is not journal._flusher
+        ]
+        if not pending:
+            break
+        await asyncio.wait(pending)
+    await journal.drain()
+
+
+async def _worker_progress(worker: MT5Worker) -> Tuple[int, bool]:
+    """(jobs started, busy) read on the worker's own loop."""
+    scheduler = worker.scheduler
+    return scheduler.wait_latency.count, bool(scheduler.running or scheduler.stats()['queued'])
+
+
+def wait_for_worker(worker: MT5Worker, settle: float, timeout: float) -> float:
+    """Block until the worker has been idle for `settle` seconds; returns the monotonic time of its last job."""
+    deadline = time.monotonic() + timeout
+    last_count, last_change = -1, time.monotonic()
+    while time.monotonic() < deadline:
+        count, busy = asyncio.run_coroutine_threadsafe(_worker_progress(worker), worker.loop).result(5)
+        if count != last_count or busy:
+            last_count, last_change = count, time.monotonic()
+        elif time.monotonic() - last_change >= settle:
+            break
+        time.sleep(0.05)
+    return last_change
+
+
+def wait_until_ready(worker: MT5Worker, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if worker.loop is not None and worker.mt5 is not None and worker.mt5.initialized and worker.loop.is_running():
+            return
+        time.sleep(0.05)
+    raise TimeoutError("Worker did not connect to the simulated terminal")
+
+
+def run_pipeline(worker: MT5Worker, events: List[ReplayEvent], speed: Optional[float],
+                 settle: float, timeout: float, results: Dict[str, Any]) -> None:
+    """Proxy side of the replay; runs on its own thread and event loop, then stops the worker."""
+    try:
+        wait_until_ready(worker)
+        replay_started = datetime.utcnow()
+        started = time.monotonic()
+
+        async def _proxy() -> float:
+            interceptor = TradingViewInterceptor(sync_instruments=False, trade_handler=harness_trade_handler(worker))
+            elapsed = await drive(interceptor, events, speed)
+            await settle_proxy(interceptor)
+            return elapsed
+
+        results['drive_seconds'] = asyncio.run(_proxy())
+        last_job = wait_for_worker(worker, settle, timeout)
+        results['elapsed_seconds'] = max(last_job - started, results['drive_seconds'])
+        results['traces'] = [
+            trace for trace in map(TraceContext.from_wire, worker.db.get_latency_traces(
+                limit=max(len(events), 100), since=replay_started
+            )) if trace is not None
+        ]
+    except Exception as e:
+        results['error'] = e
+    finally:
+        worker.handle_shutdown(signal.SIGTERM, None)
+
+
+def _format_stats(histogram) -> str:
+    stats = histogram.summary()
+    return (f"n={stats['count']} p50={stats['p50']:.2f}ms p90={stats['p90']:.2f}ms "
+            f"p99={stats['p99']:.2f}ms max={stats['max']:.2f}ms")
+
+
+def print_report(results: Dict[str, Any], flow_count: int) -> None:
+    if 'error' in results:
+        print(f"\n❌ Replay failed: {results['error']}")
+        return
+
+    orders = ORDERS_INTERCEPTED.total()
+    elapsed = results['elapsed_seconds']
+    print(f"\n📊 Replay of {flow_count} flows")
+    print(f"Issued in   : {results['drive_seconds']:.2f}s")
+    print(f"Settled in  : {elapsed:.2f}s")
+    print(f"Orders      : {orders:.0f} intercepted, {EXECUTIONS_MATCHED.total():.0f} executions matched")
+    print(f"Fills traced: {len(results['traces'])}")
+    if elapsed > 0:
+        print(f"Throughput  : {orders / elapsed:.1f} orders/s")
+
+    print("\n⏱  Per-stage latency (traced fills)")
+    if results['traces']:
+        for histogram in stage_histograms(results['traces']).values():
+            print(f"   {histogram.format_summary()}")
+    else:
+        print("   No traced fills")
+
+    print("\n⚡ Hot paths")
+    for metric in (PUBLISH_LATENCY, WRITE_LATENCY, ORDER_SEND_LATENCY):
+        for labels, histogram in metric.series():
+            name = ','.join(f"{key}={value}" for key, value in labels.items())
+            print(f"   {metric.name}{{{name}}}: {_format_stats(histogram)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay captured TradingView traffic through the proxy, Redis and the worker on a simulated MT5"
+    )
+    parser.add_argument('capture', help="mitmproxy dump (mitmdump -w) or .jsonl of request/response records")
+    timing = parser.add_mutually_exclusive_group()
+    timing.add_argument('--speed', type=float, default=1.0, help="Multiple of the original pacing (default 1.0)")
+    timing.add_argument('--max', action='store_true', help="Ignore the original pacing and replay as fast as possible")
+    parser.add_argument('--settle', type=float, default=2.0, help="Seconds the worker must be idle before stopping")
+    parser.add_argument('--timeout', type=float, default=120.0, help="Upper bound on waiting for the worker")
+    parser.add_argument('--db-url', help="Scratch database for the run (default: a throwaway sqlite file)")
+    parser.add_argument('--queue-prefix', help="Redis key prefix for the run (default: unique to this run)")
+    args = parser.parse_args()
+
+    try:
+        db_url, queue_prefix = scratch_backends('replay', args.db_url, args.queue_prefix)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    flows = load_flows(args.capture)
+    events = build_events(flows)
+    if not events:
+        print("❌ No HTTP flows in capture")
+        sys.exit(1)
+
+    pacing = "as fast as possible" if args.max else f"{args.speed:g}x original pacing"
+    print(f"\n🔁 Replaying {len(flows)} flows ({pacing}) against the simulated terminal")
+    print(f"🗄  Database: {make_url(db_url).render_as_string(hide_password=True)}, Redis prefix: {queue_prefix}")
+
+    # The worker installs signal handlers, so it keeps the main thread; the proxy side gets its own
+    worker = MT5Worker(tradingview_dry_run=True, db_url=db_url, queue_prefix=queue_prefix)
+    results: Dict[str, Any] = {}
+    replay = threading.Thread(
+        target=run_pipeline,
+        args=(worker, events, None if args.max else args.speed, args.settle, args.timeout, results),
+        name='replay',
+        daemon=True
+    )
+    replay.start()
+    worker.run()
+    replay.join()
+    print_report(results, len(flows))
+
+
+if __name__ == "__main__":
+    main()
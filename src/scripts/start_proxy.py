@@ -8,6 +8,11 @@ from pathlib import Path
 import psutil
 from dotenv import load_dotenv
 
+# Add project root to Python path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from src.config.metrics_config import METRICS_CONFIG
+
 
 def kill_process_on_port(port):
     """Kill process running on specified port."""
@@ -46,6 +51,8 @@ def cleanup():
     """Cleanup on exit."""
     kill_mitm_processes()
     kill_process_on_port(8080)
+    if METRICS_CONFIG['proxy_port']:
+        kill_process_on_port(METRICS_CONFIG['proxy_port'])
 
 def signal_handler(signum, frame):
     """Handle termination signals."""
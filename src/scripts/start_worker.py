@@ -9,6 +9,8 @@ from pathlib import Path
 project_root = str(Path(__file__).parent.parent.parent)  # One more parent to reach root
 sys.path.insert(0, project_root)
 
+from src.config.metrics_config import METRICS_CONFIG
+from src.utils.metrics import start_metrics_server
 from src.utils.ssl_handler import silence_ssl_warnings
 from src.workers.mt5_worker import MT5Worker
 
@@ -64,6 +66,9 @@ def main():
         
         # Silence SSL warnings
         silence_ssl_warnings()
+
+        # Prometheus endpoint for the worker
+        start_metrics_server(METRICS_CONFIG['worker_port'], METRICS_CONFIG['host'])
         
         # Initialize and start worker
         worker = MT5Worker()
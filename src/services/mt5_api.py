@@ -0,0 +1,30 @@
+# The MetaTrader5 module this process talks to. Import `mt5` from here rather
+# than importing MetaTrader5 directly: with MT5_BACKEND=simulator it is an
+# in-process SimulatedTerminal, so the worker runs on Linux without a terminal.
+import time
+
+from src.config.simulator_config import SIMULATOR_CONFIG
+from src.utils.metrics import REGISTRY
+
+if SIMULATOR_CONFIG['enabled']:
+    from src.services.mt5_simulator import SimulatedTerminal
+
+    mt5 = SimulatedTerminal.from_config(SIMULATOR_CONFIG)
+else:
+    import MetaTrader5 as mt5
+
+ORDER_SEND_LATENCY = REGISTRY.histogram(
+    'tvcopier_mt5_order_send_ms', 'mt5.order_send round trip by operation and retcode', ('op', 'retcode')
+)
+
+
+def timed_order_send(request: dict, op: str):
+    """mt5.order_send, recording its latency under `op` and the returned retcode."""
+    started = time.perf_counter()
+    result = mt5.order_send(request)
+    retcode = result.retcode if result is not None else 'none'
+    ORDER_SEND_LATENCY.observe((time.perf_counter() - started) * 1000, op=op, retcode=retcode)
+    return result
+
+
+__all__ = ['mt5', 'timed_order_send']
@@ -0,0 +1,139 @@
+import asyncio
+import itertools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from enum import IntEnum
+from typing import Any, Callable, Dict, Optional
+
+from src.utils.latency import LatencyHistogram
+
+logger = logging.getLogger('MT5Executor')
+
+
+class Priority(IntEnum):
+    """Lower runs first; commands of equal priority run in submission order."""
+    TRADE = 0       # new orders, closes, (re)connect
+    UPDATE = 1      # user TP/SL updates, order preparation
+    TRAILING = 2    # trailing stop modifies and their read-back
+    POLL = 3        # position reconciliation polls
+    BACKGROUND = 4  # cache prewarming
+
+
+class MT5Executor:
+    """The only thread that talks to the MetaTrader5 terminal.
+
+    The MetaTrader5 module is a process-wide IPC client, so every terminal
+    call in a process is funnelled through one thread fed by a priority
+    queue: orders and closes overtake trailing modifies and polls instead of
+    contending with them for the IPC channel. Each command is timed from
+    submission to start (queue wait) and from start to finish (terminal
+    time), per command name.
+    """
+
+    def __init__(self, name: str = 'mt5-executor'):
+        self.name = name
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.wait_latency: Dict[str, LatencyHistogram] = {}
+        self.run_latency: Dict[str, LatencyHistogram] = {}
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def submit(self, priority: Priority, name: str, fn: Callable, *args, **kwargs) -> Future:
+        """Queue fn(*args, **kwargs) for the executor thread."""
+        future: Future = Future()
+        if threading.current_thread() is self._thread:
+            # Already on the terminal thread (nested call): run inline to avoid deadlock
+            self._execute(name, fn, args, kwargs, future, time.perf_counter())
+            return future
+        self._ensure_started()
+        self._queue.put((int(priority), next(self._sequence), name, fn, args, kwargs, future, time.perf_counter()))
+        return future
+
+    async def run(self, priority: Priority, name: str, fn: Callable, *args, **kwargs) -> Any:
+        """Await fn(*args, **kwargs) on the executor thread."""
+        return await asyncio.wrap_future(self.submit(priority, name, fn, *args, **kwargs))
+
+    def call(self, priority: Priority, name: str, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn on the executor thread and block until it returns (sync callers only)."""
+        return self.submit(priority, name, fn, *args, **kwargs).result()
+
+    def _histogram(self, table: Dict[str, LatencyHistogram], name: str) -> LatencyHistogram:
+        histogram = table.get(name)
+        if histogram is None:
+            histogram = table[name] = LatencyHistogram(name)
+        return histogram
+
+    def _execute(self, name: str, fn: Callable, args: tuple, kwargs: dict, future: Future, submitted: float) -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        started = time.perf_counter()
+        self._histogram(self.wait_latency, name).record((started - submitted) * 1000)
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            self._histogram(self.run_latency, name).record((time.perf_counter() - started) * 1000)
+
+    def _run(self) -> None:
+        while True:
+            _, _, name, fn, args, kwargs, future, submitted = self._queue.get()
+            if fn is None:
+                break
+            try:
+                self._execute(name, fn, args, kwargs, future, submitted)
+            except Exception as e:
+                logger.error(f"Error running MT5 command {name}: {e}")
+
+    @property
+    def depth(self) -> int:
+        """Commands waiting for the terminal."""
+        return self._queue.qsize()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Queue wait and terminal time per command name."""
+        return {
+            name: {
+                'wait': self.wait_latency[name].summary(),
+                'run': histogram.summary()
+            }
+            for name, histogram in self.run_latency.items()
+        }
+
+    def format_stats(self) -> str:
+        """Table of queue wait and terminal time (ms) per command."""
+        lines = [f"{'Command':<20} {'n':>7} {'wait p50':>9} {'wait p99':>9} {'run p50':>9} {'run p99':>9}"]
+        for name, stats in sorted(self.stats().items()):
+            wait, run = stats['wait'], stats['run']
+            if not run['count']:
+                continue
+            lines.append(
+                f"{name:<20} {run['count']:>7} {wait['p50']:>9.2f} {wait['p99']:>9.2f} "
+                f"{run['p50']:>9.2f} {run['p99']:>9.2f}"
+            )
+        return "\n".join(lines)
+
+    def shutdown(self, timeout: float = 2.0) -> None:
+        """Finish queued commands, then stop the thread."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._queue.put((len(Priority) + 1, next(self._sequence), 'shutdown', None, (), {}, None, time.perf_counter()))
+        self._thread.join(timeout=timeout)
+
+
+# Shared by everything in this process that calls the MetaTrader5 module
+MT5_EXECUTOR = MT5Executor()
@@ -1,77 +1,84 @@
 import asyncio
 import logging
-import time
 from datetime import datetime
-from typing import Any, Callable, Dict, Optional
-
-import MetaTrader5 as mt5
+from typing import Any, Callable, Dict, Optional, Tuple
 
 from src.config.mt5_symbol_config import SymbolMapper
+from src.services.mt5_api import mt5, timed_order_send
+from src.services.mt5_executor import MT5_EXECUTOR, Priority
+from src.services.mt5_supervisor import MT5ConnectionSupervisor
+from src.services.sl_coalescer import StopLossCoalescer
+from src.services.symbol_cache import SymbolMetadataCache, filling_type_for
+from src.services.trailing_stop_registry import TrailingStopRegistry
 from src.utils.database_handler import DatabaseHandler
 from src.utils.instrument_manager import InstrumentManager
+from src.utils.tracing import TraceContext
 
 logger = logging.getLogger('MT5Service')
 
 class MT5Service:
-    def __init__(self, account: int, password: str, server: str,db_handler: DatabaseHandler = None):
+    def __init__(self, account: int, password: str, server: str,db_handler: DatabaseHandler = None,
+                 symbol_cache_ttl: float = 4 * 3600, heartbeat_interval: float = 5.0,
+                 reconnect_backoff_max: float = 30.0, connect_timeout: float = 5.0):
         self.account = account
         self.password = password
         self.server = server
-        self.initialized = False
-        self.last_init_time = 0
-        self.init_cooldown = 1  
         self.loop = None
         self.symbol_mapper = SymbolMapper()
         self.running = True
         self.db = db_handler
         self.instrument_manager = InstrumentManager()
+        self.trailing_stops = TrailingStopRegistry()
+        self.symbols = SymbolMetadataCache(ttl_seconds=symbol_cache_ttl)
+        self.sl_coalescer = StopLossCoalescer(self.symbols)
+        self._templates: Dict[Tuple[str, bool], Tuple[Any, Dict[str, Any]]] = {}  # (instrument, is_buy) -> (metadata, request)
+        self.connect_timeout = connect_timeout
+        self.supervisor = MT5ConnectionSupervisor(
+            self._connect,
+            heartbeat_interval=heartbeat_interval,
+            backoff_max=reconnect_backoff_max
+        )
     
     def set_loop(self, loop: asyncio.AbstractEventLoop):
         """Set the event loop for this service."""
         self.loop = loop
 
-    def _init(self):
-                """Internal method for MT5 initialization."""
-                try:
-                    # Handle cooldown period
-                    current_time = time.time()
-                    if current_time - self.last_init_time < self.init_cooldown:
-                        time.sleep(self.init_cooldown)
-                    
-                    # Check if already initialized
-                    if self.initialized and mt5.account_info() is not None:
-                        return True
-                    
-                    # Initialize MT5 connection
-                    self.initialized = False
-                    if not mt5.initialize():
-                        logger.error(f"MT5 initialization failed: {mt5.last_error()}")
-                        return False
-                    
-                    # Login to MT5
-                    if not mt5.login(self.account, password=self.password, server=self.server):
-                        logger.error(f"MT5 login failed: {mt5.last_error()}")
-                        mt5.shutdown()
-                        return False
-                    
-                    # Verify account info
-                    account_info = mt5.account_info()
-                    if not account_info:
-                        logger.error("Could not get account info")
-                        mt5.shutdown()
-                        return False
-                    
-                    self.initialized = True
-                    self.last_init_time = current_time
-                    print(f"✅ MT5 Connected: {account_info.login} ({account_info.server})")
-                    return True
-                    
-                except Exception as e:
-                    logger.error(f"Error initializing MT5: {e}")
-                    self.initialized = False
-                    return False
+    def _connect(self) -> bool:
+        """Initialize and log in to the terminal; run by the connection supervisor."""
+        try:
+            # Initialize MT5 connection
+            if not mt5.initialize():
+                logger.error(f"MT5 initialization failed: {mt5.last_error()}")
+                return False
+
+            # Login to MT5
+            if not mt5.login(self.account, password=self.password, server=self.server):
+                logger.error(f"MT5 login failed: {mt5.last_error()}")
+                mt5.shutdown()
+                return False
+
+            # Verify account info
+            account_info = mt5.account_info()
+            if not account_info:
+                logger.error("Could not get account info")
+                mt5.shutdown()
+                return False
+
+            print(f"✅ MT5 Connected: {account_info.login} ({account_info.server})")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error initializing MT5: {e}")
+            return False
+
+    @property
+    def initialized(self) -> bool:
+        """Whether the terminal is connected, as last seen by the supervisor; never blocks."""
+        return self.supervisor.is_ready
 
-                # return await self.loop.run_in_executor(None, _init)
+    async def _wait_ready(self) -> bool:
+        """True once connected, waiting up to `connect_timeout` during a reconnect."""
+        return self.supervisor.is_ready or await self.supervisor.wait_ready(self.connect_timeout)
 
     async def _retry_operation(self, operation: Callable, max_retries: int = 3) -> Any:
         """Retry an operation with exponential backoff."""
@@ -87,46 +94,94 @@ class MT5Service:
                 await asyncio.sleep(wait_time)
 
     async def async_initialize(self) -> bool:
-        """Initialize MT5 connection with cooldown asynchronously."""
+        """Connect to MT5 unless the supervisor already holds a connection."""
         if not self.loop:
             self.loop = asyncio.get_event_loop()
-        return await self._retry_operation(lambda: self.loop.run_in_executor(None, self._init))
+        return await self.supervisor.connect()
      
     def map_symbol(self, tv_symbol: str) -> str:
         """Map TradingView symbol to MT5 symbol."""
         return self.symbol_mapper.map_symbol(tv_symbol)
 
+    def _order_template(self, instrument: str, is_buy: bool) -> Optional[Dict[str, Any]]:
+        """Market order request with every static field set, cached per (instrument, side).
+
+        Rebuilt whenever the symbol metadata it was built from expires or is
+        invalidated. Callers copy it and add volume, price, TP, SL and comment.
+        """
+        key = (instrument, is_buy)
+        cached = self._templates.get(key)
+        if cached is not None:
+            metadata, template = cached
+            if self.symbols.get(template["symbol"]) is metadata:
+                return template
+
+        mt5_symbol = self.map_symbol(instrument)
+        metadata = self.symbols.get(mt5_symbol)
+        if metadata is None:
+            self._templates.pop(key, None)
+            return None
+        template = {
+            "action": mt5.TRADE_ACTION_DEAL,
+            "symbol": mt5_symbol,
+            "type": mt5.ORDER_TYPE_BUY if is_buy else mt5.ORDER_TYPE_SELL,
+            "deviation": 20,
+            "magic": 234000,
+            "type_time": mt5.ORDER_TIME_GTC,
+        }
+        # Only add filling type if we determined it should be set
+        if metadata.filling_type is not None:
+            template["type_filling"] = metadata.filling_type
+        self._templates[key] = (metadata, template)
+        return template
+
+    def prepare(self, instrument: str, side: Optional[str] = None) -> bool:
+        """Select the symbol and build its order templates ahead of the fill."""
+        sides = (side.lower() == 'buy',) if side else (True, False)
+        return all(self._order_template(instrument, is_buy) is not None for is_buy in sides)
+
+    async def async_prepare(self, instrument: str, side: Optional[str] = None) -> bool:
+        """Warm up an instrument off the event loop; called when TradingView accepts an order."""
+        if not self.loop:
+            self.loop = asyncio.get_event_loop()
+        if not self.initialized:
+            # A hint only: not worth waiting for a reconnect
+            return False
+        try:
+            return await MT5_EXECUTOR.run(Priority.UPDATE, 'prepare', self.prepare, instrument, side)
+        except Exception as e:
+            logger.error(f"Error preparing {instrument}: {e}")
+            return False
+
+    def _prewarm_symbols(self) -> int:
+        """Select and cache every instrument listed in data/instruments.json."""
+        names = [
+            pair['name']
+            for section in ('instruments', 'custom')
+            for pair in self.instrument_manager.instruments.get(section, {}).get('pairs', [])
+        ]
+        return self.symbols.prewarm(self.map_symbol(name) for name in names)
+
+    async def async_prewarm_symbols(self) -> None:
+        """Prewarm the symbol metadata cache off the event loop."""
+        if not self.loop:
+            self.loop = asyncio.get_event_loop()
+        try:
+            loaded = await MT5_EXECUTOR.run(Priority.BACKGROUND, 'prewarm_symbols', self._prewarm_symbols)
+            print(f"📚 Cached metadata for {loaded} symbols")
+        except Exception as e:
+            logger.error(f"Error prewarming symbol cache: {e}")
+
     def _get_filling_type(self, symbol_info) -> Optional[int]:
         """Get appropriate filling type for symbol."""
         try:
-            filling_modes = symbol_info.filling_mode
-            
-            # Don't set filling type if only one mode is supported
-            if filling_modes == 1:
-                return None
-                
-            # Try different filling modes
-            if filling_modes & mt5.ORDER_FILLING_FOK:
-                filling_type = mt5.ORDER_FILLING_FOK
-            elif filling_modes & mt5.ORDER_FILLING_IOC:
-                filling_type = mt5.ORDER_FILLING_IOC
-            elif filling_modes & mt5.ORDER_FILLING_RETURN:
-                filling_type = mt5.ORDER_FILLING_RETURN
-            else:
-                return None
-
-            return filling_type
-            
+            return filling_type_for(symbol_info)
         except Exception as e:
             logger.error(f"Error determining filling type: {e}")
             return None
 
-    def _execute_order(self, trade_data: Dict[str, Any]) -> Dict[str, Any]:
+    def _execute_order(self, trade_data: Dict[str, Any], trace: Optional[TraceContext] = None) -> Dict[str, Any]:
             try:
-                # Initialize MT5
-                if not self.initialized and not mt5.initialize():
-                    return {"error": "MT5 initialization failed"}
-
                 # Extract trade details
                 execution_data = trade_data.get('execution_data', {})
                 instrument = trade_data.get('instrument') or execution_data.get('instrument')
@@ -139,41 +194,26 @@ class MT5Service:
                 if not all([instrument, side, quantity]):
                     return {"error": "Missing required fields"}
                     
-                # Map symbol and enable for trading
-                mt5_symbol = self.map_symbol(instrument)
-                if not mt5.symbol_select(mt5_symbol, True):
-                    return {"error": f"Failed to select symbol {mt5_symbol}"}
+                # Static request fields come from the (symbol, side) template
+                is_buy = side.lower() == 'buy'
+                template = self._order_template(instrument, is_buy)
+                if template is None:
+                    return {"error": f"Failed to select symbol {self.map_symbol(instrument)}"}
+                mt5_symbol = template["symbol"]
                 
-                # Get symbol info
-                symbol_info = mt5.symbol_info(mt5_symbol)
-                if not symbol_info:
-                    return {"error": f"Failed to get symbol info for {mt5_symbol}"}
+                # Only the live price is fetched per order
+                tick = mt5.symbol_info_tick(mt5_symbol)
+                if not tick:
+                    return {"error": f"Failed to get price for {mt5_symbol}"}
                 
-                # Prepare order parameters
-                is_buy = side.lower() == 'buy'
-                order_type = mt5.ORDER_TYPE_BUY if is_buy else mt5.ORDER_TYPE_SELL
-                price = symbol_info.ask if is_buy else symbol_info.bid
+                price = tick.ask if is_buy else tick.bid
                 position_id = trade_data.get('execution_data', {}).get('positionId', 'unknown')
 
-                # Get supported filling modes
-                filling_type = self._get_filling_type(symbol_info)
-
-                # Construct order request
-                request = {
-                    "action": mt5.TRADE_ACTION_DEAL,
-                    "symbol": mt5_symbol,
-                    "volume": quantity,
-                    "type": order_type,
-                    "price": price,
-                    "deviation": 20,
-                    "magic": 234000,
-                    "comment": f"TV#{position_id}",
-                    "type_time": mt5.ORDER_TIME_GTC,
-                }
-
-                # Only add filling type if we determined it should be set
-                if filling_type is not None:
-                    request["type_filling"] = filling_type
+                # Fill in the per-order fields
+                request = dict(template)
+                request["volume"] = quantity
+                request["price"] = price
+                request["comment"] = f"TV#{position_id}"
                 
                 # Add TP/SL if provided
                 if take_profit is not None:
@@ -182,9 +222,14 @@ class MT5Service:
                     request["sl"] = float(stop_loss)
 
                 # Send order
-                result = mt5.order_send(request)
+                if trace is not None:
+                    trace.mark('order_send_start')
+                result = timed_order_send(request, 'open')
+                if trace is not None:
+                    trace.mark('order_send_end')
                 if not result or result.retcode != mt5.TRADE_RETCODE_DONE:
                     error_msg = mt5.last_error() if not result else result.comment
+                    self.symbols.invalidate_on_retcode(mt5_symbol, result.retcode if result else None)
                     return {
                         "error": f"Order failed: {error_msg}",
                         "retcode": result.retcode if result else None
@@ -212,19 +257,20 @@ class MT5Service:
 
             # return await self.loop.run_in_executor(None, _execute)
 
-    async def async_execute_market_order(self, trade_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute market order on MT5 asynchronously."""
+    async def async_execute_market_order(self, trade_data: Dict[str, Any],
+                                         trace: Optional[TraceContext] = None) -> Dict[str, Any]:
+        """Execute market order on MT5 asynchronously; `trace` gets the order_send marks."""
         if not self.loop:
             self.loop = asyncio.get_event_loop()
-        return await self._retry_operation(lambda: self.loop.run_in_executor(None, lambda: self._execute_order(trade_data)))    
+        if not await self._wait_ready():
+            return {"error": "MT5 not connected"}
+        return await self._retry_operation(
+            lambda: MT5_EXECUTOR.run(Priority.TRADE, 'execute_order', self._execute_order, trade_data, trace)
+        )
         
     def _close_position(self, trade_data: Dict[str, Any]) -> Dict[str, Any]:
         """Synchronous internal method for position closing."""
         try:
-            # Initialize MT5
-            if not self.initialized and not mt5.initialize():
-                return {"error": "MT5 initialization failed"}
-
             # Extract and validate required fields
             mt5_ticket = trade_data.get('mt5_ticket')
             if not mt5_ticket:
@@ -232,32 +278,37 @@ class MT5Service:
 
             execution_data = trade_data.get('execution_data', {})
             instrument = trade_data.get('instrument') or execution_data.get('instrument')
-            close_volume = float(trade_data.get('qty') or execution_data.get('qty', 0))
+            close_volume = float(trade_data.get('qty') or execution_data.get('qty') or 0)
+            # A close the proxy could not validate may leave the volume to the position
+            validate = trade_data.get('validate', False)
 
-            if not instrument or not close_volume:
+            if not instrument or not (close_volume or validate):
                 return {"error": "Missing required fields"}
 
             # Get position details
             mt5_symbol = self.map_symbol(instrument)
                         
-            # Select symbol first
-            if not mt5.symbol_select(mt5_symbol, True):
+            # Selected symbol and static settings from the cache
+            symbol = self.symbols.get(mt5_symbol)
+            if not symbol:
                 return {"error": f"Failed to select symbol {mt5_symbol}"}
                 
-            # Get symbol info
-            symbol_info = mt5.symbol_info(mt5_symbol)
-            if not symbol_info:
-                return {"error": f"Failed to get symbol info for {mt5_symbol}"}
+            # Live price
+            tick = mt5.symbol_info_tick(mt5_symbol)
+            if not tick:
+                return {"error": f"Failed to get price for {mt5_symbol}"}
 
             # Get position details
             positions = mt5.positions_get(ticket=int(mt5_ticket))
             if not positions:
-                return {"error": f"Position #{mt5_ticket} not found"}
+                return {"error": f"Position #{mt5_ticket} not found", "not_found": True}
 
             position = positions[0]
+            if not close_volume:
+                close_volume = position.volume
             
             # Validate close volume
-            if close_volume > position.volume:
+            if close_volume <= 0 or close_volume > position.volume:
                 return {'error': f'Close amount {close_volume} exceeds position size {position.volume}'}
             
             is_partial = close_volume < position.volume
@@ -265,14 +316,14 @@ class MT5Service:
             # Determine order type based on position type
             if position.type == mt5.POSITION_TYPE_BUY:
                 order_type = mt5.ORDER_TYPE_SELL
-                price = symbol_info.bid
+                price = tick.bid
             else:
                 order_type = mt5.ORDER_TYPE_BUY
-                price = symbol_info.ask
+                price = tick.ask
 
             position_id = trade_data.get('execution_data', {}).get('positionId', 'unknown')
 
-            filling_type = self._get_filling_type(symbol_info)
+            filling_type = symbol.filling_type
 
             request = {
                 "action": mt5.TRADE_ACTION_DEAL,
@@ -291,10 +342,11 @@ class MT5Service:
                request["type_filling"] = filling_type
             
             # Send close order
-            result = mt5.order_send(request)
+            result = timed_order_send(request, 'close')
             
             if not result or result.retcode != mt5.TRADE_RETCODE_DONE:
                 error_msg = mt5.last_error() if not result else result.comment
+                self.symbols.invalidate_on_retcode(mt5_symbol, result.retcode if result else None)
                 return {
                     "error": f"Close failed: {error_msg}",
                     "retcode": result.retcode if result else None
@@ -328,24 +380,23 @@ class MT5Service:
         """Close an existing position asynchronously."""
         if not self.loop:
             self.loop = asyncio.get_event_loop()
+        if not await self._wait_ready():
+            return {"error": "MT5 not connected"}
             
         return await self._retry_operation(
-            lambda: self.loop.run_in_executor(None, self._close_position, trade_data)
+            lambda: MT5_EXECUTOR.run(Priority.TRADE, 'close_position', self._close_position, trade_data)
         )
 
     def _update_position(self, trade_data: Dict[str, Any]) -> Dict[str, Any]:
         """Synchronous method to update position TP/SL in MT5."""
         try:
-            # Initialize MT5
-            if not self.initialized and not mt5.initialize():
-                return {"error": "MT5 initialization failed"}
-                
             symbol = trade_data['instrument']
             ticket = int(trade_data['mt5_ticket'])
             
-            # Map symbol and enable for trading
+            # Map symbol; selection and static settings come from the cache
             mt5_symbol = self.map_symbol(symbol)
-            if not mt5.symbol_select(mt5_symbol, True):
+            symbol_info = self.symbols.get(mt5_symbol)
+            if not symbol_info:
                 return {"error": f"Failed to select symbol {mt5_symbol}"}
             
             # Get current position
@@ -359,11 +410,6 @@ class MT5Service:
             if position.symbol != mt5_symbol:
                 return {'error': f'Position #{ticket} exists but symbol mismatch: expected {mt5_symbol}, found {position.symbol}'}
 
-            # Get symbol info for proper formatting
-            symbol_info = mt5.symbol_info(mt5_symbol)
-            if not symbol_info:
-                return {'error': f'Could not get symbol info for {mt5_symbol}'}
-            
             digits = symbol_info.digits
             point = symbol_info.point
 
@@ -407,9 +453,10 @@ class MT5Service:
             }
 
             # Send the update request
-            result = mt5.order_send(request)
+            result = timed_order_send(request, 'modify')
             
             if result.retcode != mt5.TRADE_RETCODE_DONE:
+                self.symbols.invalidate_on_retcode(mt5_symbol, result.retcode)
                 return {
                     'error': self._get_position_error_message(result, request),
                     'retcode': result.retcode
@@ -429,161 +476,30 @@ class MT5Service:
             logger.error(f"Error updating position: {e}")
             return {'error': str(e)}     
     
-    async def monitor_trailing_stops(self):
-        """Monitor and update trailing stops."""
-        while self.running:
-            try:
-                positions = await self.loop.run_in_executor(None, mt5.positions_get)
-                if not positions:
-                    await asyncio.sleep(1)
-                    continue
-
-                for position in positions:
-                    try:
-                        trade = await self.db.async_get_trade_by_mt5_ticket(str(position.ticket))
-                        if not trade or not trade.get('trailing_stop_pips'):
-                            continue
-
-                        trailing_pips = float(trade['trailing_stop_pips'])
-                        symbol_info = mt5.symbol_info(position.symbol)
-                        current_prices = mt5.symbol_info_tick(position.symbol)
-                        
-                        if not symbol_info or not current_prices:
-                            continue
-
-                        trailing_distance = self.instrument_manager.calculate_trailing_distance(
-                            position.symbol,
-                            trailing_pips,
-                            symbol_info
-                        )
-
-                        if position.type == mt5.POSITION_TYPE_BUY:
-                            new_sl = round(current_prices.bid - trailing_distance, symbol_info.digits)
-                            
-                            if position.sl == 0 or new_sl > position.sl:
-                                await self._update_stop_loss_mt5(
-                                    position.ticket, 
-                                    new_sl, 
-                                    position.tp, 
-                                    position.symbol
-                                )
-
-                        else:  # SELL position
-                            new_sl = round(current_prices.ask + trailing_distance, symbol_info.digits)
-                            
-                            if position.sl == 0 or new_sl < position.sl:
-                                await self._update_stop_loss_mt5(
-                                    position.ticket, 
-                                    new_sl, 
-                                    position.tp, 
-                                    position.symbol
-                                )
-
-                    except Exception as e:
-                        logger.error(f"Error processing position {position.ticket}: {e}")
-
-                await asyncio.sleep(1)
-
-            except Exception as e:
-                logger.error(f"Error monitoring trailing stops: {e}")
-                await asyncio.sleep(1)
-
-    async def _update_stop_loss_mt5(self, ticket: int, sl_price: float, tp: float, symbol: str) -> None:
-        """Update position's stop loss with retry logic."""
-        for attempt in range(5):
-            try:
-                def _modify(ticket=ticket, sl_price=sl_price, tp=tp, symbol=symbol):
-                    try:
-                        # Verify position exists
-                        position = mt5.positions_get(ticket=ticket)
-                        if not position:
-                            print(f"❌ Position {ticket} not found")
-                            return False
-                        
-                        # Select symbol
-                        if not mt5.symbol_select(symbol):
-                            print(f"❌ Failed to select symbol {symbol}")
-                            return False
-
-                        # Get symbol info
-                        symbol_info = mt5.symbol_info(symbol)
-                        if not symbol_info:
-                            print(f"❌ Failed to get symbol info for {symbol}")
-                            return False
-
-                        # Round values to correct digits
-                        sl = round(sl_price, symbol_info.digits)
-                        if tp:
-                            tp = round(tp, symbol_info.digits)
-
-                        # Build request
-                        request = {
-                            "action": mt5.TRADE_ACTION_SLTP,
-                            "symbol": symbol,
-                            "position": ticket,
-                            "type_time": mt5.ORDER_TIME_GTC
-                        }
-
-                        # Only add valid SL/TP
-                        if sl is not None:
-                            request["sl"] = sl
-                        if tp is not None:
-                            request["tp"] = tp
-                        
-                        result = mt5.order_send(request)
-                        
-                        if result is None:
-                            print(f"❌ Order send failed: {mt5.last_error()}")
-                            return False
-                            
-                        if result.retcode != mt5.TRADE_RETCODE_DONE:
-                            print(f"❌ Order failed: {result.comment} (Code: {result.retcode})")
-                            return False
-
-                        # Verify the update
-                        updated_position = mt5.positions_get(ticket=ticket)
-                        if not updated_position:
-                            print("❌ Failed to verify position update")
-                            return False
-
-                        if abs(updated_position[0].sl - sl) > symbol_info.point:
-                            print(f"❌ SL not updated correctly. Expected: {sl}, Got: {updated_position[0].sl}")
-                            return False
-
-                        return True
-
-                    except Exception as e:
-                        print(f"❌ Error in modify operation: {e}")
-                        return False
-
-                success = await self.loop.run_in_executor(None, _modify)
-                if success:
-                    return
-
-                wait_time = 0.1 * (attempt + 1)
-                print(f"⏳ Retrying in {wait_time}s...")
-                await asyncio.sleep(wait_time)
-
-            except Exception as e:
-                logger.error(f"Error updating stop loss (attempt {attempt+1}): {e}")
-                await asyncio.sleep(0.1 * (attempt + 1))
+    async def load_trailing_stops(self) -> None:
+        """Fill the trailing stop registry from the database in one query."""
+        try:
+            self.trailing_stops.load(await self.db.async_get_trailing_stops())
+            print(f"🟠 Loaded {len(self.trailing_stops)} trailing stops")
+        except Exception as e:
+            logger.error(f"Error loading trailing stops: {e}")
 
-        logger.error(f"Failed to update trailing stop after 5 attempts")
-
-    def cleanup(self):
-        """Cleanup MT5 connection."""
-        self.running = False  # Stop the monitor
-        if self.initialized:
-            mt5.shutdown()
-            self.initialized = False
+    async def _update_stop_loss_mt5(self, ticket: int, sl_price: float, tp: float, symbol: str) -> bool:
+        """Move a position's stop loss; concurrent calls for one ticket collapse to the latest SL.
 
+        Returns True once the new SL is read back from MT5, False if it was
+        superseded by a newer SL or could not be applied.
+        """
+        return await self.sl_coalescer.submit(ticket, sl_price, tp, symbol)
 
     async def async_update_position(self, trade_data: Dict[str, Any]) -> Dict[str, Any]:
         """Async wrapper to update position TP/SL in MT5."""
         if not self.loop:
             self.loop = asyncio.get_event_loop()
+        if not await self._wait_ready():
+            return {"error": "MT5 not connected"}
         return await self._retry_operation(
-            lambda: self.loop.run_in_executor(None, self._update_position, trade_data)
+            lambda: MT5_EXECUTOR.run(Priority.UPDATE, 'update_position', self._update_position, trade_data)
         )
     
     def _get_position_error_message(self, result, request: Dict[str, Any]) -> str:
@@ -610,9 +526,6 @@ class MT5Service:
             
         def _check():
             try:
-                if not self.initialized and not mt5.initialize():
-                    return {"exists": False, "error": "MT5 initialization failed"}
-                
                 positions = mt5.positions_get(ticket=ticket)
                 if not positions:
                     return {
@@ -643,10 +556,15 @@ class MT5Service:
             except Exception as e:
                 return {"exists": False, "error": str(e)}
         
-        return await self.loop.run_in_executor(None, _check)
+        if not await self._wait_ready():
+            return {"exists": False, "error": "MT5 not connected"}
+        return await MT5_EXECUTOR.run(Priority.UPDATE, 'check_position', _check)
 
     def cleanup(self):
         """Cleanup MT5 connection."""
+        self.running = False
+        self.supervisor.stop()
         if self.initialized:
-            mt5.shutdown()
-            self.initialized = False
\ No newline at end of file
+            MT5_EXECUTOR.call(Priority.TRADE, 'shutdown', mt5.shutdown)
+            self.supervisor.is_ready = False
+        MT5_EXECUTOR.shutdown()
\ No newline at end of file
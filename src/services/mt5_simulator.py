@@ -0,0 +1,425 @@
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque, namedtuple
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.config.mt5_symbol_config import SymbolMapper
+from src.utils.instrument_manager import InstrumentManager
+
+logger = logging.getLogger('MT5Simulator')
+
+SymbolInfo = namedtuple('SymbolInfo', (
+    'name description path digits point spread bid ask trade_contract_size volume_min volume_max '
+    'volume_step filling_mode trade_mode trade_stops_level visible'
+))
+Tick = namedtuple('Tick', 'time bid ask last volume time_msc flags')
+TradePosition = namedtuple('TradePosition', (
+    'ticket time time_msc type magic identifier volume price_open sl tp price_current swap profit '
+    'symbol comment'
+))
+OrderSendResult = namedtuple('OrderSendResult', (
+    'retcode deal order volume price bid ask comment request_id retcode_external request'
+))
+AccountInfo = namedtuple('AccountInfo', 'login server name currency leverage balance equity margin_free trade_allowed')
+TerminalInfo = namedtuple('TerminalInfo', 'connected trade_allowed name company build ping_last')
+
+
+class SimulatedTerminal:
+    """In-process stand-in for the MetaTrader5 module.
+
+    Implements the part of the API this project calls, with the same
+    constants, return types and None-on-error behaviour, so any module can
+    use it through src.services.mt5_api. The symbol universe is
+    data/instruments.json mapped through SymbolMapper. Prices follow a
+    seeded random walk advanced on every tick request, after any scripted
+    ticks queued for the symbol. Each call costs `latency_ms` (± `jitter_ms`)
+    and order_send another `order_latency_ms`. Fills take up to
+    `slippage_points` of adverse slippage, and `failures` / inject() make
+    order_send return chosen retcodes.
+    """
+
+    # Order and position constants (same values as the MetaTrader5 package)
+    TRADE_ACTION_DEAL = 1
+    TRADE_ACTION_SLTP = 6
+    ORDER_TYPE_BUY = 0
+    ORDER_TYPE_SELL = 1
+    POSITION_TYPE_BUY = 0
+    POSITION_TYPE_SELL = 1
+    ORDER_FILLING_FOK = 0
+    ORDER_FILLING_IOC = 1
+    ORDER_FILLING_RETURN = 2
+    ORDER_TIME_GTC = 0
+    SYMBOL_FILLING_FOK = 1
+    SYMBOL_FILLING_IOC = 2
+    SYMBOL_TRADE_MODE_DISABLED = 0
+    SYMBOL_TRADE_MODE_LONGONLY = 1
+    SYMBOL_TRADE_MODE_SHORTONLY = 2
+    SYMBOL_TRADE_MODE_CLOSEONLY = 3
+    SYMBOL_TRADE_MODE_FULL = 4
+
+    # order_send retcodes
+    TRADE_RETCODE_REQUOTE = 10004
+    TRADE_RETCODE_REJECT = 10006
+    TRADE_RETCODE_DONE = 10009
+    TRADE_RETCODE_INVALID = 10013
+    TRADE_RETCODE_INVALID_VOLUME = 10014
+    TRADE_RETCODE_INVALID_PRICE = 10015
+    TRADE_RETCODE_INVALID_STOPS = 10016
+    TRADE_RETCODE_TRADE_DISABLED = 10017
+    TRADE_RETCODE_MARKET_CLOSED = 10018
+    TRADE_RETCODE_PRICE_CHANGED = 10020
+    TRADE_RETCODE_TOO_MANY_REQUESTS = 10024
+    TRADE_RETCODE_NO_CHANGES = 10025
+    TRADE_RETCODE_INVALID_FILL = 10030
+    TRADE_RETCODE_CONNECTION = 10031
+    TRADE_RETCODE_POSITION_CLOSED = 10036
+
+    # last_error codes
+    RES_S_OK = 1
+    RES_E_INVALID_PARAMS = -2
+    RES_E_NOT_FOUND = -4
+    RES_E_INTERNAL_FAIL_CONNECT = -10004
+
+    CONTRACT_SIZE = 100_000
+
+    def __init__(self, seed: int = 7, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 order_latency_ms: float = 0.0, slippage_points: int = 0, volatility_points: int = 3,
+                 spread_points: int = 10, failures: Optional[Dict[int, float]] = None,
+                 symbols: Optional[Iterable[Tuple[str, float]]] = None):
+        self.rng = random.Random(seed)
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.order_latency = order_latency_ms / 1000
+        self.slippage_points = slippage_points
+        self.volatility_points = volatility_points
+        self.spread_points = spread_points
+        self.failures = dict(failures or {})
+        self.connected = False
+        self.logged_in = None
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._error: Tuple[int, str] = (self.RES_S_OK, 'Success')
+        self._symbols: Dict[str, SymbolInfo] = {}
+        self._prices: Dict[str, Tuple[float, float]] = {}
+        self._scripted: Dict[str, deque] = {}
+        self._injected: deque = deque()
+        self._positions: Dict[int, TradePosition] = {}
+        self._next_ticket = 100_000_000
+        self.account = AccountInfo(0, 'Simulator', 'Simulated Account', 'USD', 100, 10_000.0, 10_000.0, 10_000.0, True)
+
+        if symbols is None:
+            symbols = self._configured_symbols()
+        for name, pip_size in symbols:
+            self.add_symbol(name, pip_size)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'SimulatedTerminal':
+        terminal = cls(
+            seed=config['seed'],
+            latency_ms=config['latency_ms'],
+            jitter_ms=config['jitter_ms'],
+            order_latency_ms=config['order_latency_ms'],
+            slippage_points=config['slippage_points'],
+            volatility_points=config['volatility_points'],
+            spread_points=config['spread_points'],
+            failures=config['failures']
+        )
+        if config.get('ticks_file'):
+            terminal.load_ticks(config['ticks_file'])
+        return terminal
+
+    @staticmethod
+    def _configured_symbols() -> List[Tuple[str, float]]:
+        """MT5 names and pip sizes of every instrument in data/instruments.json."""
+        instruments = InstrumentManager()
+        mapper = SymbolMapper()
+        return [
+            (mapper.map_symbol(pair['name']), float(pair['pip_size']))
+            for section in ('instruments', 'custom')
+            for pair in instruments.instruments.get(section, {}).get('pairs', [])
+        ]
+
+    # Simulation controls
+
+    def add_symbol(self, name: str, pip_size: float, bid: Optional[float] = None) -> SymbolInfo:
+        """Make a symbol tradeable; digits are one more than the pip size's decimals."""
+        digits = max(0, -Decimal(str(pip_size)).normalize().as_tuple().exponent) + 1
+        point = 10 ** -digits
+        info = SymbolInfo(
+            name=name, description=name, path=f"Simulator\\{name}", digits=digits, point=point,
+            spread=self.spread_points, bid=0.0, ask=0.0, trade_contract_size=self.CONTRACT_SIZE,
+            volume_min=0.01, volume_max=100.0, volume_step=0.01,
+            filling_mode=self.SYMBOL_FILLING_FOK | self.SYMBOL_FILLING_IOC,
+            trade_mode=self.SYMBOL_TRADE_MODE_FULL, trade_stops_level=0, visible=False
+        )
+        with self._lock:
+            self._symbols[name] = info
+            if bid is None:
+                bid = round(pip_size * 10_000 * self.rng.uniform(0.8, 1.6), digits)
+            self._prices[name] = (bid, round(bid + self.spread_points * point, digits))
+        return info
+
+    def set_price(self, symbol: str, bid: float, ask: Optional[float] = None) -> None:
+        """Move a symbol's price directly."""
+        info = self._symbols[symbol]
+        if ask is None:
+            ask = bid + self.spread_points * info.point
+        with self._lock:
+            self._prices[symbol] = (round(bid, info.digits), round(ask, info.digits))
+
+    def feed_ticks(self, ticks: Iterable[Dict[str, Any]]) -> None:
+        """Queue scripted {'symbol', 'bid', 'ask'} ticks; each tick request consumes one."""
+        with self._lock:
+            for tick in ticks:
+                self._scripted.setdefault(tick['symbol'], deque()).append((float(tick['bid']), float(tick['ask'])))
+
+    def load_ticks(self, path: str) -> None:
+        with open(path) as f:
+            self.feed_ticks(json.loads(line) for line in f if line.strip())
+
+    def inject(self, retcode: int, count: int = 1) -> None:
+        """Make the next `count` order_send calls fail with `retcode`."""
+        with self._lock:
+            self._injected.extend([retcode] * count)
+
+    def disconnect(self) -> None:
+        """Drop the terminal connection; calls fail until initialize() is called again."""
+        self.connected = False
+
+    # Internals
+
+    def _call(self, name: str) -> bool:
+        self.calls[name] = self.calls.get(name, 0) + 1
+        delay = self.latency + (self.rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        if not self.connected:
+            self._error = (self.RES_E_INTERNAL_FAIL_CONNECT, 'IPC initialize failed, MetaTrader 5 x64 not found')
+            return False
+        self._error = (self.RES_S_OK, 'Success')
+        return True
+
+    def _tick(self, symbol: str) -> Tuple[float, float]:
+        """Next price for a symbol: a scripted tick if queued, else one random-walk step."""
+        scripted = self._scripted.get(symbol)
+        if scripted:
+            self._prices[symbol] = scripted.popleft()
+        elif self.volatility_points:
+            info = self._symbols[symbol]
+            step = self.rng.randint(-self.volatility_points, self.volatility_points) * info.point
+            bid, ask = self._prices[symbol]
+            self._prices[symbol] = (round(bid + step, info.digits), round(ask + step, info.digits))
+        return self._prices[symbol]
+
+    def _result(self, retcode: int, request: Dict[str, Any], comment: str, order: int = 0,
+                volume: float = 0.0, price: float = 0.0) -> OrderSendResult:
+        bid, ask = self._prices.get(request.get('symbol'), (0.0, 0.0))
+        return OrderSendResult(retcode, order, order, volume, price, bid, ask, comment, 0, 0, request)
+
+    def _failure(self, request: Dict[str, Any]) -> Optional[OrderSendResult]:
+        if self._injected:
+            return self._result(self._injected.popleft(), request, 'Injected failure')
+        for retcode, rate in self.failures.items():
+            if self.rng.random() < rate:
+                return self._result(retcode, request, 'Simulated failure')
+        return None
+
+    # MetaTrader5 API
+
+    def initialize(self, *args, **kwargs) -> bool:
+        self.calls['initialize'] = self.calls.get('initialize', 0) + 1
+        self.connected = True
+        if kwargs.get('login'):
+            self.logged_in = kwargs['login']
+        self._error = (self.RES_S_OK, 'Success')
+        return True
+
+    def login(self, login: int, password: str = '', server: str = '', timeout: int = 60000) -> bool:
+        if not self._call('login'):
+            return False
+        self.logged_in = login
+        self.account = self.account._replace(login=login, server=server or self.account.server)
+        return True
+
+    def shutdown(self) -> None:
+        self.connected = False
+
+    def last_error(self) -> Tuple[int, str]:
+        return self._error
+
+    def terminal_info(self) -> Optional[TerminalInfo]:
+        if not self._call('terminal_info'):
+            return None
+        return TerminalInfo(True, True, 'MetaTrader 5 Simulator', 'Simulator', 0, int(self.latency * 1_000_000))
+
+    def account_info(self) -> Optional[AccountInfo]:
+        if not self._call('account_info'):
+            return None
+        with self._lock:
+            profit = sum(position.profit for position in self._positions.values())
+        return self.account._replace(equity=self.account.balance + profit)
+
+    def symbols_get(self, group: Optional[str] = None) -> Optional[Tuple[SymbolInfo, ...]]:
+        if not self._call('symbols_get'):
+            return None
+        return tuple(self._symbols.values())
+
+    def symbol_select(self, symbol: str, enable: bool = True) -> bool:
+        if not self._call('symbol_select'):
+            return False
+        with self._lock:
+            info = self._symbols.get(symbol)
+            if info is None:
+                self._error = (self.RES_E_NOT_FOUND, f'Symbol {symbol} not found')
+                return False
+            self._symbols[symbol] = info._replace(visible=enable)
+        return True
+
+    def symbol_info(self, symbol: str) -> Optional[SymbolInfo]:
+        if not self._call('symbol_info'):
+            return None
+        with self._lock:
+            info = self._symbols.get(symbol)
+            if info is None:
+                return None
+            bid, ask = self._prices[symbol]
+        return info._replace(bid=bid, ask=ask)
+
+    def symbol_info_tick(self, symbol: str) -> Optional[Tick]:
+        if not self._call('symbol_info_tick'):
+            return None
+        with self._lock:
+            if symbol not in self._symbols:
+                return None
+            bid, ask = self._tick(symbol)
+        now = time.time()
+        return Tick(int(now), bid, ask, 0.0, 0, int(now * 1000), 6)
+
+    def positions_get(self, symbol: Optional[str] = None, group: Optional[str] = None,
+                      ticket: Optional[int] = None) -> Optional[Tuple[TradePosition, ...]]:
+        if not self._call('positions_get'):
+            return None
+        with self._lock:
+            if ticket is not None:
+                position = self._positions.get(int(ticket))
+                positions = [position] if position is not None else []
+            else:
+                positions = list(self._positions.values())
+            if symbol is not None:
+                positions = [position for position in positions if position.symbol == symbol]
+            return tuple(self._marked(position) for position in positions)
+
+    def _marked(self, position: TradePosition) -> TradePosition:
+        """Position with price_current and profit at the last known price."""
+        bid, ask = self._prices[position.symbol]
+        if position.type == self.POSITION_TYPE_BUY:
+            current, profit = bid, (bid - position.price_open)
+        else:
+            current, profit = ask, (position.price_open - ask)
+        return position._replace(price_current=current, profit=round(profit * position.volume * self.CONTRACT_SIZE, 2))
+
+    def order_send(self, request: Dict[str, Any]) -> Optional[OrderSendResult]:
+        if not self._call('order_send'):
+            return None
+        if self.order_latency > 0:
+            time.sleep(self.order_latency)
+        with self._lock:
+            failure = self._failure(request)
+            if failure is not None:
+                return failure
+            action = request.get('action')
+            if action == self.TRADE_ACTION_DEAL:
+                if request.get('position'):
+                    return self._close(request)
+                return self._open(request)
+            if action == self.TRADE_ACTION_SLTP:
+                return self._modify(request)
+            self._error = (self.RES_E_INVALID_PARAMS, 'Invalid action')
+            return self._result(self.TRADE_RETCODE_INVALID, request, 'Invalid request')
+
+    def _check_volume(self, info: SymbolInfo, volume: float) -> bool:
+        steps = round(volume / info.volume_step, 6)
+        return info.volume_min <= volume <= info.volume_max and abs(steps - round(steps)) < 1e-6
+
+    def _check_filling(self, info: SymbolInfo, request: Dict[str, Any]) -> bool:
+        filling = request.get('type_filling')
+        if filling == self.ORDER_FILLING_FOK:
+            return bool(info.filling_mode & self.SYMBOL_FILLING_FOK)
+        if filling == self.ORDER_FILLING_IOC:
+            return bool(info.filling_mode & self.SYMBOL_FILLING_IOC)
+        return True
+
+    def _fill_price(self, info: SymbolInfo, is_buy: bool) -> float:
+        bid, ask = self._tick(info.name)
+        slippage = self.rng.randint(0, self.slippage_points) * info.point if self.slippage_points else 0.0
+        return round(ask + slippage if is_buy else bid - slippage, info.digits)
+
+    def _open(self, request: Dict[str, Any]) -> OrderSendResult:
+        info = self._symbols.get(request.get('symbol'))
+        if info is None:
+            return self._result(self.TRADE_RETCODE_INVALID, request, 'Invalid request')
+        volume = float(request.get('volume', 0))
+        if not self._check_volume(info, volume):
+            return self._result(self.TRADE_RETCODE_INVALID_VOLUME, request, 'Invalid volume')
+        if not self._check_filling(info, request):
+            return self._result(self.TRADE_RETCODE_INVALID_FILL, request, 'Unsupported filling mode')
+
+        is_buy = request.get('type') == self.ORDER_TYPE_BUY
+        price = self._fill_price(info, is_buy)
+        self._next_ticket += 1
+        ticket = self._next_ticket
+        now = time.time()
+        self._positions[ticket] = TradePosition(
+            ticket=ticket, time=int(now), time_msc=int(now * 1000),
+            type=self.POSITION_TYPE_BUY if is_buy else self.POSITION_TYPE_SELL,
+            magic=request.get('magic', 0), identifier=ticket, volume=volume, price_open=price,
+            sl=float(request.get('sl') or 0.0), tp=float(request.get('tp') or 0.0),
+            price_current=price, swap=0.0, profit=0.0, symbol=info.name, comment=request.get('comment', '')
+        )
+        return self._result(self.TRADE_RETCODE_DONE, request, 'Request executed', ticket, volume, price)
+
+    def _close(self, request: Dict[str, Any]) -> OrderSendResult:
+        position = self._positions.get(int(request['position']))
+        if position is None:
+            return self._result(self.TRADE_RETCODE_POSITION_CLOSED, request, 'Position doesn\'t exist')
+        info = self._symbols[position.symbol]
+        volume = float(request.get('volume', 0))
+        if not self._check_volume(info, volume) or volume > position.volume + 1e-9:
+            return self._result(self.TRADE_RETCODE_INVALID_VOLUME, request, 'Invalid volume')
+        if not self._check_filling(info, request):
+            return self._result(self.TRADE_RETCODE_INVALID_FILL, request, 'Unsupported filling mode')
+
+        price = self._fill_price(info, position.type == self.POSITION_TYPE_SELL)
+        remaining = round(position.volume - volume, 8)
+        if remaining <= 0:
+            del self._positions[position.ticket]
+        else:
+            self._positions[position.ticket] = position._replace(volume=remaining)
+        self._next_ticket += 1
+        return self._result(self.TRADE_RETCODE_DONE, request, 'Request executed', self._next_ticket, volume, price)
+
+    def _modify(self, request: Dict[str, Any]) -> OrderSendResult:
+        position = self._positions.get(int(request.get('position', 0)))
+        if position is None:
+            return self._result(self.TRADE_RETCODE_POSITION_CLOSED, request, 'Position doesn\'t exist')
+        info = self._symbols[position.symbol]
+        sl = round(float(request.get('sl', position.sl) or 0.0), info.digits)
+        tp = round(float(request.get('tp', position.tp) or 0.0), info.digits)
+        if sl == position.sl and tp == position.tp:
+            return self._result(self.TRADE_RETCODE_NO_CHANGES, request, 'No changes')
+
+        bid, ask = self._prices[position.symbol]
+        gap = info.trade_stops_level * info.point
+        if position.type == self.POSITION_TYPE_BUY:
+            valid = (not sl or sl <= bid - gap) and (not tp or tp >= bid + gap)
+        else:
+            valid = (not sl or sl >= ask + gap) and (not tp or tp <= ask - gap)
+        if not valid:
+            return self._result(self.TRADE_RETCODE_INVALID_STOPS, request, 'Invalid stops')
+
+        self._positions[position.ticket] = position._replace(sl=sl, tp=tp)
+        return self._result(self.TRADE_RETCODE_DONE, request, 'Request executed', position.ticket)
@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from src.services.mt5_api import mt5
+from src.services.mt5_executor import MT5_EXECUTOR, Priority
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger('MT5Supervisor')
+
+HEARTBEATS = REGISTRY.counter('tvcopier_mt5_heartbeats_total', 'MT5 terminal heartbeats by outcome', ('result',))
+HEARTBEAT_LATENCY = REGISTRY.histogram('tvcopier_mt5_heartbeat_ms', 'terminal_info heartbeat round trip')
+DISCONNECTS = REGISTRY.counter('tvcopier_mt5_disconnects_total', 'MT5 connections marked down')
+RECONNECTS = REGISTRY.counter('tvcopier_mt5_reconnects_total', 'Successful MT5 connects after an outage')
+RECONNECT_FAILURES = REGISTRY.counter('tvcopier_mt5_reconnect_failures_total', 'MT5 connect attempts that failed')
+DOWNTIME = REGISTRY.counter('tvcopier_mt5_downtime_seconds_total', 'Seconds the MT5 connection was down, counted when it recovers')
+OUTAGE = REGISTRY.gauge('tvcopier_mt5_outage_seconds', 'Length of the MT5 outage in progress, 0 while connected')
+
+
+class MT5ConnectionSupervisor:
+    """Owns the terminal connection so hot paths never check it themselves.
+
+    While connected, a cheap terminal_info heartbeat runs every
+    `heartbeat_interval` seconds at poll priority. `failure_threshold`
+    failed heartbeats in a row, or an explicit report_failure() from a
+    caller that got no answer from MT5, mark the connection down. While it
+    is down the supervisor reconnects with jittered exponential backoff.
+    `is_ready` is a plain attribute read and never blocks. Coroutines
+    registered with on_connected() run after every successful connect,
+    the first one included.
+    """
+
+    def __init__(self, connect: Callable[[], bool], heartbeat_interval: float = 5.0,
+                 failure_threshold: int = 2, backoff_base: float = 0.5, backoff_max: float = 30.0):
+        self._connect = connect
+        self.heartbeat_interval = heartbeat_interval
+        self.failure_threshold = failure_threshold
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.is_ready = False
+        self.running = False
+        self._ready: Optional[asyncio.Event] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._missed_heartbeats = 0
+        self._down_since: Optional[float] = None
+        self._connected_callbacks: List[Callable[[], Awaitable[None]]] = []
+        self._callback_tasks: Set[asyncio.Task] = set()
+        OUTAGE.set_function(self._outage_seconds)
+
+    def _outage_seconds(self) -> float:
+        return time.monotonic() - self._down_since if self._down_since is not None else 0.0
+
+    def _events(self) -> None:
+        # Created lazily so they bind to the loop that runs the supervisor
+        if self._ready is None:
+            self._ready = asyncio.Event()
+            self._wake = asyncio.Event()
+            self._connect_lock = asyncio.Lock()
+            if self.is_ready:
+                self._ready.set()
+
+    def _mark_ready(self) -> None:
+        self._events()
+        if self._down_since is not None:
+            DOWNTIME.inc(time.monotonic() - self._down_since)
+            self._down_since = None
+        self._missed_heartbeats = 0
+        self.is_ready = True
+        self._ready.set()
+
+    def _mark_down(self, reason: str) -> None:
+        self._events()
+        if self.is_ready:
+            DISCONNECTS.inc()
+            logger.warning(f"MT5 connection lost: {reason}")
+        if self._down_since is None:
+            self._down_since = time.monotonic()
+        self.is_ready = False
+        self._ready.clear()
+        self._wake.set()
+
+    def on_connected(self, callback: Callable[[], Awaitable[None]]) -> None:
+        """Register a coroutine to run after every successful (re)connect."""
+        self._connected_callbacks.append(callback)
+
+    def _run_connected_callbacks(self) -> None:
+        # Run as tasks so a slow callback never holds the connect lock
+        for callback in self._connected_callbacks:
+            task = asyncio.get_running_loop().create_task(self._run_callback(callback))
+            self._callback_tasks.add(task)
+            task.add_done_callback(self._callback_tasks.discard)
+
+    @staticmethod
+    async def _run_callback(callback: Callable[[], Awaitable[None]]) -> None:
+        try:
+            await callback()
+        except Exception as e:
+            logger.error(f"Error in MT5 connected callback: {e}")
+
+    def report_failure(self, reason: str = 'no response from terminal') -> None:
+        """Called by anything that got no answer from MT5; reconnects without waiting for a heartbeat."""
+        self._mark_down(reason)
+
+    async def connect(self) -> bool:
+        """Connect now unless already connected; concurrent callers share one attempt."""
+        self._events()
+        if self.is_ready:
+            return True
+        async with self._connect_lock:
+            if self.is_ready:
+                return True
+            try:
+                connected = await MT5_EXECUTOR.run(Priority.TRADE, 'connect', self._connect)
+            except Exception as e:
+                logger.error(f"Error connecting to MT5: {e}")
+                connected = False
+            if connected:
+                if self._down_since is not None:
+                    RECONNECTS.inc()
+                self._mark_ready()
+                self._run_connected_callbacks()
+            else:
+                RECONNECT_FAILURES.inc()
+                if self._down_since is None:
+                    self._down_since = time.monotonic()
+            return connected
+
+    async def wait_ready(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for the connection; True if it is up."""
+        self._events()
+        if self.is_ready:
+            return True
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.is_ready
+
+    @staticmethod
+    def _heartbeat() -> bool:
+        info = mt5.terminal_info()
+        return info is not None and bool(info.connected)
+
+    async def _beat(self) -> None:
+        started = time.perf_counter()
+        try:
+            alive = await MT5_EXECUTOR.run(Priority.POLL, 'heartbeat', self._heartbeat)
+        except Exception as e:
+            logger.error(f"Error checking MT5 heartbeat: {e}")
+            alive = False
+        HEARTBEAT_LATENCY.observe((time.perf_counter() - started) * 1000)
+        HEARTBEATS.inc(result='ok' if alive else 'failed')
+        if alive:
+            self._missed_heartbeats = 0
+            return
+        self._missed_heartbeats += 1
+        if self._missed_heartbeats >= self.failure_threshold:
+            self._mark_down(f"{self._missed_heartbeats} heartbeats missed")
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        # Jitter so several processes don't retry in lockstep
+        return delay * random.uniform(0.5, 1.5)
+
+    async def _sleep(self, seconds: float) -> None:
+        """Sleep, but wake early on report_failure() or stop()."""
+        self._wake.clear()
+        try:
+            await asyncio.wait_for(self._wake.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self) -> None:
+        """Heartbeat while connected, reconnect with backoff while not."""
+        self._events()
+        self.running = True
+        attempt = 0
+        while self.running:
+            try:
+                if self.is_ready:
+                    attempt = 0
+                    await self._sleep(self.heartbeat_interval)
+                    if self.running and self.is_ready:
+                        await self._beat()
+                    continue
+
+                if await self.connect():
+                    print(f"✅ MT5 reconnected after {attempt + 1} attempt(s)")
+                    continue
+                delay = self._backoff(attempt)
+                attempt += 1
+                logger.warning(f"MT5 reconnect attempt {attempt} failed, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+            except Exception as e:
+                logger.error(f"Error in MT5 connection supervisor: {e}")
+                await asyncio.sleep(self.heartbeat_interval)
+
+    def stop(self) -> None:
+        self.running = False
+        if self._wake is not None:
+            self._wake.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Connection health read back from the metrics registry; downtime includes any outage in progress."""
+        return {
+            'ready': self.is_ready,
+            'heartbeats': HEARTBEATS.total(),
+            'heartbeat_failures': HEARTBEATS.value(result='failed'),
+            'disconnects': DISCONNECTS.total(),
+            'reconnects': RECONNECTS.total(),
+            'reconnect_failures': RECONNECT_FAILURES.total(),
+            'downtime_seconds': round(DOWNTIME.total() + self._outage_seconds(), 3),
+            'heartbeat_ms': HEARTBEAT_LATENCY.labels().summary()
+        }
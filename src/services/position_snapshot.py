@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import time
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from src.services.mt5_api import mt5
+from src.services.mt5_executor import MT5_EXECUTOR, Priority
+
+logger = logging.getLogger('PositionSnapshot')
+
+
+class PositionEventType(Enum):
+    OPENED = 'opened'
+    CLOSED = 'closed'
+    MODIFIED = 'modified'              # SL or TP changed
+    VOLUME_CHANGED = 'volume_changed'  # partial close or add
+
+
+class PositionEvent(NamedTuple):
+    type: PositionEventType
+    ticket: str
+    position: Any             # current MT5 position; the last seen one for CLOSED
+    previous: Any = None      # position in the previous snapshot, if any
+
+
+# Snapshot of the open book: str(ticket) -> MT5 position
+Snapshot = Dict[str, Any]
+# Awaited after every successful poll with (snapshot, events, polled_at);
+# polled_at is the time.monotonic() at which positions_get was issued
+SnapshotHandler = Callable[[Snapshot, List[PositionEvent], float], Awaitable[None]]
+
+
+def position_state(position) -> Dict[str, Any]:
+    """What the proxy needs to know about an open position, without asking MT5."""
+    return {
+        'volume': float(position.volume),
+        'side': 'buy' if position.type == mt5.POSITION_TYPE_BUY else 'sell',
+        'symbol': position.symbol
+    }
+
+
+def diff_snapshots(previous: Snapshot, current: Snapshot) -> List[PositionEvent]:
+    """Typed events that turn `previous` into `current`."""
+    events = []
+    for ticket, position in current.items():
+        before = previous.get(ticket)
+        if before is None:
+            events.append(PositionEvent(PositionEventType.OPENED, ticket, position))
+            continue
+        if before.volume != position.volume:
+            events.append(PositionEvent(PositionEventType.VOLUME_CHANGED, ticket, position, before))
+        if before.sl != position.sl or before.tp != position.tp:
+            events.append(PositionEvent(PositionEventType.MODIFIED, ticket, position, before))
+    for ticket, before in previous.items():
+        if ticket not in current:
+            events.append(PositionEvent(PositionEventType.CLOSED, ticket, before, before))
+    return events
+
+
+class PositionSnapshotService:
+    """Single poller of mt5.positions_get shared by everything that watches the book.
+
+    Polls every `active_interval` seconds while positions are open and every
+    `idle_interval` seconds while the book is empty. Each poll is diffed
+    against the previous one and subscribers receive the new snapshot along
+    with the resulting events. The first poll only sets the baseline.
+    """
+
+    def __init__(self, mt5_service, active_interval: float = 0.5, idle_interval: float = 2.0):
+        self.mt5_service = mt5_service
+        self.active_interval = active_interval
+        self.idle_interval = idle_interval
+        self.snapshot: Snapshot = {}
+        self.has_baseline = False
+        self.polls = 0
+        self.running = False
+        self._handlers: List[SnapshotHandler] = []
+        self._wake: Optional[asyncio.Event] = None
+
+    def subscribe(self, handler: SnapshotHandler) -> None:
+        """Register a coroutine called after every poll."""
+        self._handlers.append(handler)
+
+    @property
+    def interval(self) -> float:
+        return self.active_interval if self.snapshot else self.idle_interval
+
+    def request_poll(self) -> None:
+        """Poll now instead of waiting out the interval (e.g. right after an order)."""
+        if self._wake is not None:
+            self._wake.set()
+
+    @staticmethod
+    def _fetch_positions():
+        """positions_get plus, when it fails, last_error read on the same executor job."""
+        positions = mt5.positions_get()
+        return positions, (mt5.last_error() if positions is None else None)
+
+    async def poll_once(self) -> Optional[List[PositionEvent]]:
+        """Fetch the book, diff it and notify subscribers; None if MT5 gave no answer."""
+        polled_at = time.monotonic()
+        positions, error = await MT5_EXECUTOR.run(Priority.POLL, 'positions_get', self._fetch_positions)
+        self.polls += 1
+        if positions is None:
+            # An error, not an empty book: never report closes from it
+            logger.warning(f"positions_get failed: {error}")
+            self.mt5_service.supervisor.report_failure('positions_get returned nothing')
+            return None
+
+        current = {str(position.ticket): position for position in positions}
+        events = diff_snapshots(self.snapshot, current) if self.has_baseline else []
+        self.snapshot = current
+        self.has_baseline = True
+
+        results = await asyncio.gather(
+            *(handler(current, events, polled_at) for handler in self._handlers),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Error in position snapshot handler: {result}")
+        return events
+
+    async def run(self) -> None:
+        """Poll until stop() is called."""
+        self.running = True
+        self._wake = asyncio.Event()
+        while self.running:
+            try:
+                await self.poll_once()
+            except Exception as e:
+                logger.error(f"Error polling positions: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def stop(self) -> None:
+        self.running = False
+        self.request_poll()
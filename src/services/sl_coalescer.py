@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import math
+from typing import Dict, List, Optional, Set
+
+from src.services.mt5_api import mt5, timed_order_send
+from src.services.mt5_executor import MT5_EXECUTOR, Priority
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger('StopLossCoalescer')
+
+MODIFICATIONS = REGISTRY.counter('tvcopier_trailing_modifications_total', 'Trailing stop SL changes by outcome', ('result',))
+
+# order_send outcomes that mean the position is gone, so retrying is pointless
+_POSITION_GONE = {
+    getattr(mt5, 'TRADE_RETCODE_POSITION_CLOSED', 10036),
+    getattr(mt5, 'TRADE_RETCODE_INVALID', 10013),
+}
+_NO_CHANGES = getattr(mt5, 'TRADE_RETCODE_NO_CHANGES', 10025)
+_TOO_MANY_REQUESTS = getattr(mt5, 'TRADE_RETCODE_TOO_MANY_REQUESTS', 10024)
+
+
+class _UnverifiedPosition:
+    """Stand-in read-back when positions_get failed; never matches a target SL."""
+    sl = math.nan
+
+
+_Unverified = _UnverifiedPosition()
+
+
+class _Target:
+    """Latest SL wanted for one ticket, plus everyone waiting on it."""
+
+    __slots__ = ('sl', 'tp', 'symbol', 'point', 'waiters')
+
+    def __init__(self, sl: float, tp: Optional[float], symbol: str):
+        self.sl = sl
+        self.tp = tp
+        self.symbol = symbol
+        self.point: Optional[float] = None  # symbol point, set once the SL is rounded to its digits
+        self.waiters: List[asyncio.Future] = []
+
+
+class StopLossCoalescer:
+    """Per-ticket SL modification queue that only ever keeps the latest target.
+
+    Each ticket has at most one order_send in flight. A new target for a
+    ticket replaces the pending one, and an attempt that is still retrying
+    is superseded before its next try. After a successful order_send the
+    ticket joins a shared verify batch: one positions_get reads back every
+    ticket waiting in that batch. Targets are rounded to the symbol's
+    digits before sending and verified to within half a point.
+    """
+
+    def __init__(self, symbols, max_attempts: int = 5, verify_delay: float = 0.05):
+        self.symbols = symbols  # SymbolMetadataCache
+        self.max_attempts = max_attempts
+        self.verify_delay = verify_delay
+        self._targets: Dict[int, _Target] = {}
+        self._drivers: Dict[int, asyncio.Task] = {}
+        self._verify_waiting: Dict[int, asyncio.Future] = {}
+        self._verify_task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.superseded = 0
+
+    def submit(self, ticket: int, sl: float, tp: Optional[float], symbol: str) -> asyncio.Future:
+        """Make `sl` the target for `ticket`; the future resolves True once it is verified.
+
+        Resolves False if the target is superseded by a newer one or given up on.
+        """
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        previous = self._targets.get(ticket)
+        target = self._targets[ticket] = _Target(sl, tp, symbol)
+        target.waiters.append(waiter)
+        if previous is not None:
+            self.superseded += 1
+            self._resolve(previous, False)
+        if ticket not in self._drivers:
+            self._drivers[ticket] = loop.create_task(self._drive(ticket))
+        return waiter
+
+    @staticmethod
+    def _resolve(target: _Target, success: bool) -> None:
+        for waiter in target.waiters:
+            if not waiter.done():
+                waiter.set_result(success)
+        target.waiters = []
+
+    def _send(self, ticket: int, target: _Target):
+        """order_send for a target; returns (result, last_error when there is no result)."""
+        metadata = self.symbols.get(target.symbol)
+        if metadata is not None:
+            # The broker stores stops at the symbol's digits; an unrounded SL would never read back equal
+            target.sl = round(target.sl, metadata.digits)
+            if target.tp:
+                target.tp = round(target.tp, metadata.digits)
+            target.point = metadata.point
+        request = {
+            "action": mt5.TRADE_ACTION_SLTP,
+            "symbol": target.symbol,
+            "position": ticket,
+            "sl": target.sl,
+            "type_time": mt5.ORDER_TIME_GTC
+        }
+        if target.tp:
+            request["tp"] = target.tp
+        result = timed_order_send(request, 'trailing')
+        # Read on the executor thread, before another command can overwrite it
+        return result, (mt5.last_error() if result is None else None)
+
+    async def _drive(self, ticket: int) -> None:
+        """Apply the latest target for one ticket until it sticks or runs out of attempts."""
+        try:
+            attempt = 0
+            while ticket in self._targets:
+                target = self._targets[ticket]
+                result, error = await MT5_EXECUTOR.run(Priority.TRAILING, 'sl_modify', self._send, ticket, target)
+                self.sent += 1
+
+                if self._targets.get(ticket) is not target:
+                    # A newer SL arrived while this one was in flight; go straight to it
+                    attempt = 0
+                    continue
+
+                retcode = result.retcode if result is not None else None
+                if retcode in _POSITION_GONE:
+                    print(f"❌ Position {ticket} not found")
+                    break
+
+                verified = False
+                if retcode in (mt5.TRADE_RETCODE_DONE, _NO_CHANGES):
+                    verified = await self._verify(ticket, target)
+                    if verified is None:
+                        print(f"❌ Position {ticket} not found")
+                        break
+                elif result is None:
+                    print(f"❌ Order send failed: {error}")
+                else:
+                    print(f"❌ Order failed: {result.comment} (Code: {result.retcode})")
+
+                if self._targets.get(ticket) is not target:
+                    attempt = 0
+                    continue
+                if verified:
+                    del self._targets[ticket]
+                    self._resolve(target, True)
+                    MODIFICATIONS.inc(result='applied')
+                    continue
+
+                attempt += 1
+                if attempt >= self.max_attempts:
+                    logger.error(f"Failed to update trailing stop for {ticket} after {self.max_attempts} attempts")
+                    break
+                wait_time = 0.1 * attempt * (5 if retcode == _TOO_MANY_REQUESTS else 1)
+                print(f"⏳ Retrying in {wait_time}s...")
+                await asyncio.sleep(wait_time)
+        except Exception as e:
+            logger.error(f"Error updating stop loss for {ticket}: {e}")
+        finally:
+            target = self._targets.pop(ticket, None)
+            if target is not None:
+                self._resolve(target, False)
+                MODIFICATIONS.inc(result='failed')
+            del self._drivers[ticket]
+
+    async def _verify(self, ticket: int, target: _Target) -> Optional[bool]:
+        """Wait for the next batched read-back; None if the position no longer exists."""
+        waiter = self._verify_waiting.get(ticket)
+        if waiter is None:
+            waiter = self._verify_waiting[ticket] = asyncio.get_running_loop().create_future()
+        if self._verify_task is None or self._verify_task.done():
+            self._verify_task = asyncio.get_running_loop().create_task(self._verify_batch())
+        position = await waiter
+        if position is None:
+            return None
+        if target.point is None:
+            return math.isclose(position.sl, target.sl, rel_tol=1e-9, abs_tol=1e-9)
+        return abs(position.sl - target.sl) < target.point / 2
+
+    async def _verify_batch(self) -> None:
+        """One positions_get for every ticket waiting to be verified."""
+        while self._verify_waiting:
+            # Give other tickets' order_send a moment to join this batch
+            await asyncio.sleep(self.verify_delay)
+            batch, self._verify_waiting = self._verify_waiting, {}
+            positions = None
+            try:
+                positions = await MT5_EXECUTOR.run(Priority.TRAILING, 'sl_verify', mt5.positions_get)
+            except Exception as e:
+                logger.error(f"Error verifying stop losses: {e}")
+            by_ticket = {position.ticket: position for position in positions or ()}
+            for ticket, waiter in batch.items():
+                if waiter.done():
+                    continue
+                if positions is None:
+                    # Read-back failed: report a mismatch so the driver retries
+                    waiter.set_result(_Unverified)
+                else:
+                    waiter.set_result(by_ticket.get(ticket))
+
+    @property
+    def pending(self) -> Set[int]:
+        """Tickets with an SL modification not yet applied."""
+        return set(self._targets)
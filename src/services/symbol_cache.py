@@ -0,0 +1,130 @@
+import logging
+import time
+from typing import Dict, Iterable, Optional
+
+from src.services.mt5_api import mt5
+
+logger = logging.getLogger('SymbolMetadataCache')
+
+# order_send retcodes that suggest the cached symbol settings are out of date
+STALE_METADATA_RETCODES = {
+    getattr(mt5, 'TRADE_RETCODE_INVALID_VOLUME', 10014),
+    getattr(mt5, 'TRADE_RETCODE_INVALID_STOPS', 10016),
+    getattr(mt5, 'TRADE_RETCODE_TRADE_DISABLED', 10017),
+    getattr(mt5, 'TRADE_RETCODE_MARKET_CLOSED', 10018),
+    getattr(mt5, 'TRADE_RETCODE_INVALID_FILL', 10030),
+}
+
+
+def filling_type_for(symbol_info) -> Optional[int]:
+    """Filling mode to request for a symbol; None to leave it to the server."""
+    filling_modes = symbol_info.filling_mode
+
+    # Don't set filling type if only one mode is supported
+    if filling_modes == 1:
+        return None
+
+    # Try different filling modes
+    if filling_modes & mt5.ORDER_FILLING_FOK:
+        return mt5.ORDER_FILLING_FOK
+    if filling_modes & mt5.ORDER_FILLING_IOC:
+        return mt5.ORDER_FILLING_IOC
+    if filling_modes & mt5.ORDER_FILLING_RETURN:
+        return mt5.ORDER_FILLING_RETURN
+    return None
+
+
+class SymbolMetadata:
+    """Static symbol settings that do not change between orders."""
+
+    __slots__ = (
+        'name',
+        'digits',
+        'point',
+        'filling_type',
+        'volume_min',
+        'volume_max',
+        'volume_step',
+        'trade_mode',
+        'stops_level',
+        'loaded_at'
+    )
+
+    def __init__(self, symbol_info):
+        self.name = symbol_info.name
+        self.digits = symbol_info.digits
+        self.point = symbol_info.point
+        self.filling_type = filling_type_for(symbol_info)
+        self.volume_min = symbol_info.volume_min
+        self.volume_max = symbol_info.volume_max
+        self.volume_step = symbol_info.volume_step
+        self.trade_mode = symbol_info.trade_mode
+        self.stops_level = symbol_info.trade_stops_level
+        self.loaded_at = time.monotonic()
+
+    def __repr__(self):
+        return f"<SymbolMetadata(name='{self.name}', digits={self.digits}, point={self.point})>"
+
+
+class SymbolMetadataCache:
+    """Selected symbols and their static settings, loaded once per TTL.
+
+    A cache hit replaces both symbol_select and symbol_info on the order
+    path; only the live tick still has to be fetched per order. Entries
+    expire after `ttl_seconds` and are dropped early when an order_send
+    retcode implies the settings changed.
+    """
+
+    def __init__(self, ttl_seconds: float = 4 * 3600):
+        self.ttl = ttl_seconds
+        self._symbols: Dict[str, SymbolMetadata] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, symbol: str) -> Optional[SymbolMetadata]:
+        """Metadata for an MT5 symbol, selecting and loading it on a miss."""
+        metadata = self._symbols.get(symbol)
+        if metadata is not None and time.monotonic() - metadata.loaded_at < self.ttl:
+            self.hits += 1
+            return metadata
+        self.misses += 1
+        return self._load(symbol)
+
+    def _load(self, symbol: str) -> Optional[SymbolMetadata]:
+        if not mt5.symbol_select(symbol, True):
+            self._symbols.pop(symbol, None)
+            return None
+        symbol_info = mt5.symbol_info(symbol)
+        if not symbol_info:
+            self._symbols.pop(symbol, None)
+            return None
+        metadata = self._symbols[symbol] = SymbolMetadata(symbol_info)
+        return metadata
+
+    def prewarm(self, symbols: Iterable[str]) -> int:
+        """Load every symbol up front; returns how many the terminal offers."""
+        loaded = 0
+        for symbol in symbols:
+            try:
+                if self._load(symbol) is not None:
+                    loaded += 1
+            except Exception as e:
+                logger.error(f"Error prewarming {symbol}: {e}")
+        return loaded
+
+    def invalidate(self, symbol: Optional[str] = None) -> None:
+        """Drop one symbol, or everything."""
+        if symbol is None:
+            self._symbols.clear()
+        else:
+            self._symbols.pop(symbol, None)
+
+    def invalidate_on_retcode(self, symbol: str, retcode: Optional[int]) -> bool:
+        """Drop a symbol if an order_send retcode implies its settings are stale."""
+        if retcode in STALE_METADATA_RETCODES:
+            self.invalidate(symbol)
+            return True
+        return False
+
+    def __len__(self) -> int:
+        return len(self._symbols)
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from src.services.mt5_api import mt5
+from src.services.mt5_executor import MT5_EXECUTOR, Priority
+from src.services.position_snapshot import PositionEventType
+
+logger = logging.getLogger('TrailingStopEngine')
+
+# Shortest cycle the engine will run at
+MIN_CYCLE_MS = 100
+
+
+def compute_trailing_stops(is_buy: np.ndarray, current_sl: np.ndarray, distance: np.ndarray,
+                           bid: np.ndarray, ask: np.ndarray, point: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """New trailing SL for every position in one pass.
+
+    Buys trail `distance` below the bid, sells `distance` above the ask,
+    snapped to the symbol's point grid. Returns (new_sl, move) where
+    `move` marks positions whose SL improves by at least one point, or
+    that have no SL yet (0.0).
+    """
+    new_sl = np.where(is_buy, bid - distance, ask + distance)
+    new_sl = np.round(new_sl / point) * point
+    # Half a point of slack absorbs float error from the snapping above
+    step = point * 0.5
+    improves = np.where(is_buy, new_sl - current_sl, current_sl - new_sl) >= point - step
+    move = (current_sl == 0.0) | improves
+    return new_sl, move
+
+
+class TrailingStopEngine:
+    """Moves trailing stops on its own cycle, independent of position polling.
+
+    Positions come from the shared PositionSnapshotService and distances
+    from the MT5Service trailing stop registry. Each cycle fetches one tick
+    per symbol in a single MT5 executor command, computes every new SL with
+    compute_trailing_stops and only sends modifications for stops that
+    actually move. A stop that keeps moving while its previous modification
+    is still in flight is coalesced by MT5Service into the latest SL.
+    """
+
+    def __init__(self, mt5_service, snapshot_service, cycle_ms: int = 250):
+        self.mt5_service = mt5_service
+        self.snapshot_service = snapshot_service
+        self.registry = mt5_service.trailing_stops
+        self.cycle = max(cycle_ms, MIN_CYCLE_MS) / 1000
+        self.running = False
+        self._sent: Dict[str, float] = {}  # ticket -> SL sent but not yet visible in a snapshot
+        self._settled_at: Dict[str, float] = {}  # ticket -> monotonic() when its modify finished
+        self._tasks: Dict[str, asyncio.Task] = {}  # latest modify per ticket; older ones are superseded
+        self.cycles = 0
+        self.modifications = 0
+
+        snapshot_service.subscribe(self.on_snapshot)
+
+    async def on_snapshot(self, snapshot: Dict[str, Any], events: list, polled_at: float) -> None:
+        """Forget closed positions and SLs the terminal now reports."""
+        for event in events:
+            if event.type == PositionEventType.CLOSED:
+                self.registry.discard(event.ticket)
+                self._sent.pop(event.ticket, None)
+                self._settled_at.pop(event.ticket, None)
+        for ticket, sent_sl in list(self._sent.items()):
+            position = snapshot.get(ticket)
+            settled_at = self._settled_at.get(ticket)
+            # A poll issued after the modify finished is authoritative, even if it failed
+            if position is None or position.sl == sent_sl or (settled_at is not None and settled_at < polled_at):
+                del self._sent[ticket]
+                self._settled_at.pop(ticket, None)
+
+    def _fetch_prices(self, symbols: List[str]) -> Dict[str, Tuple[float, float, float, int, float]]:
+        """One tick per symbol: symbol -> (bid, ask, point, digits, pip size)."""
+        prices = {}
+        for symbol in symbols:
+            # The order path's cache, so TTL expiry and stale-retcode invalidation apply here too
+            metadata = self.mt5_service.symbols.get(symbol)
+            tick = mt5.symbol_info_tick(symbol)
+            if metadata is None or not tick:
+                continue
+            pip_size = self.mt5_service.instrument_manager.get_pip_size(symbol)
+            prices[symbol] = (tick.bid, tick.ask, metadata.point, metadata.digits, pip_size)
+        return prices
+
+    async def run_cycle(self) -> int:
+        """Evaluate every trailing position once; returns the number of modifications sent."""
+        snapshot = self.snapshot_service.snapshot
+        tracked = []
+        for ticket, pips in self.registry.items():
+            position = snapshot.get(ticket)
+            if position is not None:
+                tracked.append((ticket, pips, position))
+        if not tracked:
+            return 0
+
+        symbols = sorted({position.symbol for _, _, position in tracked})
+        prices = await MT5_EXECUTOR.run(Priority.TRAILING, 'trailing_ticks', self._fetch_prices, symbols)
+
+        rows = [(ticket, pips, position) for ticket, pips, position in tracked if position.symbol in prices]
+        if not rows:
+            return 0
+        count = len(rows)
+        is_buy = np.empty(count, dtype=bool)
+        current_sl = np.empty(count)
+        distance = np.empty(count)
+        bid = np.empty(count)
+        ask = np.empty(count)
+        point = np.empty(count)
+        for i, (ticket, pips, position) in enumerate(rows):
+            symbol_bid, symbol_ask, symbol_point, digits, pip_size = prices[position.symbol]
+            is_buy[i] = position.type == mt5.POSITION_TYPE_BUY
+            current_sl[i] = self._sent.get(ticket, position.sl)
+            distance[i] = round(pips * pip_size, digits)
+            bid[i] = symbol_bid
+            ask[i] = symbol_ask
+            point[i] = symbol_point
+
+        new_sl, move = compute_trailing_stops(is_buy, current_sl, distance, bid, ask, point)
+
+        sent = 0
+        for i in np.flatnonzero(move):
+            ticket, _, position = rows[i]
+            sl = round(float(new_sl[i]), prices[position.symbol][3])
+            self._sent[ticket] = sl
+            self._settled_at.pop(ticket, None)
+            self._tasks[ticket] = asyncio.get_running_loop().create_task(
+                self._modify(ticket, sl, position.tp, position.symbol)
+            )
+            sent += 1
+        self.modifications += sent
+        return sent
+
+    async def _modify(self, ticket: str, sl: float, tp: float, symbol: str) -> None:
+        try:
+            await self.mt5_service._update_stop_loss_mt5(int(ticket), sl, tp, symbol)
+        except Exception as e:
+            logger.error(f"Error moving trailing stop for {ticket}: {e}")
+        finally:
+            # Only the latest SL for a ticket settles it; superseded ones finish early
+            if self._sent.get(ticket) == sl:
+                self._settled_at[ticket] = time.monotonic()
+                self._tasks.pop(ticket, None)
+
+    async def run(self) -> None:
+        """Run cycles until stop() is called."""
+        self.running = True
+        while self.running:
+            started = time.monotonic()
+            try:
+                # Nothing to do while the supervisor is reconnecting
+                if self.mt5_service.initialized:
+                    await self.run_cycle()
+                    self.cycles += 1
+            except Exception as e:
+                logger.error(f"Error in trailing stop cycle: {e}")
+            await asyncio.sleep(max(0.0, self.cycle - (time.monotonic() - started)))
+
+    def stop(self) -> None:
+        self.running = False
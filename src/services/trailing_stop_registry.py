@@ -0,0 +1,41 @@
+from typing import Dict, ItemsView, Optional
+
+
+class TrailingStopRegistry:
+    """Trailing stop distance (pips) per open MT5 ticket, held in memory.
+
+    Bulk-loaded from the trades table at startup and kept current by the
+    worker, so the trailing monitor never queries Postgres per position.
+    Only tickets with a trailing stop set are present.
+    """
+
+    def __init__(self):
+        self._pips: Dict[str, float] = {}
+
+    def load(self, trailing_stops: Dict[str, float]) -> None:
+        """Replace the registry with a bulk query result."""
+        self._pips = {}
+        for ticket, pips in trailing_stops.items():
+            self.set(ticket, pips)
+
+    def set(self, ticket, pips: Optional[float]) -> None:
+        """Set or clear (None/0) the trailing stop for a ticket."""
+        if pips:
+            self._pips[str(ticket)] = float(pips)
+        else:
+            self._pips.pop(str(ticket), None)
+
+    def discard(self, ticket) -> None:
+        self._pips.pop(str(ticket), None)
+
+    def get(self, ticket) -> Optional[float]:
+        return self._pips.get(str(ticket))
+
+    def items(self) -> ItemsView[str, float]:
+        return self._pips.items()
+
+    def __contains__(self, ticket) -> bool:
+        return str(ticket) in self._pips
+
+    def __len__(self) -> int:
+        return len(self._pips)
@@ -5,44 +5,52 @@ import logging
 import os
 import traceback
 from contextlib import contextmanager
-from datetime import datetime
-from typing import Any, Dict, Optional
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text, update
+from sqlalchemy import case, create_engine, func, text, update
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.pool import QueuePool
 
 from src.models.database import Trade
+from src.utils.metrics import REGISTRY
 
 logger = logging.getLogger('DatabaseHandler')
 
+WRITE_LATENCY = REGISTRY.histogram('tvcopier_db_write_ms', 'Postgres write including commit', ('op',))
+
 class DatabaseHandler:
-    def __init__(self):
+    def __init__(self, db_url: Optional[str] = None):
         try:
-            # Load environment variables
-            load_dotenv()
-            
-            # Construct database URL
-            db_url = (
-                f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@"
-                f"{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
-            )
+            if db_url is None:
+                # Load environment variables
+                load_dotenv()
+                
+                # Construct database URL
+                db_url = (
+                    f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@"
+                    f"{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+                )
             
-            # Create engine with connection pooling
-            self.engine = create_engine(
-                db_url,
-                poolclass=QueuePool,
-                pool_size=20,
-                max_overflow=10,
-                pool_timeout=30,
-                pool_recycle=1800,
-                pool_pre_ping=True,
-                connect_args={
-                    "connect_timeout": 10,
-                    "application_name": "TradingView Copier"
-                }
-            )
+            if db_url.startswith('postgresql'):
+                # Create engine with connection pooling
+                self.engine = create_engine(
+                    db_url,
+                    poolclass=QueuePool,
+                    pool_size=20,
+                    max_overflow=10,
+                    pool_timeout=30,
+                    pool_recycle=1800,
+                    pool_pre_ping=True,
+                    connect_args={
+                        "connect_timeout": 10,
+                        "application_name": "TradingView Copier"
+                    }
+                )
+            else:
+                # Any other database (sqlite for the benchmarks) gets SQLAlchemy's defaults
+                self.engine = create_engine(db_url)
             
             # Create scoped session factory
             self.SessionLocal = scoped_session(
@@ -94,7 +102,7 @@ class DatabaseHandler:
             logger.info(f"Saving trade {trade_data.get('trade_id')}")
             logger.debug(f"Trade data: {trade_data}")
             
-            with self.get_db() as db:
+            with WRITE_LATENCY.time(op='save'), self.get_db() as db:
                 trade = Trade(
                     trade_id=trade_data['trade_id'],
                     order_id=trade_data['order_id'],
@@ -126,13 +134,93 @@ class DatabaseHandler:
             logger.error(traceback.format_exc())
             raise
     
+    def _apply_journal_entry(self, db, entry: tuple) -> None:
+        """Apply a single write-behind journal entry within an open session."""
+        if entry[0] == 'save':
+            trade_data = entry[1]
+            db.add(Trade(
+                trade_id=trade_data['trade_id'],
+                order_id=trade_data['order_id'],
+                instrument=trade_data['instrument'],
+                side=trade_data['side'],
+                quantity=trade_data['quantity'],
+                type=trade_data['type'],
+                ask_price=trade_data['ask_price'],
+                bid_price=trade_data['bid_price'],
+                take_profit=trade_data.get('take_profit'),
+                stop_loss=trade_data.get('stop_loss'),
+                status=trade_data['status'],
+                tv_request=trade_data['tv_request'],
+                tv_response=trade_data['tv_response'],
+                execution_mode=trade_data.get('execution_mode', 'standard'),
+                provisional_sent_at=trade_data.get('provisional_sent_at'),
+                created_at=trade_data['created_at']
+            ))
+            # Flush so later updates in the same batch can see the row
+            db.flush()
+        elif entry[0] == 'update':
+            _, trade_id, status, update_data, from_statuses = entry
+            if from_statuses:
+                # Leave the status alone if the row already moved on
+                status = case((Trade.status.in_(from_statuses), status), else_=Trade.status)
+            stmt = (
+                update(Trade)
+                .where(Trade.trade_id == trade_id)
+                .values({
+                    'status': status,
+                    'updated_at': datetime.utcnow(),
+                    **update_data
+                })
+                .execution_options(synchronize_session=False)
+            )
+            result = db.execute(stmt)
+            if result.rowcount == 0:
+                raise Exception(f"Trade not found: {trade_id}")
+        else:
+            raise ValueError(f"Unknown journal entry: {entry[0]}")
+
+    def apply_journal_batch(self, entries: list) -> list:
+        """Persist a batch of write-behind journal entries in order.
+
+        The batch is committed as one transaction. If any entry fails, the
+        batch is replayed entry by entry so one bad row does not lose the rest.
+        Returns the entries that could not be applied; an update whose trade
+        insert failed in the same batch is not attempted and counts as failed.
+        """
+        try:
+            with WRITE_LATENCY.time(op='journal_batch'), self.get_db() as db:
+                for entry in entries:
+                    self._apply_journal_entry(db, entry)
+                db.commit()
+            return []
+        except Exception as e:
+            logger.warning(f"Journal batch of {len(entries)} failed, replaying individually: {e}")
+
+        failed = []
+        unsaved = set()
+        for entry in entries:
+            trade_id = entry[1] if entry[0] == 'update' else entry[1].get('trade_id')
+            if entry[0] == 'update' and trade_id in unsaved:
+                failed.append(entry)
+                continue
+            try:
+                with self.get_db() as db:
+                    self._apply_journal_entry(db, entry)
+                    db.commit()
+            except Exception as e:
+                logger.error(f"Error applying journal entry {entry[0]} for {trade_id}: {e}")
+                failed.append(entry)
+                if entry[0] == 'save':
+                    unsaved.add(trade_id)
+        return failed
+
     def update_trade_status(self, trade_id: str, status: str, update_data: Dict[str, Any]) -> None:
         """Update trade status with enhanced error handling."""
         try:
             logger.info(f"Updating trade {trade_id} status to {status}")
             logger.debug(f"Update data: {update_data}")
             
-            with self.get_db() as db:
+            with WRITE_LATENCY.time(op='update'), self.get_db() as db:
                 data_to_update = {
                     'status': status,
                     'updated_at': datetime.utcnow(),
@@ -195,6 +283,40 @@ class DatabaseHandler:
             logger.error(traceback.format_exc())
             raise
     
+    def get_execution_stats(self, limit: Optional[int] = None, days: Optional[int] = None) -> Dict[str, Any]:
+        """Count, average, min and max execution_time_ms over the latest trades."""
+        with self.get_db() as db:
+            query = db.query(Trade.execution_time_ms).filter(Trade.execution_time_ms.isnot(None))
+            if days is not None:
+                query = query.filter(Trade.created_at >= datetime.utcnow() - timedelta(days=days))
+            recent = query.order_by(Trade.id.desc()).limit(limit).subquery()
+            count, avg_ms, min_ms, max_ms = db.query(
+                func.count(recent.c.execution_time_ms),
+                func.avg(recent.c.execution_time_ms),
+                func.min(recent.c.execution_time_ms),
+                func.max(recent.c.execution_time_ms)
+            ).one()
+            return {
+                'count': count,
+                'avg_ms': float(avg_ms) if avg_ms is not None else None,
+                'min_ms': min_ms,
+                'max_ms': max_ms
+            }
+
+    def get_latency_traces(self, limit: int = 100, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """latency_trace of the latest traced trades (created after `since`, UTC), newest first."""
+        with self.get_db() as db:
+            query = db.query(Trade.latency_trace).filter(Trade.latency_trace.isnot(None))
+            if since is not None:
+                query = query.filter(Trade.created_at >= since)
+            rows = (
+                query
+                .order_by(Trade.id.desc())
+                .limit(limit)
+                .all()
+            )
+            return [trace for trace, in rows]
+
     def cleanup(self):
         """Cleanup database connections."""
         try:
@@ -208,7 +330,7 @@ class DatabaseHandler:
     async def async_save_trade(self, trade_data: Dict[str, Any]) -> None:
         """Save trade to database asynchronously."""
         def _save_trade():
-            with self.get_db() as db:
+            with WRITE_LATENCY.time(op='save'), self.get_db() as db:
                 try:
                     logger.info(f"Async saving trade {trade_data.get('trade_id')}")
                     trade = Trade(
@@ -240,7 +362,7 @@ class DatabaseHandler:
     async def async_update_trade_status(self, trade_id: str, status: str, update_data: Dict[str, Any]) -> None:
         """Update trade status asynchronously."""
         def _update_trade():
-            with self.get_db() as db:
+            with WRITE_LATENCY.time(op='update'), self.get_db() as db:
                 try:
                     # logger.info(f"Async updating trade {trade_id} status to {status}")
                     data_to_update = {
@@ -292,7 +414,8 @@ class DatabaseHandler:
                             'type': trade.type,
                             'take_profit': float(trade.take_profit) if trade.take_profit is not None else None,
                             'stop_loss': float(trade.stop_loss) if trade.stop_loss is not None else None,
-                            'status': trade.status
+                            'status': trade.status,
+                            'mt5_ticket': trade.mt5_ticket
                         }
                     return None
                 except Exception as e:
@@ -402,4 +525,30 @@ class DatabaseHandler:
                     logger.error(traceback.format_exc())
                     raise
 
-        return await self.loop.run_in_executor(None, _get_trade)
\ No newline at end of file
+        return await self.loop.run_in_executor(None, _get_trade)
+
+    async def async_get_trailing_stops(self) -> Dict[str, float]:
+        """Trailing stop pips for every open trade that has one, keyed by MT5 ticket."""
+        def _get_trailing_stops():
+            with self.get_db() as db:
+                try:
+                    rows = (
+                        db.query(Trade.mt5_ticket, Trade.trailing_stop_pips)
+                        .filter(
+                            Trade.mt5_ticket.isnot(None),
+                            Trade.trailing_stop_pips.isnot(None),
+                            Trade.is_closed.isnot(True)
+                        )
+                        .order_by(Trade.id)
+                        .all()
+                    )
+                    trailing_stops = {}
+                    for mt5_ticket, trailing_stop_pips in rows:
+                        # Same row async_get_trade_by_mt5_ticket would return
+                        trailing_stops.setdefault(mt5_ticket, float(trailing_stop_pips))
+                    return trailing_stops
+                except Exception as e:
+                    logger.error(f"Error in async get trailing stops: {e}")
+                    raise
+
+        return await self.loop.run_in_executor(None, _get_trailing_stops)
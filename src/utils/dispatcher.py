@@ -0,0 +1,146 @@
+import asyncio
+import logging
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Union
+
+logger = logging.getLogger('MessageDispatcher')
+
+# Awaited once a message has been handled, with whether the handler succeeded
+DoneCallback = Callable[[bool], Awaitable[None]]
+
+
+def trade_message_key(msg_type: str, data: Dict[str, Any]) -> Optional[Hashable]:
+    """Ordering key for a queue message: the TV position, else the MT5 ticket, else the symbol.
+
+    Messages with the same key are handled one at a time in arrival order;
+    status and error messages carry no key and are never held back.
+    """
+    if msg_type != 'trade':
+        return None
+    trade = data.get('data') or {}
+    execution = trade.get('execution_data') or {}
+    position_id = trade.get('position_id') or execution.get('positionId')
+    if position_id:
+        return ('position', str(position_id))
+    if trade.get('mt5_ticket'):
+        return ('ticket', str(trade['mt5_ticket']))
+    instrument = trade.get('instrument') or execution.get('instrument')
+    if instrument:
+        return ('symbol', instrument)
+    return None
+
+
+class MessageDispatcher:
+    """Hands messages from a listener thread to a pool of tasks on the worker loop.
+
+    The listener thread never waits for a handler to finish; it only blocks
+    while the bounded queue is full. Handlers for different keys run
+    concurrently up to `concurrency`; handlers sharing a key run strictly
+    in arrival order.
+
+    A callback that hands the message on (to a KeyedScheduler, say) returns
+    the job's future instead of waiting for it. The executor task moves on
+    at once and `on_done` runs when that future resolves; at most
+    `max_queue` such messages are outstanding before intake waits.
+    """
+
+    def __init__(self, callback: Callable[[str, Dict[str, Any]], Awaitable[None]],
+                 loop: asyncio.AbstractEventLoop, concurrency: int = 8, max_queue: int = 1000,
+                 key_func: Optional[Callable[[str, Dict[str, Any]], Optional[Hashable]]] = trade_message_key):
+        self.callback = callback
+        self.loop = loop
+        self.concurrency = concurrency
+        self.key_func = key_func
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._tasks: List[asyncio.Task] = []
+        self._key_locks: Dict[Hashable, asyncio.Lock] = {}
+        self._key_users: Dict[Hashable, int] = {}
+        self._handoff_slots = asyncio.Semaphore(max_queue)
+        self._settling: Set[asyncio.Task] = set()
+
+    def start(self) -> None:
+        """Start the executor tasks; must run on the dispatcher's loop."""
+        if self._tasks:
+            return
+        for i in range(self.concurrency):
+            self._tasks.append(self.loop.create_task(self._run(), name=f"dispatcher-{i}"))
+
+    def start_threadsafe(self) -> None:
+        """Schedule start() from any thread."""
+        self.loop.call_soon_threadsafe(self.start)
+
+    def submit_threadsafe(self, msg_type: str, data: Dict[str, Any],
+                          on_done: Optional[DoneCallback] = None) -> None:
+        """Enqueue a message from a non-loop thread, blocking only while the queue is full."""
+        future = asyncio.run_coroutine_threadsafe(
+            self._queue.put((msg_type, data, on_done)),
+            self.loop
+        )
+        future.result()
+
+    @property
+    def depth(self) -> int:
+        """Messages waiting for an executor task."""
+        return self._queue.qsize()
+
+    async def _run(self) -> None:
+        while True:
+            msg_type, data, on_done = await self._queue.get()
+            try:
+                key = self.key_func(msg_type, data) if self.key_func else None
+                if key is None:
+                    outcome = await self._handle(msg_type, data)
+                else:
+                    outcome = await self._handle_keyed(key, msg_type, data)
+                if isinstance(outcome, asyncio.Future):
+                    # Handed off: settle when the job finishes, without holding this task
+                    await self._handoff_slots.acquire()
+                    outcome.add_done_callback(partial(self._settle_handoff, on_done=on_done))
+                elif on_done is not None:
+                    await on_done(outcome)
+            except Exception as e:
+                logger.error(f"Error dispatching {msg_type} message: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _handle(self, msg_type: str, data: Dict[str, Any]) -> Union[bool, asyncio.Future]:
+        try:
+            result = await self.callback(msg_type, data)
+            return result if isinstance(result, asyncio.Future) else True
+        except Exception as e:
+            logger.error(f"Async callback error: {e}")
+            return False
+
+    def _settle_handoff(self, future: asyncio.Future, on_done: Optional[DoneCallback]) -> None:
+        """Report a handed-off message once its job has finished."""
+        self._handoff_slots.release()
+        success = not future.cancelled() and future.exception() is None
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Async callback error: {future.exception()}")
+        if on_done is not None:
+            task = self.loop.create_task(on_done(success))
+            self._settling.add(task)
+            task.add_done_callback(self._settling.discard)
+
+    async def _handle_keyed(self, key: Hashable, msg_type: str, data: Dict[str, Any]) -> Union[bool, asyncio.Future]:
+        # The lock is taken with no await between dequeue and acquire, and
+        # asyncio.Lock wakes waiters FIFO, so same-key order is preserved.
+        lock = self._key_locks.get(key)
+        if lock is None:
+            lock = self._key_locks[key] = asyncio.Lock()
+        self._key_users[key] = self._key_users.get(key, 0) + 1
+        try:
+            async with lock:
+                return await self._handle(msg_type, data)
+        finally:
+            self._key_users[key] -= 1
+            if self._key_users[key] == 0:
+                del self._key_users[key]
+                del self._key_locks[key]
+
+    async def stop(self) -> None:
+        """Cancel the executor tasks."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
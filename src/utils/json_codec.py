@@ -0,0 +1,64 @@
+import json
+from typing import Any, Collection, Dict, List, Optional
+
+# Pick the fastest JSON backend available; all of them parse bytes directly
+try:
+    import orjson
+    BACKEND = 'orjson'
+except ImportError:
+    orjson = None
+    try:
+        import msgspec
+        BACKEND = 'msgspec'
+    except ImportError:
+        msgspec = None
+        BACKEND = 'json'
+
+
+if BACKEND == 'msgspec':
+    class _ExecutionHead(msgspec.Struct):
+        """Only the field needed to decide whether an execution is ours."""
+        orderId: Any = None
+
+    class _ExecutionEnvelope(msgspec.Struct):
+        """Executions response with entries left as undecoded JSON."""
+        s: Optional[str] = None
+        d: List[msgspec.Raw] = []
+
+    _json_decoder = msgspec.json.Decoder()
+    _head_decoder = msgspec.json.Decoder(_ExecutionHead)
+    _envelope_decoder = msgspec.json.Decoder(_ExecutionEnvelope)
+
+
+def loads(data: bytes) -> Any:
+    """Decode a JSON document straight from a bytes buffer."""
+    if BACKEND == 'orjson':
+        return orjson.loads(data)
+    if BACKEND == 'msgspec':
+        return _json_decoder.decode(data)
+    return json.loads(data)
+
+
+def decode_executions(data: bytes, order_ids: Collection[str]) -> Dict[str, Any]:
+    """Decode an /executions response, keeping only entries for the given order ids.
+
+    The poll returns the whole fill history every time, so the body is first
+    scanned for the raw id bytes and left undecoded when none of them occur.
+    """
+    if not order_ids or not any(str(order_id).encode() in data for order_id in order_ids):
+        return {'s': 'ok', 'd': []}
+
+    if BACKEND == 'msgspec':
+        envelope = _envelope_decoder.decode(data)
+        matched = []
+        for raw in envelope.d:
+            if _head_decoder.decode(raw).orderId in order_ids:
+                matched.append(_json_decoder.decode(raw))
+        return {'s': envelope.s, 'd': matched}
+
+    response = loads(data)
+    response['d'] = [
+        execution for execution in response.get('d', [])
+        if execution.get('orderId') in order_ids
+    ]
+    return response
@@ -0,0 +1,95 @@
+import bisect
+import math
+import threading
+from typing import Dict, List
+
+
+class LatencyHistogram:
+    """Log-linear latency histogram with bounded relative error.
+
+    Each power of two is split into `sub_buckets` linear buckets, so any
+    recorded value is reported within 1/sub_buckets of its true value
+    regardless of magnitude. Recording is O(1) and memory is fixed.
+    """
+
+    def __init__(self, name: str, unit: str = 'ms', min_value: float = 0.001,
+                 max_value: float = 600_000.0, sub_buckets: int = 16):
+        self.name = name
+        self.unit = unit
+        self._lock = threading.Lock()
+
+        # Precompute bucket upper bounds from min_value up to max_value
+        bounds: List[float] = []
+        magnitude = min_value
+        while magnitude < max_value:
+            step = magnitude / sub_buckets
+            for i in range(1, sub_buckets + 1):
+                bounds.append(magnitude + step * i)
+            magnitude *= 2
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is overflow
+
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, value: float) -> None:
+        """Record one observation."""
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+            if value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, p: float) -> float:
+        """Approximate value at percentile p (0-100)."""
+        with self._lock:
+            if self.count == 0:
+                return 0.0
+            target = max(1, math.ceil(self.count * p / 100))
+            running = 0
+            for index, bucket_count in enumerate(self.counts):
+                running += bucket_count
+                if running >= target:
+                    if index >= len(self.bounds):
+                        return self.max
+                    return min(self.bounds[index], self.max)
+            return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """Count, mean and common percentiles."""
+        if self.count == 0:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': self.total / self.count,
+            'min': self.min,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max
+        }
+
+    def format_summary(self) -> str:
+        """One-line human readable summary."""
+        stats = self.summary()
+        if not stats['count']:
+            return f"{self.name}: no samples"
+        return (
+            f"{self.name}: n={stats['count']} "
+            f"p50={stats['p50']:.2f}{self.unit} p90={stats['p90']:.2f}{self.unit} "
+            f"p99={stats['p99']:.2f}{self.unit} max={stats['max']:.2f}{self.unit}"
+        )
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts = [0] * (len(self.bounds) + 1)
+            self.count = 0
+            self.total = 0.0
+            self.min = math.inf
+            self.max = 0.0
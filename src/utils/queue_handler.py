@@ -1,17 +1,41 @@
 import asyncio
 import json
 import logging
+import threading
+import time
 from datetime import datetime
 from functools import partial
-from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple, Union
 
 import redis
+import redis.asyncio as aioredis
+
+from src.config.queue_config import QUEUE_CONFIG
+from src.utils.dispatcher import MessageDispatcher, trade_message_key
+from src.utils.metrics import REGISTRY
 
 logger = logging.getLogger('RedisQueue')
 
+PUBLISH_LATENCY = REGISTRY.histogram('tvcopier_queue_publish_ms', 'Redis publish of one trade message', ('transport',))
+PUBLISH_ERRORS = REGISTRY.counter('tvcopier_queue_publish_errors_total', 'Trade messages that could not be published', ('transport',))
+
 class RedisQueue:
-    def __init__(self, host='localhost', port=6379, db=0):
+    def __init__(self, host=None, port=None, db=0, max_async_connections=10, transport=None, key_prefix=None):
         self.logger = logging.getLogger('RedisQueue')
+        host = host or QUEUE_CONFIG['host']
+        port = port or QUEUE_CONFIG['port']
+
+        # 'pubsub' or 'streams' (see src/config/queue_config.py)
+        self.transport = transport or QUEUE_CONFIG['transport']
+        if self.transport not in ('pubsub', 'streams'):
+            raise ValueError(f"Unknown Redis transport: {self.transport}")
+        # Namespace for every Redis name below (see REDIS_KEY_PREFIX)
+        self.key_prefix = QUEUE_CONFIG['key_prefix'] if key_prefix is None else key_prefix
+        self.stream = self.key_prefix + QUEUE_CONFIG['stream']
+        self.dead_letter_stream = self.key_prefix + QUEUE_CONFIG['dead_letter_stream']
+        self.position_state_key = self.key_prefix + QUEUE_CONFIG['position_state_key']
+        self.group = QUEUE_CONFIG['group']
+        self.consumer = QUEUE_CONFIG['consumer']
         
         # Main Redis connection for operations
         self.redis = redis.Redis(
@@ -22,57 +46,100 @@ class RedisQueue:
             socket_timeout=5
         )
 
+        # Native asyncio client, created on first use so it binds to the running loop
+        self._async_params = {
+            'host': host,
+            'port': port,
+            'db': db,
+            'decode_responses': True,
+            'socket_timeout': 5,
+            'max_connections': max_async_connections
+        }
+        self.async_redis: Optional[aioredis.Redis] = None
+
         # Channel names for pub/sub
         self.channels = {
-            'trades': 'trades:channel',      # Main trade execution channel
-            'status': 'trades:status',       # Status updates channel
-            'errors': 'trades:errors'        # Error notifications channel
+            'trades': self.key_prefix + 'trades:channel',      # Main trade execution channel
+            'status': self.key_prefix + 'trades:status',       # Status updates channel
+            'errors': self.key_prefix + 'trades:errors'        # Error notifications channel
         }
 
         # Initialize event loop for async operations
         self.loop = asyncio.get_event_loop()
         self.pubsub = None
         self.pubsub_thread = None
+        self.stream_thread = None
+        self._stream_stop = threading.Event()
+        self._inflight_entries = set()  # stream entry ids handed to the dispatcher, not yet acked
+        self.dispatcher: Optional[MessageDispatcher] = None
         
         # Initialize Redis
         self._init_redis()
     
     def _init_redis(self) -> None:
-        """Initialize Redis and clean up any stale data."""
-        try:
-            # Clear any old data
-            self.redis.delete(
-                'trades:pending',
-                'trades:processing',
-                'trades:completed',
-                'trades:failed'
-            )
-            
+        """Initialize Redis."""
+        try:
             # Publish system startup message
             self.publish_status("Queue system initialized\n")
             
         except Exception as e:
             self.logger.error(f"Error initializing Redis: {e}")
     
+    def _get_async_redis(self) -> aioredis.Redis:
+        """Get the pooled asyncio client, creating it on the running loop."""
+        if self.async_redis is None:
+            self.async_redis = aioredis.Redis(
+                connection_pool=aioredis.ConnectionPool(**self._async_params)
+            )
+        return self.async_redis
+
+    @staticmethod
+    def _status_message(message: str) -> str:
+        return json.dumps({
+            'type': 'status',
+            'message': message,
+            'timestamp': datetime.now().isoformat()
+        })
+
+    @staticmethod
+    def _error_message(error: Exception) -> str:
+        return json.dumps({
+            'error': str(error),
+            'timestamp': datetime.now().isoformat()
+        })
+
+    @staticmethod
+    def _trade_message(trade_data: Dict[str, Any]) -> Tuple[str, str]:
+        """Build the trade message; returns (message id, serialized payload)."""
+        # Generate trade ID
+        trade_id = f"trade_{datetime.now().timestamp()}"
+        
+        # Add trade ID and timestamp if not present
+        if isinstance(trade_data, dict):
+            if 'trade_id' not in trade_data:
+                trade_data['trade_id'] = trade_id
+
+        # Prepare message
+        message = {
+            'id': trade_id,
+            'data': trade_data,
+            'timestamp': datetime.now().isoformat()
+        }
+        return trade_id, json.dumps(message)
+
     def publish_status(self, message: str) -> None:
         """Publish status update."""
         try:
-            self.redis.publish(self.channels['status'], 
-                             json.dumps({
-                                 'type': 'status',
-                                 'message': message,
-                                 'timestamp': datetime.now().isoformat()
-                             }))
+            self.redis.publish(self.channels['status'], self._status_message(message))
         except Exception as e:
             self.logger.error(f"Error publishing status: {e}")
     
     async def async_publish_status(self, message: str) -> None:
         """Publish status update asynchronously."""
         try:
-            await self.loop.run_in_executor(
-                None,
-                self.publish_status,
-                message
+            await self._get_async_redis().publish(
+                self.channels['status'],
+                self._status_message(message)
             )
         except Exception as e:
             self.logger.error(f"Error publishing async status: {e}")
@@ -80,26 +147,14 @@ class RedisQueue:
     def push_trade(self, trade_data: Dict[str, Any]) -> str:
         """Publish trade data to channel."""
         try:
-            # Generate trade ID
-            trade_id = f"trade_{datetime.now().timestamp()}"
-            
-            # Add trade ID and timestamp if not present
-            if isinstance(trade_data, dict):
-                if 'trade_id' not in trade_data:
-                    trade_data['trade_id'] = trade_id
-
-            # Prepare message
-            message = {
-                'id': trade_id,
-                'data': trade_data,
-                'timestamp': datetime.now().isoformat()
-            }
+            trade_id, payload = self._trade_message(trade_data)
             
-            # Publish to trades channel
-            self.redis.publish(
-                self.channels['trades'],
-                json.dumps(message)
-            )
+            if self.transport == 'streams':
+                self.redis.xadd(self.stream, {'payload': payload},
+                                maxlen=QUEUE_CONFIG['maxlen'], approximate=True)
+            else:
+                # Publish to trades channel
+                self.redis.publish(self.channels['trades'], payload)
             
             self.logger.info(f"Trade {trade_id} published to channel")
             return trade_id
@@ -107,45 +162,75 @@ class RedisQueue:
         except Exception as e:
             self.logger.error(f"Error publishing trade: {e}")
             # Publish error
-            self.redis.publish(
-                self.channels['errors'],
-                json.dumps({
-                    'error': str(e),
-                    'timestamp': datetime.now().isoformat()
-                })
-            )
+            self.redis.publish(self.channels['errors'], self._error_message(e))
             raise
     
     async def async_push_trade(self, trade_data: Dict[str, Any]) -> str:
         """Publish trade data to channel asynchronously."""
+        client = self._get_async_redis()
         try:
-            result = await self.loop.run_in_executor(
-                None,
-                self.push_trade,
-                trade_data
-            )
-            return result
+            trade_id, payload = self._trade_message(trade_data)
+            with PUBLISH_LATENCY.time(transport=self.transport):
+                if self.transport == 'streams':
+                    await client.xadd(self.stream, {'payload': payload},
+                                      maxlen=QUEUE_CONFIG['maxlen'], approximate=True)
+                else:
+                    await client.publish(self.channels['trades'], payload)
+            
+            self.logger.info(f"Trade {trade_id} published to channel")
+            return trade_id
+            
         except Exception as e:
             self.logger.error(f"Error publishing async trade: {e}")
+            PUBLISH_ERRORS.inc(transport=self.transport)
+            try:
+                await client.publish(self.channels['errors'], self._error_message(e))
+            except Exception:
+                pass
             raise
 
+    async def async_push_prepare(self, instrument: str, side: Optional[str] = None) -> None:
+        """Hint the worker to warm up an instrument before its fill arrives; best effort."""
+        try:
+            await self.async_push_trade({'type': 'prepare', 'instrument': instrument, 'side': side})
+        except Exception as e:
+            self.logger.error(f"Error publishing prepare for {instrument}: {e}")
+
+    async def async_publish_position_state(self, upserts: Dict[str, Dict[str, Any]],
+                                           removed: Iterable[str] = (), replace: bool = False) -> None:
+        """Write open positions to the shared position state hash in one round trip.
+
+        `replace` drops every ticket not in `upserts` (used for the first snapshot).
+        """
+        key = self.position_state_key
+        pipe = self._get_async_redis().pipeline(transaction=True)
+        if replace:
+            pipe.delete(key)
+        if upserts:
+            pipe.hset(key, mapping={ticket: json.dumps(state) for ticket, state in upserts.items()})
+        removed = list(removed)
+        if removed:
+            pipe.hdel(key, *removed)
+        await pipe.execute()
+
+    async def async_get_position_state(self, mt5_ticket: Any) -> Optional[Dict[str, Any]]:
+        """Last published state of an open position; None if the worker has not reported it."""
+        try:
+            state = await self._get_async_redis().hget(self.position_state_key, str(mt5_ticket))
+            return json.loads(state) if state else None
+        except Exception as e:
+            self.logger.error(f"Error reading position state for {mt5_ticket}: {e}")
+            return None
+
     def _handle_message(self, callback: Union[Callable, Awaitable], msg_type: str) -> Callable:
         """Create message handler that supports both sync and async callbacks."""
         def handler(message):
             try:
                 if message['type'] == 'message':
                     data = json.loads(message['data'])
-                    if asyncio.iscoroutinefunction(callback):
-                        # Handle async callback
-                        future = asyncio.run_coroutine_threadsafe(
-                            callback(msg_type, data),
-                            self.loop
-                        )
-                        # Handle any exceptions from the future
-                        try:
-                            future.result(timeout=10)  # 10 second timeout
-                        except Exception as e:
-                            self.logger.error(f"Async callback error: {e}")
+                    if self.dispatcher is not None:
+                        # Handle async callback on the worker loop without waiting for it
+                        self.dispatcher.submit_threadsafe(msg_type, data)
                     else:
                         # Handle sync callback
                         callback(msg_type, data)
@@ -153,26 +238,193 @@ class RedisQueue:
                 self.logger.error(f"Error handling {msg_type} message: {e}")
         return handler
     
-    def subscribe(self, callback: Callable[[str, Dict], None]) -> None:
-        """Subscribe to trade channel with callback."""
+    def subscribe(self, callback: Callable[[str, Dict], None], key_func: Optional[Callable] = trade_message_key) -> None:
+        """Subscribe to trade channel with callback.
+
+        Async callbacks run on `self.loop` through a MessageDispatcher, so the
+        listener thread never waits on a handler. `key_func` picks the
+        ordering key (None disables per-key ordering).
+        """
         try:
+            if asyncio.iscoroutinefunction(callback):
+                self.dispatcher = MessageDispatcher(
+                    callback,
+                    self.loop,
+                    concurrency=QUEUE_CONFIG['dispatch_concurrency'],
+                    max_queue=QUEUE_CONFIG['dispatch_queue_size'],
+                    key_func=key_func
+                )
+                self.dispatcher.start_threadsafe()
+
             # Create new connection for subscription
             self.pubsub = self.redis.pubsub()
             
-            # Subscribe to all channels
-            self.pubsub.subscribe(**{
-                self.channels['trades']: self._handle_message(callback, 'trade'),
+            # Trades come from the stream when it is the configured transport
+            handlers = {
                 self.channels['status']: self._handle_message(callback, 'status'),
                 self.channels['errors']: self._handle_message(callback, 'error')
-            })
+            }
+            if self.transport == 'pubsub':
+                handlers[self.channels['trades']] = self._handle_message(callback, 'trade')
+            
+            # Subscribe to all channels
+            self.pubsub.subscribe(**handlers)
             
             # Start listening
             # self.logger.info("Subscribed to trade channels")
             self.pubsub_thread = self.pubsub.run_in_thread(sleep_time=0.001)
+
+            if self.transport == 'streams':
+                self._ensure_consumer_group()
+                self._stream_stop.clear()
+                self.stream_thread = threading.Thread(
+                    target=self._stream_loop,
+                    args=(callback,),
+                    name='RedisStreamConsumer',
+                    daemon=True
+                )
+                self.stream_thread.start()
             
         except Exception as e:
             self.logger.error(f"Error subscribing: {e}")
             raise
+
+    def _ensure_consumer_group(self) -> None:
+        """Create the consumer group (and stream) if it does not exist yet."""
+        try:
+            # Start from the beginning so trades published before the first worker start are kept
+            self.redis.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def _stream_loop(self, callback: Union[Callable, Awaitable]) -> None:
+        """Read trades from the stream in batches and ack each one once handled."""
+        batch_size = QUEUE_CONFIG['batch_size']
+        block_ms = QUEUE_CONFIG['block_ms']
+        claim_interval = QUEUE_CONFIG['claim_idle_ms'] / 1000 / 2
+        last_claim = 0.0
+
+        # Re-deliver our own entries left unacked by a previous run first
+        read_id = '0'
+
+        while not self._stream_stop.is_set():
+            try:
+                if time.monotonic() - last_claim >= claim_interval:
+                    last_claim = time.monotonic()
+                    self._handle_stream_entries(callback, self._claim_stale_entries(), redelivered=True)
+
+                reading_backlog = read_id != '>'
+                response = self.redis.xreadgroup(
+                    self.group,
+                    self.consumer,
+                    {self.stream: read_id},
+                    count=batch_size,
+                    block=None if reading_backlog else block_ms
+                )
+                entries = response[0][1] if response else []
+
+                if reading_backlog:
+                    if not entries:
+                        read_id = '>'  # backlog drained, switch to new entries
+                        continue
+                    # Entries that fail again stay pending for XAUTOCLAIM; move past them
+                    read_id = entries[-1][0]
+
+                self._handle_stream_entries(callback, entries, redelivered=reading_backlog)
+                
+            except Exception as e:
+                if self._stream_stop.is_set():
+                    break
+                self.logger.error(f"Error reading trade stream: {e}")
+                self._stream_stop.wait(1)
+
+    def _stream_ack(self, entry_id: str) -> Callable:
+        """Build the dispatcher completion callback that acks one stream entry."""
+        async def on_done(success: bool) -> None:
+            self._inflight_entries.discard(entry_id)
+            if success:
+                await self._get_async_redis().xack(self.stream, self.group, entry_id)
+            # Failed entries stay pending; XAUTOCLAIM retries them after claim_idle_ms
+        return on_done
+
+    def _handle_stream_entries(self, callback: Union[Callable, Awaitable], entries: list,
+                               redelivered: bool = False) -> None:
+        """Dispatch stream entries in order, acknowledging the successful ones.
+
+        Redelivered entries (claimed or left pending by an earlier run) are
+        flagged so the worker can check it has not already acted on them.
+        """
+        for entry_id, fields in entries:
+            if entry_id in self._inflight_entries:
+                continue  # still being handled, not stuck
+            if not fields:
+                # Entry was trimmed from the stream while pending
+                self.redis.xack(self.stream, self.group, entry_id)
+                continue
+            try:
+                data = json.loads(fields['payload'])
+            except Exception as e:
+                self.logger.error(f"Dropping malformed stream entry {entry_id}: {e}")
+                self._dead_letter(entry_id, fields, str(e))
+                continue
+            if redelivered and isinstance(data.get('data'), dict):
+                data['data']['redelivered'] = True
+
+            try:
+                if self.dispatcher is not None:
+                    self._inflight_entries.add(entry_id)
+                    self.dispatcher.submit_threadsafe('trade', data, self._stream_ack(entry_id))
+                else:
+                    callback('trade', data)
+                    self.redis.xack(self.stream, self.group, entry_id)
+            except Exception as e:
+                # Left pending; XAUTOCLAIM retries it after claim_idle_ms
+                self.logger.error(f"Error handling stream entry {entry_id}: {e}")
+
+    def _claim_stale_entries(self) -> list:
+        """Take over entries stuck with a dead or slow consumer.
+
+        Entries delivered more than max_deliveries times are moved to the
+        dead-letter stream instead of being retried forever.
+        """
+        idle_ms = QUEUE_CONFIG['claim_idle_ms']
+        batch_size = QUEUE_CONFIG['batch_size']
+
+        stale = self.redis.xpending_range(
+            self.stream, self.group, min='-', max='+', count=batch_size, idle=idle_ms
+        )
+        for pending in stale:
+            if pending['message_id'] in self._inflight_entries:
+                continue
+            if pending['times_delivered'] >= QUEUE_CONFIG['max_deliveries']:
+                entries = self.redis.xrange(self.stream, pending['message_id'], pending['message_id'])
+                fields = entries[0][1] if entries else {}
+                self._dead_letter(pending['message_id'], fields,
+                                  f"Exceeded {QUEUE_CONFIG['max_deliveries']} deliveries")
+
+        response = self.redis.xautoclaim(
+            self.stream, self.group, self.consumer, min_idle_time=idle_ms, start_id='0-0', count=batch_size
+        )
+        # Reply is [next_start_id, entries, (deleted ids on Redis 7+)]
+        return response[1] if response else []
+
+    def _dead_letter(self, entry_id: str, fields: Dict[str, Any], reason: str) -> None:
+        """Move an entry to the dead-letter stream and ack it."""
+        try:
+            self.redis.xadd(self.dead_letter_stream, {
+                'entry_id': entry_id,
+                'payload': fields.get('payload', ''),
+                'reason': reason,
+                'timestamp': datetime.now().isoformat()
+            }, maxlen=QUEUE_CONFIG['maxlen'], approximate=True)
+            self.redis.xack(self.stream, self.group, entry_id)
+            self.redis.publish(self.channels['errors'], json.dumps({
+                'error': f"Trade stream entry {entry_id} dead-lettered: {reason}",
+                'timestamp': datetime.now().isoformat()
+            }))
+        except Exception as e:
+            self.logger.error(f"Error dead-lettering stream entry {entry_id}: {e}")
     
     async def async_subscribe(self, callback: Union[Callable, Awaitable]) -> None:
         """Subscribe to trade channels asynchronously."""
@@ -189,11 +441,22 @@ class RedisQueue:
     def get_queue_status(self) -> Dict[str, int]:
         """Get current queue status."""
         try:
-            return {
+            status = {
                 'trades_channel': self.redis.pubsub_numsub(self.channels['trades'])[0][1],
                 'status_channel': self.redis.pubsub_numsub(self.channels['status'])[0][1],
                 'errors_channel': self.redis.pubsub_numsub(self.channels['errors'])[0][1]
             }
+            if self.dispatcher is not None:
+                status['dispatch_depth'] = self.dispatcher.depth
+            if self.transport == 'streams':
+                # Backpressure: entries in the stream, delivered but unacked, and not yet delivered
+                status['stream_length'] = self.redis.xlen(self.stream)
+                status['stream_pending'] = self.redis.xpending(self.stream, self.group)['pending']
+                for group in self.redis.xinfo_groups(self.stream):
+                    if group['name'] == self.group:
+                        status['stream_lag'] = group.get('lag')
+                status['dead_letters'] = self.redis.xlen(self.dead_letter_stream)
+            return status
         except Exception as e:
             self.logger.error(f"Error getting queue status: {e}")
             return {'error': str(e)}
@@ -212,6 +475,13 @@ class RedisQueue:
     def cleanup(self) -> None:
         """Cleanup Redis connections with proper thread shutdown."""
         try:
+            # Stop stream consumer if running
+            if self.stream_thread is not None:
+                self.logger.info("Stopping stream consumer...")
+                self._stream_stop.set()
+                self.stream_thread.join(timeout=QUEUE_CONFIG['block_ms'] / 1000 + 1.0)
+                self.stream_thread = None
+            
             # Stop pubsub thread if running
             if self.pubsub_thread is not None:
                 self.logger.info("Stopping pubsub thread...")
@@ -219,6 +489,11 @@ class RedisQueue:
                 self.pubsub_thread.join(timeout=1.0)  # Wait for thread to finish
                 self.pubsub_thread = None
             
+            # Stop dispatcher tasks once no listener can submit to them
+            if self.dispatcher is not None:
+                self.logger.info("Stopping message dispatcher...")
+                self._stop_dispatcher()
+            
             # Unsubscribe and close pubsub connection
             if self.pubsub is not None:
                 self.logger.info("Closing pubsub connection...")
@@ -226,6 +501,11 @@ class RedisQueue:
                 self.pubsub.close()
                 self.pubsub = None
             
+            # Close the asyncio client pool
+            if self.async_redis is not None:
+                self.logger.info("Closing async Redis connection...")
+                self._close_async_redis()
+            
             # Close main Redis connection
             if self.redis is not None:
                 self.logger.info("Closing main Redis connection...")
@@ -234,4 +514,37 @@ class RedisQueue:
             
             self.logger.info("Redis connections cleaned up")
         except Exception as e:
-            self.logger.error(f"Error during Redis cleanup: {e}")
\ No newline at end of file
+            self.logger.error(f"Error during Redis cleanup: {e}")
+
+    def _stop_dispatcher(self) -> None:
+        """Cancel the dispatcher's tasks on its loop from synchronous cleanup code."""
+        dispatcher, self.dispatcher = self.dispatcher, None
+        loop = dispatcher.loop
+        try:
+            if loop.is_closed():
+                return
+            if loop.is_running():
+                future = asyncio.run_coroutine_threadsafe(dispatcher.stop(), loop)
+                try:
+                    running = asyncio.get_running_loop()
+                except RuntimeError:
+                    running = None
+                if running is not loop:
+                    future.result(timeout=1.0)
+            else:
+                loop.run_until_complete(dispatcher.stop())
+        except Exception as e:
+            self.logger.error(f"Error stopping message dispatcher: {e}")
+
+    def _close_async_redis(self) -> None:
+        """Close the asyncio client from synchronous cleanup code."""
+        client, self.async_redis = self.async_redis, None
+        close = getattr(client, 'aclose', None) or client.close
+        try:
+            loop = asyncio.get_event_loop()
+            if loop.is_running():
+                loop.create_task(close())
+            elif not loop.is_closed():
+                loop.run_until_complete(close())
+        except Exception as e:
+            self.logger.error(f"Error closing async Redis connection: {e}")
@@ -4,9 +4,8 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, Optional, Set
 
-import MetaTrader5 as mt5
-
 from src.config.mt5_config import MT5_CONFIG
+from src.services.mt5_api import mt5
 from src.services.mt5_service import MT5Service
 
 logger = logging.getLogger('SymbolMapper')
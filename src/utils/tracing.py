@@ -0,0 +1,93 @@
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.utils.latency import LatencyHistogram
+
+# Pipeline stages in the order a copied order passes through them
+STAGES = (
+    'intercept',         # proxy: order POST seen
+    'order_response',    # proxy: TradingView accepted the order
+    'execution_seen',    # proxy: fill found in an executions poll
+    'db_write',          # proxy: trade row confirmed durable, just before the publish
+    'worker_receive',    # worker: message taken off Redis (publish plus transport)
+    'order_send_start',  # worker: mt5.order_send called
+    'order_send_end',    # worker: mt5.order_send returned
+    'db_update',         # worker: final status write issued
+)
+
+
+class TraceContext:
+    """High-resolution timestamps for one trade from interception to the MT5 fill.
+
+    Marks are stored as microseconds after `origin_ns`, a
+    time.perf_counter_ns() taken at interception. time.monotonic_ns() only
+    ticks at the system timer on Windows (about 15.6ms), too coarse for
+    sub-millisecond stages; perf_counter is QPC-backed there and, like
+    CLOCK_MONOTONIC elsewhere, shared by every process on a host, so the
+    proxy and the worker mark against the same origin when they run on the
+    same machine. The trace travels inside the Redis message and is stored
+    compactly with the trade.
+    """
+
+    __slots__ = ('origin_ns', 'wall_ms', 'marks')
+
+    def __init__(self, origin_ns: Optional[int] = None, wall_ms: Optional[int] = None,
+                 marks: Optional[Dict[str, int]] = None):
+        self.origin_ns = time.perf_counter_ns() if origin_ns is None else origin_ns
+        self.wall_ms = int(time.time() * 1000) if wall_ms is None else wall_ms
+        self.marks: Dict[str, int] = marks if marks is not None else {}
+
+    @classmethod
+    def start(cls, stage: str = 'intercept') -> 'TraceContext':
+        trace = cls()
+        trace.marks[stage] = 0
+        return trace
+
+    def mark(self, stage: str) -> None:
+        """Record `stage` now; the first mark of a stage wins."""
+        if stage not in self.marks:
+            self.marks[stage] = (time.perf_counter_ns() - self.origin_ns) // 1000
+
+    def to_wire(self) -> Dict[str, Any]:
+        """Compact JSON form, used both in Redis messages and the trades.latency_trace column."""
+        return {'o': self.origin_ns, 'w': self.wall_ms, 'us': self.marks}
+
+    @classmethod
+    def from_wire(cls, data: Optional[Dict[str, Any]]) -> Optional['TraceContext']:
+        if not data:
+            return None
+        try:
+            return cls(int(data['o']), int(data['w']), {stage: int(us) for stage, us in data['us'].items()})
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def spans(self) -> List[Tuple[str, float]]:
+        """('from->to', ms) between consecutive recorded stages."""
+        recorded = [(stage, self.marks[stage]) for stage in STAGES if stage in self.marks]
+        return [
+            (f"{before}->{after}", (at - started) / 1000)
+            for (before, started), (after, at) in zip(recorded, recorded[1:])
+        ]
+
+    def total_ms(self) -> float:
+        return max(self.marks.values(), default=0) / 1000
+
+    def format(self) -> str:
+        return " | ".join(f"{name.split('->')[1]} +{ms:.1f}" for name, ms in self.spans())
+
+    def __repr__(self):
+        return f"<TraceContext(total_ms={self.total_ms():.1f}, stages={list(self.marks)})>"
+
+
+def stage_histograms(traces: Iterable[TraceContext]) -> Dict[str, LatencyHistogram]:
+    """Per-span latency distributions over many traces, in pipeline order, plus 'total'."""
+    stages: Dict[str, LatencyHistogram] = {}
+    for trace in traces:
+        for name, ms in trace.spans():
+            stages.setdefault(name, LatencyHistogram(name)).record(ms)
+        stages.setdefault('total', LatencyHistogram('total')).record(trace.total_ms())
+    order = {stage: i for i, stage in enumerate(STAGES)}
+    return {
+        name: stages[name]
+        for name in sorted(stages, key=lambda name: order.get(name.split('->')[-1], len(STAGES)))
+    }
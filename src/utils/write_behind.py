@@ -0,0 +1,162 @@
+import asyncio
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger('WriteBehindJournal')
+
+# Journal entries: ('save', trade_data) or
+# ('update', trade_id, status, update_data, from_statuses)
+JournalEntry = Tuple[Any, ...]
+
+
+class JournalWriteError(Exception):
+    """A trade's row could not be inserted, even after retrying."""
+
+
+class WriteBehindJournal:
+    """Bounded in-memory journal that persists trade writes off the hot path.
+
+    Callers enqueue writes and return immediately; a single flusher task
+    applies them to Postgres in batches, one transaction per batch, in the
+    order they were enqueued. When the journal is full, enqueueing waits,
+    so a stalled database slows producers down instead of dropping rows.
+    Entries that fail are retried with backoff before the next batch; a
+    trade whose insert is given up on makes wait_saved() raise.
+    """
+
+    def __init__(self, db, max_pending: int = 1000, batch_size: int = 50,
+                 max_retries: int = 5, retry_delay: float = 0.5):
+        self.db = db
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._unsaved: Dict[str, asyncio.Event] = {}  # trade_id -> set once its insert is settled
+        self._rejected: Set[str] = set()  # trade_ids whose insert was given up on
+        # One writer thread keeps batches in order; the running batch is tracked for flush_sync
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='journal')
+        self._in_flight: Optional[Tuple[List[JournalEntry], Future]] = None
+
+    def _ensure_started(self) -> asyncio.Queue:
+        """Create the queue and flusher on the running loop (first use)."""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+        return self._queue
+
+    async def save_trade(self, trade_data: Dict[str, Any]) -> None:
+        """Queue a new trade row."""
+        self._unsaved[trade_data['trade_id']] = asyncio.Event()
+        await self._ensure_started().put(('save', trade_data))
+
+    async def update_trade_status(self, trade_id: str, status: str, update_data: Dict[str, Any],
+                                  from_statuses: Optional[Tuple[str, ...]] = None) -> None:
+        """Queue a status update for an existing trade.
+
+        With `from_statuses`, the status only changes if the row is still in
+        one of them, so a late flush cannot overwrite a status the worker set.
+        """
+        await self._ensure_started().put(('update', trade_id, status, update_data, from_statuses))
+
+    async def wait_saved(self, trade_id: str) -> None:
+        """Wait until the trade's row exists; returns at once if already flushed.
+
+        Raises JournalWriteError if the insert was given up on.
+        """
+        event = self._unsaved.get(trade_id)
+        if event is not None:
+            self._ensure_started()
+            await event.wait()
+        if trade_id in self._rejected:
+            raise JournalWriteError(f"Trade {trade_id} could not be saved")
+
+    async def drain(self) -> None:
+        """Wait until every write queued so far has been persisted."""
+        if self._queue is not None:
+            self._ensure_started()
+            await self._queue.join()
+
+    @property
+    def pending(self) -> int:
+        """Number of writes not yet persisted."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _flush_loop(self) -> None:
+        """Drain the journal in batches, strictly in enqueue order."""
+        while True:
+            batch: List[JournalEntry] = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            failed = await self._persist(batch)
+            self._settle(batch, failed)
+
+    async def _persist(self, batch: List[JournalEntry]) -> List[JournalEntry]:
+        """Apply a batch, retrying what fails with backoff; returns the entries given up on."""
+        pending = [entry for entry in batch if not self._orphaned(entry)]
+        delay = self.retry_delay
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                logger.warning(f"Retrying {len(pending)} journal entries in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                delay *= 2
+            future = self._executor.submit(self.db.apply_journal_batch, pending)
+            self._in_flight = (pending, future)
+            try:
+                pending = await asyncio.wrap_future(future)
+            except Exception as e:
+                logger.error(f"Error flushing {len(pending)} journal entries: {e}")
+            if not pending:
+                break
+        self._in_flight = None
+        return pending + [entry for entry in batch if self._orphaned(entry)]
+
+    def _orphaned(self, entry: JournalEntry) -> bool:
+        """An update for a trade whose insert was given up on can never apply."""
+        return entry[0] == 'update' and entry[1] in self._rejected
+
+    def _settle(self, batch: List[JournalEntry], failed: List[JournalEntry]) -> None:
+        """Release waiters for a processed batch and mark it done."""
+        failed_ids = {id(entry) for entry in failed}
+        for entry in batch:
+            if id(entry) in failed_ids:
+                trade_id = entry[1]['trade_id'] if entry[0] == 'save' else entry[1]
+                logger.error(f"Giving up on journal {entry[0]} for {trade_id}")
+                if entry[0] == 'save':
+                    self._rejected.add(trade_id)
+            if entry[0] == 'save':
+                event = self._unsaved.pop(entry[1]['trade_id'], None)
+                if event is not None:
+                    event.set()
+            self._queue.task_done()
+
+    def flush_sync(self) -> None:
+        """Persist whatever is still queued; used on shutdown without a running loop."""
+        if self._queue is None:
+            return
+        if self._flusher is not None:
+            self._flusher.cancel()
+        batch = []
+        if self._in_flight is not None:
+            # Already off the queue: let the running write finish and keep what it could not apply
+            entries, future = self._in_flight
+            try:
+                batch.extend(future.result())
+            except Exception:
+                batch.extend(entries)
+            self._in_flight = None
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+            self._queue.task_done()
+        if batch:
+            try:
+                failed = self.db.apply_journal_batch(batch)
+                if failed:
+                    logger.error(f"{len(failed)} journal entries could not be saved on shutdown")
+            except Exception as e:
+                logger.error(f"Error flushing journal on shutdown: {e}")
+        self._executor.shutdown(wait=False)
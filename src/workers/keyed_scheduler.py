@@ -0,0 +1,136 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Tuple
+
+from src.utils.latency import LatencyHistogram
+
+# (coroutine function, args, result future, perf_counter() at submit)
+_Job = Tuple[Callable[..., Awaitable[Any]], tuple, asyncio.Future, float]
+
+
+class KeyedScheduler:
+    """Runs jobs in FIFO order per key, concurrently across keys.
+
+    Each key with queued work gets one runner task that executes its jobs
+    strictly in submission order; runners for different keys proceed in
+    parallel, but at most `max_concurrency` jobs execute at once overall.
+    Idle keys hold no state beyond their recent stats.
+    """
+
+    def __init__(self, max_concurrency: int = 8, max_tracked_keys: int = 256):
+        self.max_concurrency = max_concurrency
+        self.max_tracked_keys = max_tracked_keys
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._queues: Dict[Hashable, Deque[_Job]] = {}
+        self._runners: Dict[Hashable, asyncio.Task] = {}
+        self._stats: 'OrderedDict[Hashable, Dict[str, Any]]' = OrderedDict()
+        self.running = 0
+        self.wait_latency = LatencyHistogram('Scheduler queue wait')
+
+    def submit(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args) -> asyncio.Future:
+        """Queue func(*args) behind earlier jobs for `key`; returns its future without waiting."""
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+        queue.append((func, args, future, time.perf_counter()))
+
+        stats = self._key_stats(key)
+        stats['depth'] = len(queue)
+        stats['max_depth'] = max(stats['max_depth'], len(queue))
+
+        if key not in self._runners:
+            self._runners[key] = asyncio.create_task(self._drain(key))
+        return future
+
+    async def run(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args) -> Any:
+        """Queue func(*args) behind earlier jobs for `key` and return its result."""
+        return await self.submit(key, func, *args)
+
+    def _key_stats(self, key: Hashable) -> Dict[str, Any]:
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = {
+                'depth': 0,
+                'max_depth': 0,
+                'completed': 0,
+                'failed': 0,
+                'wait_ms_total': 0.0,
+                'wait_ms_max': 0.0
+            }
+            # Forget the least recently used idle keys
+            while len(self._stats) > self.max_tracked_keys:
+                oldest = next(iter(self._stats))
+                if oldest in self._queues:
+                    break
+                del self._stats[oldest]
+        else:
+            self._stats.move_to_end(key)
+        return stats
+
+    async def _drain(self, key: Hashable) -> None:
+        """Run one key's jobs in order until its queue is empty."""
+        queue = self._queues[key]
+        stats = self._stats[key]
+        try:
+            while queue:
+                func, args, future, submitted = queue[0]
+                async with self._slots:
+                    queue.popleft()
+                    stats['depth'] = len(queue)
+
+                    wait_ms = (time.perf_counter() - submitted) * 1000
+                    self.wait_latency.record(wait_ms)
+                    stats['wait_ms_total'] += wait_ms
+                    stats['wait_ms_max'] = max(stats['wait_ms_max'], wait_ms)
+
+                    if future.cancelled():
+                        continue
+                    self.running += 1
+                    try:
+                        result = await func(*args)
+                        stats['completed'] += 1
+                        if not future.done():
+                            future.set_result(result)
+                    except Exception as e:
+                        stats['failed'] += 1
+                        if not future.done():
+                            future.set_exception(e)
+                    finally:
+                        self.running -= 1
+        finally:
+            del self._queues[key]
+            del self._runners[key]
+
+    def depth(self, key: Hashable) -> int:
+        """Jobs queued for `key` that have not started yet."""
+        queue = self._queues.get(key)
+        return len(queue) if queue else 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Scheduler-wide and per-key queue depth and wait-time metrics."""
+        per_key = {}
+        for key, stats in self._stats.items():
+            done = stats['completed'] + stats['failed']
+            per_key[key] = {
+                **stats,
+                'wait_ms_avg': stats['wait_ms_total'] / done if done else 0.0
+            }
+        return {
+            'running': self.running,
+            'active_keys': len(self._queues),
+            'queued': sum(len(queue) for queue in self._queues.values()),
+            'wait': self.wait_latency.summary(),
+            'keys': per_key
+        }
+
+    async def stop(self) -> None:
+        """Cancel all runners; queued jobs are cancelled too."""
+        for queue in self._queues.values():
+            for _, _, future, _ in queue:
+                future.cancel()
+        runners = list(self._runners.values())
+        for task in runners:
+            task.cancel()
+        await asyncio.gather(*runners, return_exceptions=True)
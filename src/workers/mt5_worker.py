@@ -3,22 +3,37 @@ import logging
 import signal
 import time
 from datetime import datetime, timezone
-from typing import Any, Dict, Set
-
-import MetaTrader5 as mt5
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
 
 from src.config.mt5_config import MT5_CONFIG
+from src.config.worker_config import WORKER_CONFIG
+from src.services.mt5_executor import MT5_EXECUTOR
 from src.services.mt5_service import MT5Service
+from src.services.position_snapshot import PositionEventType, PositionSnapshotService, position_state
 from src.services.tradingview_service import TradingViewService
+from src.services.trailing_engine import TrailingStopEngine
 from src.utils.database_handler import DatabaseHandler
+from src.utils.metrics import REGISTRY
 from src.utils.queue_handler import RedisQueue
 from src.utils.token_manager import GLOBAL_TOKEN_MANAGER
+from src.utils.tracing import TraceContext
+from src.workers.keyed_scheduler import KeyedScheduler
 
 logger = logging.getLogger('MT5Worker')
 
+RECONCILIATION_CLOSES = REGISTRY.counter('tvcopier_reconciliation_closes_total', 'Positions found closed in MT5 by the position poll')
+INTERCEPT_TO_FILL = REGISTRY.histogram('tvcopier_intercept_to_fill_ms', 'Order interception to the MT5 fill (same-host trace)')
+OPEN_POSITIONS = REGISTRY.gauge('tvcopier_open_positions', 'MT5 positions the worker is tracking')
+EXECUTOR_DEPTH = REGISTRY.gauge('tvcopier_mt5_executor_depth', 'MT5 terminal commands waiting for the executor thread')
+MT5_CONNECTED = REGISTRY.gauge('tvcopier_mt5_connected', '1 while the MT5 terminal connection is up')
+
 class MT5Worker:
-    def __init__(self):
+    def __init__(self, tradingview_dry_run: bool = False, db_url: Optional[str] = None,
+                 queue_prefix: Optional[str] = None):
         self.running = True
+        self.tradingview_dry_run = tradingview_dry_run  # never close positions on TradingView (replays)
+        self.db_url = db_url  # None means the Postgres in .env; replays pass a scratch database
+        self.queue_prefix = queue_prefix  # None means REDIS_KEY_PREFIX
         self.shutdown_event = asyncio.Event()
         self.open_positions: Set[str] = set()
         self.loop = None
@@ -26,6 +41,15 @@ class MT5Worker:
         self.db = None
         self.mt5 = None
         self.tv_service = None
+        self.scheduler = None
+        self.positions = None
+        self.trailing = None
+        self._unconfirmed_opens: Dict[str, float] = {}  # ticket -> monotonic() when opened, until a snapshot shows it
+        self._unrecorded_opens: Dict[str, Tuple[str, Dict[str, Any]]] = {}  # trade_id -> (status, update_data) of a fill not yet in the DB
+        self._close_tasks: Set[asyncio.Task] = set()
+        self.provisional_tickets: Dict[str, str] = {}  # TV order id -> MT5 ticket of a speculative copy
+        self.ticket_positions: Dict[str, str] = {}  # MT5 ticket -> TV position id
+        self._position_state_synced = False  # False until the full book has been published to Redis
 
     def initialize(self):
         """Initialize all services with shared event loop."""
@@ -33,48 +57,110 @@ class MT5Worker:
         asyncio.set_event_loop(self.loop)
         
         # Initialize services
-        self.queue = RedisQueue()
+        self.queue = RedisQueue(key_prefix=self.queue_prefix)
         self.queue.loop = self.loop
         
-        self.db = DatabaseHandler()
+        self.db = DatabaseHandler(self.db_url)
         
         self.mt5 = MT5Service(
             account=MT5_CONFIG['account'],
             password=MT5_CONFIG['password'],
             server=MT5_CONFIG['server'],
-            db_handler=self.db
+            db_handler=self.db,
+            symbol_cache_ttl=WORKER_CONFIG['symbol_cache_ttl_minutes'] * 60,
+            heartbeat_interval=WORKER_CONFIG['mt5_heartbeat_ms'] / 1000,
+            reconnect_backoff_max=WORKER_CONFIG['mt5_reconnect_max_s']
         )
         self.mt5.set_loop(self.loop)
         
         self.tv_service = TradingViewService(
-            token_manager=GLOBAL_TOKEN_MANAGER
+            token_manager=GLOBAL_TOKEN_MANAGER,
+            dry_run=self.tradingview_dry_run
+        )
+
+        self.scheduler = KeyedScheduler(max_concurrency=WORKER_CONFIG['max_concurrency'])
+
+        self.positions = PositionSnapshotService(
+            self.mt5,
+            active_interval=WORKER_CONFIG['position_poll_active_ms'] / 1000,
+            idle_interval=WORKER_CONFIG['position_poll_idle_ms'] / 1000
         )
+        self.positions.subscribe(self.check_mt5_positions)
+        self.positions.subscribe(self.publish_position_state)
+        self.trailing = TrailingStopEngine(self.mt5, self.positions, cycle_ms=WORKER_CONFIG['trailing_cycle_ms'])
+        self.mt5.supervisor.on_connected(self._on_mt5_connected)
+
+        OPEN_POSITIONS.set_function(lambda: len(self.open_positions))
+        EXECUTOR_DEPTH.set_function(lambda: MT5_EXECUTOR.depth)
+        MT5_CONNECTED.set_function(lambda: int(self.mt5.initialized))
 
 
     async def _initialize_positions(self) -> None:
         """Initialize open positions set on startup."""
         try:
             if await self.mt5.async_initialize():
-                positions = await self.loop.run_in_executor(None, mt5.positions_get)
-                if positions is not None:
-                    self.open_positions = {str(pos.ticket) for pos in positions}
+                # The first poll sets the snapshot baseline and the open set
+                await self.positions.poll_once()
+                if self.positions.has_baseline:
                     print(f"📊 Initialized {len(self.open_positions)} open positions\n")
         except Exception as e:
             logger.error(f"❌ Error initializing positions: {e}")
 
-    async def handle_message(self, msg_type: str, data: Dict[str, Any]) -> None:
-        """Handle messages from Redis channels asynchronously."""
-        try:
-            if msg_type == 'trade':
-                await self.process_trade(data['data'])
-            # elif msg_type == 'status':
-                # print(f"📡 Status: {data['message']}")
-            elif msg_type == 'error':
-                logger.error(f"❌ Queue error: {data['error']}")
-        except Exception as e:
-            logger.error(f"❌ Error handling message: {e}")
+    async def _on_mt5_connected(self) -> None:
+        """Reload trailing stops and warm the symbol cache; runs on every (re)connect."""
+        await self.mt5.load_trailing_stops()
+        await self.mt5.async_prewarm_symbols()
 
-    async def process_trade(self, trade_data: Dict[str, Any]) -> None:
+    async def handle_message(self, msg_type: str, data: Dict[str, Any]) -> Optional[asyncio.Future]:
+        """Handle messages from Redis channels asynchronously.
+
+        Trades are handed to the scheduler and their job's future returned, so
+        the dispatcher acknowledges them once they finish. A trade that fails
+        raises, so its stream entry stays pending and is retried.
+        """
+        if msg_type == 'trade':
+            return await self.process_trade(data['data'])
+        # elif msg_type == 'status':
+            # print(f"📡 Status: {data['message']}")
+        elif msg_type == 'error':
+            logger.error(f"❌ Queue error: {data['error']}")
+
+    def _position_key(self, position_id: Any = None, mt5_ticket: Any = None) -> Hashable:
+        """Scheduling key: the TV position, resolved from the MT5 ticket when needed."""
+        if not position_id and mt5_ticket:
+            position_id = self.ticket_positions.get(str(mt5_ticket))
+        if position_id:
+            return ('position', str(position_id))
+        if mt5_ticket:
+            return ('ticket', str(mt5_ticket))
+        return ('unkeyed',)
+
+    def _trade_key(self, trade_data: Dict[str, Any]) -> Hashable:
+        # A speculative open, its confirm and its cancel share the TV order id
+        if trade_data.get('speculative_order_id'):
+            return ('order', str(trade_data['speculative_order_id']))
+        position_id = trade_data.get('position_id') or trade_data.get('execution_data', {}).get('positionId')
+        return self._position_key(position_id, trade_data.get('mt5_ticket'))
+
+    async def process_trade(self, trade_data: Dict[str, Any]) -> Optional[asyncio.Future]:
+        """Queue a trade behind earlier operations on the same position.
+
+        Operations on one position run strictly in order; different
+        positions run concurrently, up to WORKER_MAX_CONCURRENCY. Returns the
+        job's future without waiting, so a burst on one position never holds
+        the dispatcher back from other positions.
+        """
+        if trade_data.get('type') == 'prepare':
+            # Warm-up hint sent at order time; nothing to record
+            await self.mt5.async_prepare(trade_data['instrument'], trade_data.get('side'))
+            return None
+        trace = TraceContext.from_wire(trade_data.get('trace'))
+        if trace is not None:
+            trace.mark('worker_receive')
+            trade_data['trace'] = trace
+        return self.scheduler.submit(self._trade_key(trade_data), self._process_trade, trade_data)
+
+    async def _process_trade(self, trade_data: Dict[str, Any]) -> None:
         """Process a single trade asynchronously."""
         try:
             trade_id = trade_data['trade_id']
@@ -85,6 +171,14 @@ class MT5Worker:
             mt5_ticket = trade_data.get('mt5_ticket', 'Pending')
             
             
+            # Handle speculative confirm / reversal
+            if trade_data.get('type') == 'confirm':
+                await self._handle_speculative_confirm(trade_data, trade_id, start_time)
+                return
+            if trade_data.get('type') == 'cancel':
+                await self._handle_speculative_cancel(trade_data, trade_id)
+                return
+            
             # Handle TP/SL updates
             if trade_data.get('type') == 'update':
                 await self._handle_position_update(trade_data, trade_id, start_time)
@@ -100,23 +194,33 @@ class MT5Worker:
             
         except Exception as e:
             logger.error(f"❌ Error processing trade: {e}")
-            if 'trade_id' in trade_data:
-                await self.db.async_update_trade_status(
-                    trade_data['trade_id'],
-                    'failed',
-                    {
-                        'error_message': str(e),
-                        'closed_at': datetime.now(timezone.utc).isoformat()
-                    }
-                )
+            # A filled open whose write failed is still open in MT5; the redelivery records it
+            if 'trade_id' in trade_data and trade_data['trade_id'] not in self._unrecorded_opens:
+                try:
+                    await self.db.async_update_trade_status(
+                        trade_data['trade_id'],
+                        'failed',
+                        {
+                            'error_message': str(e),
+                            'closed_at': datetime.now(timezone.utc).isoformat()
+                        }
+                    )
+                except Exception as db_error:
+                    logger.error(f"❌ Error recording failed trade: {db_error}")
+            # Leave the message unacknowledged so the transport can retry it
+            raise
     
     async def _handle_new_position(self, trade_data: Dict[str, Any], trade_id: str, start_time: int) -> None:
         """Handle opening a new position."""
         position_id = trade_data.get('execution_data', {}).get('positionId', 'N/A')
-        result = await self.mt5.async_execute_market_order(trade_data)
+        trace = trade_data.get('trace')
+        if await self._already_opened(trade_data, trade_id):
+            return
+        result = await self.mt5.async_execute_market_order(trade_data, trace)
         
         if 'error' not in result:
-            status = 'completed'
+            # A speculative copy stays provisional until TradingView reports the fill
+            status = 'provisional' if trade_data.get('speculative') else 'completed'
             update_data = {
                 'mt5_ticket': result['mt5_ticket'],
                 'mt5_response': result,
@@ -124,7 +228,13 @@ class MT5Worker:
             }
             
             mt5_ticket = str(result['mt5_ticket'])
+            if trade_data.get('speculative'):
+                self.provisional_tickets[str(trade_data['speculative_order_id'])] = mt5_ticket
             self.open_positions.add(mt5_ticket)
+            self._unconfirmed_opens[mt5_ticket] = time.monotonic()
+            self.positions.request_poll()
+            if position_id != 'N/A':
+                self.ticket_positions[mt5_ticket] = str(position_id)
             
             # Log success
             direction = trade_data.get('execution_data', {}).get('side', '').lower()
@@ -136,6 +246,9 @@ class MT5Worker:
             
             if result.get('take_profit') or result.get('stop_loss'):
                 print(f"🎯 TP: {result.get('take_profit')} | SL: {result.get('stop_loss')}")
+            if trace is not None:
+                INTERCEPT_TO_FILL.observe(trace.total_ms())
+                print(f"⏱  Intercept to fill {trace.total_ms():.1f}ms: {trace.format()}")
             print(f"⚡ Execution time: {update_data['execution_time_ms']}ms\n")
         else:
             status = 'failed'
@@ -146,147 +259,254 @@ class MT5Worker:
             }
             print(f"❌ Open Failed: {result['error']} (TV #{position_id})")
         
-        await self.db.async_update_trade_status(trade_id, status, update_data)
+        if trace is not None:
+            trace.mark('db_update')
+            update_data['latency_trace'] = trace.to_wire()
+        try:
+            await self.db.async_update_trade_status(trade_id, status, update_data)
+        except Exception:
+            if status != 'failed':
+                # Filled but not recorded: the message stays pending, and its redelivery must not open again
+                self._unrecorded_opens[trade_id] = (status, update_data)
+            raise
+
+    async def _already_opened(self, trade_data: Dict[str, Any], trade_id: str) -> bool:
+        """True if this open was already filled in MT5, recording the fill if that write had failed."""
+        unrecorded = self._unrecorded_opens.get(trade_id)
+        if unrecorded is not None:
+            status, update_data = unrecorded
+            print(f"⚠  Trade {trade_id} already opened as MT5# {update_data['mt5_ticket']}, recording it")
+            await self.db.async_update_trade_status(trade_id, status, update_data)
+            del self._unrecorded_opens[trade_id]
+            return True
+        if trade_data.get('redelivered'):
+            # Only redelivered messages pay for the lookup; covers a fill recorded before a lost ack
+            trade = await self.db.async_get_trade(trade_id)
+            if trade is not None and trade.get('mt5_ticket'):
+                print(f"⚠  Trade {trade_id} already opened as MT5# {trade['mt5_ticket']}, skipping")
+                return True
+        return False
+
+    async def _handle_speculative_confirm(self, trade_data: Dict[str, Any], trade_id: str, start_time: int) -> None:
+        """TradingView filled an order that was copied speculatively: keep the position."""
+        order_id = str(trade_data['speculative_order_id'])
+        position_id = trade_data.get('position_id')
+        mt5_ticket = self.provisional_tickets.pop(order_id, None)
+
+        if mt5_ticket is None:
+            # The provisional open failed; copy the fill the normal way
+            print(f"⚠  No provisional position for OrderID# {order_id}, opening now")
+            trade_data = {key: value for key, value in trade_data.items() if key not in ('type', 'speculative_order_id')}
+            await self._handle_new_position(trade_data, trade_id, start_time)
+            return
+
+        if position_id:
+            self.ticket_positions[mt5_ticket] = str(position_id)
+        await self.db.async_update_trade_status(trade_id, 'completed', {
+            'confirmed_at': datetime.now(timezone.utc).isoformat()
+        })
+        print(f"✔  Speculative position CONFIRMED: TV# {position_id} --> MT5# {mt5_ticket}\n")
+
+    async def _handle_speculative_cancel(self, trade_data: Dict[str, Any], trade_id: str) -> None:
+        """No fill arrived for a speculative copy: close it in MT5."""
+        order_id = str(trade_data['speculative_order_id'])
+        reason = trade_data.get('reason', 'cancelled')
+        mt5_ticket = self.provisional_tickets.pop(order_id, None)
+
+        update_data = {
+            'reversed_at': datetime.now(timezone.utc).isoformat(),
+            'reversal_reason': reason,
+            'is_closed': True,
+            'closed_at': datetime.now(timezone.utc).isoformat()
+        }
+        if mt5_ticket is not None:
+            result = await self.mt5.async_close_position({
+                'mt5_ticket': mt5_ticket,
+                'instrument': trade_data['instrument'],
+                'qty': trade_data['qty'],
+                'execution_data': {'positionId': f"order {order_id}"}
+            })
+            if 'error' in result:
+                print(f"❌ Reversal Failed: {result['error']} (OrderID# {order_id} --> MT5# {mt5_ticket})")
+                await self.db.async_update_trade_status(trade_id, 'failed', {
+                    'error_message': f"Reversal failed: {result['error']}",
+                    'reversal_reason': reason,
+                    'mt5_response': result
+                })
+                return
+            update_data['mt5_response'] = result
+            self.open_positions.discard(mt5_ticket)
+            self.mt5.trailing_stops.discard(mt5_ticket)
+
+        await self.db.async_update_trade_status(trade_id, 'reversed', update_data)
+        print(f"↩  Speculative position REVERSED: OrderID# {order_id} --> MT5# {mt5_ticket or 'none'} ({reason})\n")
 
     async def _handle_position_close(self, trade_data: Dict[str, Any], trade_id: str, start_time: int) -> None:
         """Handle closing an existing position."""
-        try:
-            position_id = trade_data.get('execution_data', {}).get('positionId', 'N/A')
-            mt5_ticket = trade_data.get('mt5_ticket', 'Pending')
-            is_partial = trade_data.get('is_partial', False)
-            close_amount = float(trade_data.get('qty', 0))
-                        
-            # Send close request
-            result = await self.mt5.async_close_position(trade_data)
+        position_id = trade_data.get('execution_data', {}).get('positionId', 'N/A')
+        mt5_ticket = trade_data.get('mt5_ticket', 'Pending')
+        is_partial = trade_data.get('is_partial', False)
+                    
+        # Send close request
+        result = await self.mt5.async_close_position(trade_data)
+        # The proxy only knows the volume from the published state; MT5 has the final word
+        is_partial = result.get('is_partial', is_partial)
+        
+        if result.get('not_found') and trade_data.get('validate'):
+            # Deferred close for a position that is already gone in MT5
+            status = 'closed'
+            update_data = {
+                'is_closed': True,
+                'closed_at': datetime.now(timezone.utc).isoformat(),
+                'execution_time_ms': int(time.time() * 1000) - start_time
+            }
+            mt5_ticket = str(mt5_ticket)
+            self.open_positions.discard(mt5_ticket)
+            self.ticket_positions.pop(mt5_ticket, None)
+            self.mt5.trailing_stops.discard(mt5_ticket)
+            print(f"📌 Position already closed in MT5 (TV #{position_id} --> MT5 #{mt5_ticket})\n")
+        elif 'error' in result:
+            status = 'failed'
+            update_data = {
+                'error_message': result['error'],
+                'mt5_response': result,
+                'execution_time_ms': int(time.time() * 1000) - start_time
+            }
+            print(f"❌ Close Failed: {result['error']} (TV #{position_id} --> MT5 #{mt5_ticket})")
+        else:
+            status = 'closed' if not is_partial else 'updated'
+            update_data = {
+                'mt5_response': result,
+                'execution_time_ms': int(time.time() * 1000) - start_time,
+                'is_closed': not is_partial,
+                'closed_at': datetime.now(timezone.utc).isoformat() if not is_partial else None
+            }
             
-            if 'error' in result:
-                status = 'failed'
-                update_data = {
-                    'error_message': result['error'],
-                    'mt5_response': result,
-                    'execution_time_ms': int(time.time() * 1000) - start_time
-                }
-                print(f"❌ Close Failed: {result['error']} (TV #{position_id} --> MT5 #{mt5_ticket})")
-            else:
-                status = 'closed' if not is_partial else 'updated'
-                update_data = {
-                    'mt5_response': result,
-                    'execution_time_ms': int(time.time() * 1000) - start_time,
-                    'is_closed': not is_partial,
-                    'closed_at': datetime.now(timezone.utc).isoformat() if not is_partial else None
-                }
+            mt5_ticket = str(trade_data.get('mt5_ticket'))
+            if not is_partial:
+                self.open_positions.discard(mt5_ticket)
+                self.ticket_positions.pop(mt5_ticket, None)
+                self.mt5.trailing_stops.discard(mt5_ticket)
+            
+            direction = trade_data.get('execution_data', {}).get('side', '').lower()
+            direction_emoji = "SELL🔻" if direction == 'buy' else "BUY🔼"
+            execution_price = result.get('price') or trade_data.get('execution_data', {}).get('price', 0.0)
+
+            print(f"{'🛡  Position partially closed' if is_partial else '📌 Position CLOSED'}: {direction_emoji} {result.get('symbol')} {result.get('volume')} @ {execution_price}")
+            print(f"🔗 References: TV# {position_id} --> MT5# {mt5_ticket}")
+            
+            if is_partial:
+                remaining = result.get('remaining_volume', 0)
+                print(f"🔳 Remaining volume: {remaining}")
                 
-                mt5_ticket = str(trade_data.get('mt5_ticket'))
-                if not is_partial:
-                    self.open_positions.discard(mt5_ticket)
                 
-                direction = trade_data.get('execution_data', {}).get('side', '').lower()
-                direction_emoji = "SELL🔻" if direction == 'buy' else "BUY🔼"
-                execution_price = result.get('price') or trade_data.get('execution_data', {}).get('price', 0.0)
+            print(f"⚡ Execution time: {update_data['execution_time_ms']}ms\n")
+        
+        await self.db.async_update_trade_status(trade_id, status, update_data)
 
-                print(f"{'🛡  Position partially closed' if is_partial else '📌 Position CLOSED'}: {direction_emoji} {result.get('symbol')} {result.get('volume')} @ {execution_price}")
-                print(f"🔗 References: TV# {position_id} --> MT5# {mt5_ticket}")
-                
-                if is_partial:
-                    remaining = result.get('remaining_volume', 0)
-                    print(f"🔳 Remaining volume: {remaining}")
-                    
-                    
-                print(f"⚡ Execution time: {update_data['execution_time_ms']}ms\n")
-            
-            await self.db.async_update_trade_status(trade_id, status, update_data)
-            
-        except Exception as e:
-            logger.error(f"❌ Error in _handle_position_close: {e}")
-            if 'trade_id' in trade_data:
-                await self.db.async_update_trade_status(
-                    trade_data['trade_id'],
-                    'failed',
-                    {
-                        'error_message': str(e),
-                        'closed_at': datetime.now(timezone.utc).isoformat()
-                    }
-                )
-    
     async def _handle_position_update(self, trade_data: Dict[str, Any], trade_id: str, start_time: int) -> None:
         """Handle updating TP/SL for an existing position."""
-        try:
-            position_id = trade_data.get('position_id', 'N/A')
-            mt5_ticket = trade_data.get('mt5_ticket', 'N/A')
-            
-            # Get current trade data
-            trade = await self.db.async_get_trade_by_mt5_ticket(mt5_ticket)
-            if not trade:
-                logger.error(f"No trade found for MT5 ticket {mt5_ticket}")
-                return
-                
-            if trade.get('is_closed'):
-                logger.info(f"Position {mt5_ticket} is already closed, skipping update")
-                return
-            
-            result = await self.mt5.async_update_position(trade_data)
+        position_id = trade_data.get('position_id', 'N/A')
+        mt5_ticket = trade_data.get('mt5_ticket', 'N/A')
+        
+        # Get current trade data
+        trade = await self.db.async_get_trade_by_mt5_ticket(mt5_ticket)
+        if not trade:
+            logger.error(f"No trade found for MT5 ticket {mt5_ticket}")
+            return
             
-            if 'error' not in result:
-                status = 'updated'
-                update_data = {
-                    'mt5_response': result,
-                    'execution_time_ms': int(time.time() * 1000) - start_time,
-                    'take_profit': result.get('take_profit'),
-                    'stop_loss': result.get('stop_loss')
-                }
-
-                print(f"💱 Position updated for {result.get('symbol')} x {trade.get('quantity')} @ {trade.get('execution_price')}")
-                print(f"🔗 References: TV# {position_id} --> MT5# {mt5_ticket}")
-                
-                if result.get('take_profit') or result.get('stop_loss'):
-                    print(f"🎯 New TP: {result.get('take_profit')} | SL: {result.get('stop_loss')}")
-                print(f"⚡ Execution time: {update_data['execution_time_ms']}ms\n")
-                
-            else:
-                status = 'failed'
-                update_data = {
-                    'error_message': result['error'],
-                    'mt5_response': result,
-                    'execution_time_ms': int(time.time() * 1000) - start_time
-                }
-                print(f"❌ Update Failed: {result['error']} (TV #{position_id} --> MT5# {mt5_ticket})")
+        if trade.get('is_closed'):
+            logger.info(f"Position {mt5_ticket} is already closed, skipping update")
+            return
+        
+        result = await self.mt5.async_update_position(trade_data)
+        
+        if 'error' not in result:
+            status = 'updated'
+            # Mirrors the trailing_stop_pips the proxy just wrote for this trade
+            self.mt5.trailing_stops.set(mt5_ticket, result.get('trailing_stop_pips'))
+            update_data = {
+                'mt5_response': result,
+                'execution_time_ms': int(time.time() * 1000) - start_time,
+                'take_profit': result.get('take_profit'),
+                'stop_loss': result.get('stop_loss')
+            }
+
+            print(f"💱 Position updated for {result.get('symbol')} x {trade.get('quantity')} @ {trade.get('execution_price')}")
+            print(f"🔗 References: TV# {position_id} --> MT5# {mt5_ticket}")
             
-            await self.db.async_update_trade_status(trade_id, status, update_data)
+            if result.get('take_profit') or result.get('stop_loss'):
+                print(f"🎯 New TP: {result.get('take_profit')} | SL: {result.get('stop_loss')}")
+            print(f"⚡ Execution time: {update_data['execution_time_ms']}ms\n")
             
-        except Exception as e:
-            logger.error(f"❌ Error in _handle_position_update: {e}")
-            await self.db.async_update_trade_status(
-                trade_id,
-                'failed',
-                {
-                    'error_message': str(e),
-                    'closed_at': datetime.now(timezone.utc).isoformat()
-                }
-            )
+        else:
+            status = 'failed'
+            update_data = {
+                'error_message': result['error'],
+                'mt5_response': result,
+                'execution_time_ms': int(time.time() * 1000) - start_time
+            }
+            print(f"❌ Update Failed: {result['error']} (TV #{position_id} --> MT5# {mt5_ticket})")
+        
+        await self.db.async_update_trade_status(trade_id, status, update_data)
 
-    async def check_mt5_positions(self) -> None:
-        """Monitor MT5 positions for manual closes asynchronously."""
+    async def check_mt5_positions(self, snapshot: Dict[str, Any], events: list, polled_at: float) -> None:
+        """Detect positions closed in MT5; subscribed to the position snapshot service."""
         try:
-            if not await self.mt5.async_initialize():
-                return
-
-            positions = await self.loop.run_in_executor(None, mt5.positions_get)
-            if positions is None:
-                return
+            closed = [
+                event.ticket for event in events
+                if event.type == PositionEventType.CLOSED and event.ticket in self.open_positions
+            ]
 
-            current_position_tickets = {str(pos.ticket) for pos in positions}
+            # Opened and closed between two polls, so never seen in a snapshot
+            for ticket, opened_at in list(self._unconfirmed_opens.items()):
+                if ticket in snapshot:
+                    del self._unconfirmed_opens[ticket]
+                elif opened_at < polled_at:
+                    del self._unconfirmed_opens[ticket]
+                    if ticket in self.open_positions:
+                        closed.append(ticket)
 
-            for ticket in self.open_positions.copy():
-                # Check if position exists in current positions
-                if ticket not in current_position_tickets:
-                    await self.handle_mt5_close(ticket)
-                    self.open_positions.discard(ticket)
+            if closed:
+                RECONCILIATION_CLOSES.inc(len(closed))
+            for ticket in closed:
+                # Resolve the key while the ticket still maps to its TV position
+                key = self._position_key(mt5_ticket=ticket)
+                self.open_positions.discard(ticket)
+                self.ticket_positions.pop(ticket, None)
+                task = self.loop.create_task(self.scheduler.run(key, self.handle_mt5_close, ticket))
+                self._close_tasks.add(task)
+                task.add_done_callback(self._close_tasks.discard)
 
-            self.open_positions = current_position_tickets
+            # Keep tickets opened while this poll was in flight
+            self.open_positions = set(snapshot) | set(self._unconfirmed_opens)
 
         except Exception as e:
             logger.error(f"❌ Error checking positions: {e}")
 
+    async def publish_position_state(self, snapshot: Dict[str, Any], events: list, polled_at: float) -> None:
+        """Mirror open positions into Redis so the proxy can validate closes without MT5."""
+        try:
+            if not self._position_state_synced:
+                upserts = {ticket: position_state(position) for ticket, position in snapshot.items()}
+                await self.queue.async_publish_position_state(upserts, replace=True)
+                self._position_state_synced = True
+                return
+
+            upserts = {}
+            removed = []
+            for event in events:
+                if event.type in (PositionEventType.OPENED, PositionEventType.VOLUME_CHANGED):
+                    upserts[event.ticket] = position_state(event.position)
+                elif event.type == PositionEventType.CLOSED:
+                    removed.append(event.ticket)
+            if upserts or removed:
+                await self.queue.async_publish_position_state(upserts, removed)
+        except Exception as e:
+            # Republish the whole book on the next poll rather than leave a gap
+            self._position_state_synced = False
+            logger.error(f"❌ Error publishing position state: {e}")
+
     async def handle_mt5_close(self, ticket: str) -> None:
         """Handle position closed in MT5 asynchronously."""
         try:            
@@ -344,19 +564,15 @@ class MT5Worker:
         try:
             # Initialize positions
             await self._initialize_positions()
+
+            # Heartbeats and reconnects from here on; nothing else re-checks the connection
+            self.loop.create_task(self.mt5.supervisor.run())
             
-            # Start trailing stop monitor as a task
-            if self.mt5.initialized:
-                self.loop.create_task(self.mt5.monitor_trailing_stops())
+            # Trailing stops run on their own cycle over the shared snapshot, idling while disconnected
+            self.loop.create_task(self.trailing.run())
             
-            # Main loop for position checking
-            while self.running:
-                try:
-                    await self.check_mt5_positions()
-                    await asyncio.sleep(1)
-                except Exception as e:
-                    logger.error(f"❌ Error in position check: {e}")
-                    await asyncio.sleep(1)
+            # One positions_get poller for the whole worker
+            await self.positions.run()
                     
         except Exception as e:
             logger.error(f"❌ Fatal error: {e}")
@@ -364,10 +580,34 @@ class MT5Worker:
             self.running = False
             print("\n🛑 Worker stopped")
 
+    def get_scheduler_status(self) -> Dict[str, Any]:
+        """Queue depth and wait-time metrics, overall and per position."""
+        return self.scheduler.stats() if self.scheduler else {}
+
+    def get_connection_status(self) -> Dict[str, Any]:
+        """Terminal health: heartbeats, reconnects and accumulated downtime."""
+        return self.mt5.supervisor.stats() if self.mt5 else {}
+
+    def get_executor_status(self) -> Dict[str, Any]:
+        """Terminal command queue depth plus wait and run time per command."""
+        return {'depth': MT5_EXECUTOR.depth, 'commands': MT5_EXECUTOR.stats()}
+
+    def _print_scheduler_stats(self) -> None:
+        stats = self.scheduler.stats()
+        print(f"📊 {self.scheduler.wait_latency.format_summary()}")
+        busiest = sorted(stats['keys'].items(), key=lambda item: item[1]['wait_ms_max'], reverse=True)[:5]
+        for key, key_stats in busiest:
+            print(f"   {key[-1]}: done={key_stats['completed']} failed={key_stats['failed']} "
+                  f"max_depth={key_stats['max_depth']} max_wait={key_stats['wait_ms_max']:.1f}ms")
+
     def handle_shutdown(self, signum, frame):
         """Handle shutdown signals gracefully."""
         logger.info("\n⛔ Shutdown requested...")
         self.running = False
+        if self.loop and self.positions:
+            self.loop.call_soon_threadsafe(self.positions.stop)
+            self.loop.call_soon_threadsafe(self.trailing.stop)
+            self.loop.call_soon_threadsafe(self.mt5.supervisor.stop)
         if self.loop:
             self.loop.call_soon_threadsafe(self.shutdown_event.set)
 
@@ -378,6 +618,14 @@ class MT5Worker:
         
         # Wait a bit for ongoing operations to complete
         await asyncio.sleep(0.5)
+        if self.scheduler:
+            self._print_scheduler_stats()
+            await self.scheduler.stop()
+        print(f"📊 MT5 terminal commands (queue wait / run, ms)\n{MT5_EXECUTOR.format_stats()}")
+        if self.mt5:
+            health = self.mt5.supervisor.stats()
+            print(f"📊 MT5 connection: {health['disconnects']:.0f} disconnects, {health['reconnects']:.0f} reconnects, "
+                  f"{health['reconnect_failures']:.0f} failed attempts, {health['downtime_seconds']:.1f}s down")
         
         # Cleanup resources
         self.cleanup()
@@ -393,8 +641,8 @@ class MT5Worker:
             signal.signal(signal.SIGINT, self.handle_shutdown)
             signal.signal(signal.SIGTERM, self.handle_shutdown)
             
-            # Subscribe to Redis channels
-            self.queue.subscribe(self.handle_message)
+            # Subscribe to Redis channels; ordering per position is left to the scheduler
+            self.queue.subscribe(self.handle_message, key_func=None)
             
             # Run the main async loop
             self.loop.run_until_complete(self.run_async())
@@ -0,0 +1,134 @@
+import asyncio
+import os
+from datetime import datetime
+
+import pytest
+from redis.connection import parse_url
+
+# Stand-ins for the live services; set before anything under src reads them
+os.environ['MT5_BACKEND'] = 'simulator'
+os.environ.setdefault('TV_BROKER_URL', 'papertrading-broker.tradingview.com')
+os.environ.setdefault('TV_ACCOUNT_ID', '123456')
+
+from src.core.interceptor import TradingViewInterceptor
+from src.core.trade_handler import TradeHandler
+from src.models.database import Base
+from src.services.mt5_api import mt5
+from src.services.mt5_service import MT5Service
+from src.utils import queue_handler
+from src.utils.database_handler import DatabaseHandler
+from src.utils.queue_handler import RedisQueue
+
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+    # pip install pytest-benchmark to run the suite
+    collect_ignore_glob = ['test_*.py']
+
+try:
+    import fakeredis
+    import fakeredis.aioredis
+except ImportError:
+    fakeredis = None
+
+INSTRUMENTS = ('EURUSD', 'GBPUSD', 'USDJPY', 'AUDUSD', 'USDCAD', 'USDCHF', 'NZDUSD', 'EURJPY')
+
+
+def trade_row(order_id: str, instrument: str = 'EURUSD', side: str = 'buy') -> dict:
+    """A trade as process_order saves it."""
+    request = {'instrument': instrument, 'qty': '0.1', 'side': side, 'type': 'market',
+               'currentAsk': '1.1001', 'currentBid': '1.1'}
+    return {
+        'trade_id': f"TV_BENCH_{order_id}",
+        'order_id': order_id,
+        'instrument': instrument,
+        'side': side,
+        'quantity': '0.1',
+        'type': 'market',
+        'ask_price': '1.1001',
+        'bid_price': '1.1',
+        'status': 'pending',
+        'tv_request': request,
+        'tv_response': {'s': 'ok', 'd': {'orderId': order_id}},
+        'created_at': datetime.utcnow()
+    }
+
+
+def close_all_positions() -> None:
+    """Flatten the simulated terminal's book."""
+    for position in mt5.positions_get() or ():
+        mt5.order_send({
+            'action': mt5.TRADE_ACTION_DEAL,
+            'position': position.ticket,
+            'symbol': position.symbol,
+            'volume': position.volume,
+            'type': mt5.ORDER_TYPE_SELL if position.type == mt5.POSITION_TYPE_BUY else mt5.ORDER_TYPE_BUY
+        })
+
+
+@pytest.fixture(scope='session')
+def loop():
+    """One event loop for every async hot path, as in the proxy and the worker."""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope='session')
+def db(loop, tmp_path_factory):
+    """sqlite file by default; BENCH_DB_URL points at a scratch Postgres instead."""
+    url = os.getenv('BENCH_DB_URL') or f"sqlite:///{tmp_path_factory.mktemp('db') / 'bench.db'}"
+    handler = DatabaseHandler(db_url=url)
+    Base.metadata.create_all(bind=handler.engine)
+    yield handler
+    handler.cleanup()
+
+
+@pytest.fixture(scope='session')
+def queue(loop):
+    """fakeredis when installed; BENCH_REDIS_URL points at a scratch Redis instead.
+
+    Never falls back to the Redis in .env, which a live worker may be reading.
+    """
+    url = os.getenv('BENCH_REDIS_URL')
+    if url:
+        params = parse_url(url)
+        queue = RedisQueue(host=params.get('host'), port=params.get('port'), db=params.get('db', 0),
+                           key_prefix='bench:')
+        try:
+            queue.redis.ping()
+        except Exception as e:
+            pytest.skip(f"BENCH_REDIS_URL not reachable: {e}")
+    elif fakeredis is None:
+        pytest.skip("pip install fakeredis, or set BENCH_REDIS_URL to a scratch Redis")
+    else:
+        server = fakeredis.FakeServer()
+        with pytest.MonkeyPatch.context() as patch:
+            patch.setattr(queue_handler.redis, 'Redis',
+                          lambda **kwargs: fakeredis.FakeRedis(server=server, decode_responses=True))
+            queue = RedisQueue()
+        queue.async_redis = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+    yield queue
+    queue.cleanup()
+
+
+@pytest.fixture(scope='session')
+def trade_handler(db, queue):
+    return TradeHandler(db=db, queue=queue)
+
+
+@pytest.fixture(scope='session')
+def interceptor(trade_handler):
+    return TradingViewInterceptor(sync_instruments=False, trade_handler=trade_handler)
+
+
+@pytest.fixture(scope='session')
+def mt5_service(loop, db):
+    """MT5Service connected to the simulated terminal."""
+    service = MT5Service(account=1, password='', server='Simulator', db_handler=db)
+    service.set_loop(loop)
+    assert loop.run_until_complete(service.async_initialize())
+    yield service
+    close_all_positions()
+    service.cleanup()
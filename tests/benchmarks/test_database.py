@@ -0,0 +1,108 @@
+import itertools
+import random
+
+import pytest
+
+from tests.benchmarks.conftest import INSTRUMENTS, trade_row
+
+TRADES = 2000
+JOURNAL_BATCH = 50  # trades per apply_journal_batch, each a save plus an update
+
+
+@pytest.fixture(scope='module')
+def seeded(db):
+    """TRADES executed trades, a quarter of them closed and a fifth trailing."""
+    rng = random.Random(7)
+    entries = []
+    for i in range(TRADES):
+        row = trade_row(f"D{i}", INSTRUMENTS[i % len(INSTRUMENTS)], rng.choice(('buy', 'sell')))
+        entries.append(('save', row))
+        entries.append(('update', row['trade_id'], 'executed', {
+            'position_id': f"DP{i}",
+            'mt5_ticket': str(200_000_000 + i),
+            'execution_price': 1.1,
+            'execution_time_ms': rng.randint(20, 400),
+            'is_closed': i % 4 == 0,
+            'trailing_stop_pips': 20 if i % 5 == 0 else None,
+            'latency_trace': {'o': 0, 'w': 0, 'us': {'intercept': 0, 'db_update': rng.randint(20_000, 400_000)}}
+        }, None))
+    db.apply_journal_batch(entries)
+    middle = TRADES // 2
+    return {'trade_id': f"TV_BENCH_D{middle}", 'position_id': f"DP{middle}", 'mt5_ticket': str(200_000_000 + middle)}
+
+
+def test_get_trade(benchmark, db, seeded):
+    assert benchmark(db.get_trade, seeded['trade_id'])
+
+
+def test_get_execution_stats(benchmark, db, seeded):
+    assert benchmark(db.get_execution_stats, 100)['count'] == 100
+
+
+def test_get_latency_traces(benchmark, db, seeded):
+    assert len(benchmark(db.get_latency_traces, 100)) == 100
+
+
+def test_async_get_trade(benchmark, loop, db, seeded):
+    assert benchmark(lambda: loop.run_until_complete(db.async_get_trade(seeded['trade_id'])))
+
+
+def test_async_get_trade_by_position(benchmark, loop, db, seeded):
+    assert benchmark(lambda: loop.run_until_complete(db.async_get_trade_by_position(seeded['position_id'])))
+
+
+def test_async_get_trade_by_mt5_ticket(benchmark, loop, db, seeded):
+    assert benchmark(lambda: loop.run_until_complete(db.async_get_trade_by_mt5_ticket(seeded['mt5_ticket'])))
+
+
+def test_async_get_latest_active_trade(benchmark, loop, db, seeded):
+    assert benchmark(lambda: loop.run_until_complete(db.async_get_latest_active_trade()))
+
+
+def test_async_get_trailing_stops(benchmark, loop, db, seeded):
+    assert benchmark(lambda: loop.run_until_complete(db.async_get_trailing_stops()))
+
+
+@pytest.fixture(scope='module')
+def new_ids():
+    """Fresh order ids so every write benchmark round inserts new rows."""
+    counter = itertools.count()
+    return lambda: f"W{next(counter)}"
+
+
+@pytest.fixture(scope='module')
+def updated(db):
+    """A trade of its own so the update benchmarks leave the seeded rows alone."""
+    row = trade_row('WU')
+    db.save_trade(row)
+    return row['trade_id']
+
+
+def test_save_trade(benchmark, db, new_ids):
+    benchmark(lambda: db.save_trade(trade_row(new_ids())))
+
+
+def test_update_trade_status(benchmark, db, updated):
+    benchmark(db.update_trade_status, updated, 'executed', {'execution_price': 1.1, 'execution_time_ms': 120})
+
+
+def test_apply_journal_batch(benchmark, db, new_ids):
+    def batch():
+        entries = []
+        for _ in range(JOURNAL_BATCH):
+            row = trade_row(new_ids())
+            entries.append(('save', row))
+            entries.append(('update', row['trade_id'], 'executed', {'execution_price': 1.1}, ('pending',)))
+        return db.apply_journal_batch(entries)
+
+    assert benchmark(batch) == []
+
+
+def test_async_save_trade(benchmark, loop, db, new_ids):
+    benchmark(lambda: loop.run_until_complete(db.async_save_trade(trade_row(new_ids()))))
+
+
+def test_async_update_trade_status(benchmark, loop, db, updated):
+    benchmark(lambda: loop.run_until_complete(
+        db.async_update_trade_status(updated, 'executed', {'execution_price': 1.1, 'execution_time_ms': 120})
+    ))
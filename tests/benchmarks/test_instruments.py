@@ -0,0 +1,15 @@
+import pytest
+
+from src.utils.instrument_manager import InstrumentManager
+
+MANAGER = InstrumentManager()
+PAIRS = MANAGER.instruments['instruments']['pairs']
+
+
+@pytest.mark.parametrize('symbol', [
+    PAIRS[0]['name'],    # first entry
+    PAIRS[-1]['name'],   # last entry
+    'NOTASYMBOL'         # falls through to the default
+], ids=['first', 'last', 'unknown'])
+def test_get_pip_size(benchmark, symbol):
+    benchmark(MANAGER.get_pip_size, symbol)
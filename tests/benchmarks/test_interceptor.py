@@ -0,0 +1,104 @@
+import json
+import time
+
+import pytest
+from mitmproxy import http
+from mitmproxy.test import tflow
+
+from src.core.order_context import OrderContext
+from src.utils import json_codec
+from tests.benchmarks.conftest import trade_row
+
+
+def _flow(method: str, url: str) -> http.HTTPFlow:
+    flow = tflow.tflow()
+    flow.request = http.Request.make(method, url)
+    return flow
+
+
+def _traffic(base: str):
+    """A browsing session: mostly chart and asset traffic, a few broker calls."""
+    other = [
+        ('GET', 'https://www.tradingview.com/chart/abc123/'),
+        ('GET', 'https://s3.tradingview.com/charting_library/bundles/app.js'),
+        ('GET', 'https://data.tradingview.com/socket.io/websocket?from=chart'),
+        ('POST', 'https://telemetry.tradingview.com/line-tools-storage/sync'),
+        ('GET', 'https://pine-facade.tradingview.com/pine-facade/list?filter=standard'),
+    ] * 4
+    broker = [
+        ('GET', f"{base}/state?locale=en"),
+        ('POST', f"{base}/orders?locale=en&requestId=1"),
+        ('GET', f"{base}/executions?locale=en&instrument=EURUSD"),
+        ('PUT', f"{base}/positions/9001?locale=en"),
+        ('DELETE', f"{base}/positions/9001?locale=en"),
+        ('DELETE', f"{base}/orders/5001.TP.1700000000000?locale=en"),
+    ]
+    return [_flow(method, url) for method, url in other + broker]
+
+
+def test_should_log_request(benchmark, interceptor):
+    flows = _traffic(f"https://{interceptor.base_path}")
+
+    def classify_all():
+        for flow in flows:
+            # The route is cached per flow; drop it so every call classifies
+            flow.metadata.clear()
+            interceptor.should_log_request(flow)
+
+    benchmark(classify_all)
+    assert sum(interceptor.should_log_request(flow) for flow in flows) == 5
+
+
+def test_process_order(benchmark, loop, trade_handler):
+    counter = iter(range(10_000_000))
+
+    def setup():
+        loop.run_until_complete(trade_handler.journal.drain())
+        trade_handler.pending_orders.clear()
+        order_id = f"O{next(counter)}"
+        request = {'instrument': 'EURUSD', 'qty': '0.1', 'side': 'buy', 'type': 'market',
+                   'currentAsk': '1.1001', 'currentBid': '1.1', 'takeProfit': '1.12', 'stopLoss': '1.08'}
+        response = {'s': 'ok', 'd': {'orderId': order_id}}
+        return (request, response), {}
+
+    def process(request, response):
+        loop.run_until_complete(trade_handler.process_order(request, response))
+
+    benchmark.pedantic(process, setup=setup, rounds=200)
+    loop.run_until_complete(trade_handler.journal.drain())
+
+
+@pytest.mark.parametrize('fills', [100, 1000, 10_000])
+def test_process_execution(benchmark, loop, db, trade_handler, fills):
+    """An /executions poll with `fills` entries of history and one new fill, decoded as the response hook does."""
+    now_ms = int(time.time() * 1000)
+    # History inside the cursor's grace window, so none of it is skipped unread
+    history = [
+        {'id': f"H{i}", 'instrument': 'EURUSD', 'orderId': f"H{i}", 'positionId': f"P{i}",
+         'price': 1.1, 'qty': 0.1, 'side': 'buy', 'time': now_ms - 5 * i}
+        for i in range(1, fills + 1)
+    ]
+    counter = iter(range(10_000_000))
+    trade_handler.pending_orders.clear()
+
+    def setup():
+        loop.run_until_complete(trade_handler.journal.drain())
+        round_id = next(counter)
+        order_id = f"X{fills}_{round_id}"
+        row = trade_row(order_id)
+        db.save_trade(row)
+        trade_handler.pending_orders[order_id] = OrderContext(
+            trade_id=row['trade_id'], order_id=order_id, instrument='EURUSD', side='buy',
+            qty='0.1', type='market', intercepted_at=time.perf_counter()
+        )
+        fill = {'id': f"E{order_id}", 'instrument': 'EURUSD', 'orderId': order_id, 'positionId': f"P{order_id}",
+                'price': 1.1, 'qty': 0.1, 'side': 'buy', 'time': now_ms + round_id}
+        return (json.dumps({'s': 'ok', 'd': [fill] + history}).encode(),), {}
+
+    async def poll(content):
+        response = json_codec.decode_executions(content, trade_handler.pending_orders)
+        await trade_handler.process_execution(response, 'EURUSD')
+
+    benchmark.pedantic(lambda content: loop.run_until_complete(poll(content)), setup=setup, rounds=50)
+    loop.run_until_complete(trade_handler.journal.drain())
+    assert not trade_handler.pending_orders
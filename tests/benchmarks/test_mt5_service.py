@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from src.services.mt5_api import mt5
+from src.services.position_snapshot import PositionSnapshotService
+from src.services.trailing_engine import TrailingStopEngine
+from tests.benchmarks.conftest import INSTRUMENTS, close_all_positions
+
+
+def test_execute_order(benchmark, mt5_service):
+    trade = {
+        'instrument': 'EURUSD',
+        'side': 'buy',
+        'qty': '0.1',
+        'execution_data': {'positionId': '987654321'}
+    }
+    # Warm the symbol cache and order template, as the prepare hint does before a fill
+    mt5_service._execute_order(trade)
+
+    result = benchmark(mt5_service._execute_order, trade)
+    assert 'error' not in result
+    close_all_positions()
+
+
+@pytest.mark.parametrize('positions', [10, 100, 1000])
+def test_trailing_cycle(benchmark, loop, mt5_service, positions):
+    """One TrailingStopEngine cycle over `positions` trailing positions spread across the instruments."""
+    close_all_positions()
+    tickets = {}
+    for i in range(positions):
+        instrument = INSTRUMENTS[i % len(INSTRUMENTS)]
+        result = mt5_service._execute_order({'instrument': instrument, 'side': 'buy' if i % 2 else 'sell', 'qty': '0.1'})
+        tickets[result['mt5_ticket']] = 20.0
+    mt5_service.trailing_stops.load(tickets)
+
+    snapshots = PositionSnapshotService(mt5_service)
+    engine = TrailingStopEngine(mt5_service, snapshots)
+
+    def setup():
+        # Let the previous cycle's modifications land and show up in the book
+        loop.run_until_complete(asyncio.gather(*engine._tasks.values()))
+        loop.run_until_complete(snapshots.poll_once())
+        return (), {}
+
+    benchmark.pedantic(lambda: loop.run_until_complete(engine.run_cycle()), setup=setup, rounds=50)
+    loop.run_until_complete(asyncio.gather(*engine._tasks.values()))
+    assert engine.modifications >= positions
+    assert all(position.sl for position in mt5.positions_get())
+
+    mt5_service.trailing_stops.load({})
+    close_all_positions()
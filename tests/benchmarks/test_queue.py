@@ -0,0 +1,37 @@
+from src.utils.queue_handler import RedisQueue
+from src.utils.tracing import TraceContext
+
+
+def _fill_message() -> dict:
+    """What process_execution publishes for a fill."""
+    trace = TraceContext.start()
+    for stage in ('order_response', 'execution_seen', 'db_write'):
+        trace.mark(stage)
+    return {
+        'trade_id': 'TV_20240101_120000_123456789',
+        'execution_data': {'id': 'E1', 'instrument': 'EURUSD', 'orderId': '123456789', 'positionId': '987654321',
+                           'price': 1.10012, 'qty': 0.1, 'side': 'buy', 'time': 1704110400000},
+        'position_id': '987654321',
+        'instrument': 'EURUSD',
+        'side': 'buy',
+        'qty': '0.1',
+        'type': 'market',
+        'take_profit': 1.12,
+        'stop_loss': 1.08,
+        'trace': trace.to_wire()
+    }
+
+
+def test_trade_message_serialisation(benchmark):
+    message = _fill_message()
+    benchmark(RedisQueue._trade_message, message)
+
+
+def test_push_trade(benchmark, queue):
+    message = _fill_message()
+    benchmark(queue.push_trade, message)
+
+
+def test_async_push_trade(benchmark, loop, queue):
+    message = _fill_message()
+    benchmark(lambda: loop.run_until_complete(queue.async_push_trade(message)))
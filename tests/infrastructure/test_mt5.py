@@ -2,9 +2,8 @@
 import asyncio
 import logging
 
-import MetaTrader5 as mt5
-
 from src.config.mt5_config import MT5_CONFIG
+from src.services.mt5_api import mt5
 from src.services.mt5_service import MT5Service
 
 logging.basicConfig(level=logging.INFO)
@@ -0,0 +1,9 @@
+import os
+
+# Unit tests never touch a live terminal; set before anything under src imports mt5_api
+os.environ['MT5_BACKEND'] = 'simulator'
+os.environ.setdefault('MT5_ACCOUNT', '1')
+os.environ.setdefault('MT5_PASSWORD', 'unit')
+os.environ.setdefault('MT5_SERVER', 'Simulator')
+os.environ.setdefault('TV_BROKER_URL', 'papertrading-broker.tradingview.com')
+os.environ.setdefault('TV_ACCOUNT_ID', '123456')
@@ -0,0 +1,135 @@
+import asyncio
+import threading
+
+from src.utils.dispatcher import MessageDispatcher, trade_message_key
+
+
+def trade(position_id=None, **fields) -> dict:
+    data = dict(fields)
+    if position_id:
+        data['position_id'] = position_id
+    return {'data': data}
+
+
+def test_trade_message_key_prefers_position_then_ticket_then_symbol():
+    assert trade_message_key('trade', trade('P1', mt5_ticket=5, instrument='EURUSD')) == ('position', 'P1')
+    assert trade_message_key('trade', {'data': {'execution_data': {'positionId': 7}}}) == ('position', '7')
+    assert trade_message_key('trade', trade(mt5_ticket=5, instrument='EURUSD')) == ('ticket', '5')
+    assert trade_message_key('trade', trade(instrument='EURUSD')) == ('symbol', 'EURUSD')
+    assert trade_message_key('trade', trade()) is None
+    assert trade_message_key('status', trade('P1')) is None
+
+
+async def dispatch(callback, messages, concurrency=4):
+    """Feed messages through a dispatcher; returns the on_done outcomes in completion order."""
+    loop = asyncio.get_running_loop()
+    dispatcher = MessageDispatcher(callback, loop, concurrency=concurrency, max_queue=100)
+    dispatcher.start()
+    outcomes = []
+    finished = asyncio.Event()
+
+    def on_done_for(name):
+        async def on_done(success):
+            outcomes.append((name, success))
+            if len(outcomes) == len(messages):
+                finished.set()
+        return on_done
+
+    for name, data in messages:
+        await dispatcher._queue.put(('trade', data, on_done_for(name)))
+    await asyncio.wait_for(finished.wait(), 2)
+    await dispatcher.stop()
+    return outcomes
+
+
+def test_same_key_messages_run_in_arrival_order():
+    order = []
+
+    async def callback(msg_type, data):
+        order.append(('start', data['data']['n']))
+        await asyncio.sleep(0.01 if data['data']['n'] == 0 else 0)
+        order.append(('end', data['data']['n']))
+
+    messages = [(n, trade('P1', n=n)) for n in range(3)]
+    asyncio.run(dispatch(callback, messages))
+    assert order == [('start', 0), ('end', 0), ('start', 1), ('end', 1), ('start', 2), ('end', 2)]
+
+
+def test_different_keys_run_concurrently():
+    release = None
+    started = []
+
+    async def callback(msg_type, data):
+        started.append(data['data']['position_id'])
+        if data['data']['position_id'] == 'P1':
+            await release.wait()
+        else:
+            release.set()
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        return await dispatch(callback, [('slow', trade('P1')), ('fast', trade('P2'))])
+
+    # P1 only finishes because P2 ran while it was waiting
+    assert [name for name, _ in asyncio.run(scenario())] == ['fast', 'slow']
+
+
+def test_handler_failure_is_reported_to_on_done():
+    async def callback(msg_type, data):
+        if data['data']['n'] == 1:
+            raise RuntimeError("MT5 rejected the order")
+
+    outcomes = asyncio.run(dispatch(callback, [(n, trade(f"P{n}", n=n)) for n in range(3)]))
+    assert sorted(outcomes) == [(0, True), (1, False), (2, True)]
+
+
+def test_handed_off_job_is_settled_when_it_finishes_without_blocking_intake():
+    jobs = {}
+
+    async def callback(msg_type, data):
+        name = data['data']['name']
+        jobs[name] = asyncio.get_running_loop().create_future()
+        if name == 'quick':
+            jobs[name].set_result(None)
+        return jobs[name]
+
+    async def scenario():
+        async def fail_later():
+            while 'stuck' not in jobs:
+                await asyncio.sleep(0)
+            await asyncio.sleep(0.01)
+            jobs['stuck'].set_exception(RuntimeError("order_send failed"))
+
+        failing = asyncio.get_running_loop().create_task(fail_later())
+        # One executor task: 'quick' settles while 'stuck' is still running
+        outcomes = await dispatch(callback, [('stuck', trade('P1', name='stuck')),
+                                             ('quick', trade('P2', name='quick'))], concurrency=1)
+        await failing
+        return outcomes
+
+    assert asyncio.run(scenario()) == [('quick', True), ('stuck', False)]
+
+
+def test_submit_threadsafe_delivers_from_another_thread():
+    async def scenario():
+        received = []
+        done = asyncio.Event()
+
+        async def callback(msg_type, data):
+            received.append(data['data']['n'])
+            if len(received) == 3:
+                done.set()
+
+        dispatcher = MessageDispatcher(callback, asyncio.get_running_loop(), concurrency=2)
+        dispatcher.start()
+        producer = threading.Thread(
+            target=lambda: [dispatcher.submit_threadsafe('trade', trade('P1', n=n)) for n in range(3)]
+        )
+        producer.start()
+        await asyncio.wait_for(done.wait(), 2)
+        producer.join()
+        await dispatcher.stop()
+        return received
+
+    assert asyncio.run(scenario()) == [0, 1, 2]
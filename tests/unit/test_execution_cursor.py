@@ -0,0 +1,62 @@
+from src.core.execution_cursor import ExecutionCursor
+
+
+def fill(fill_id: str, time: int, order_id: str = 'O1') -> dict:
+    return {'id': fill_id, 'orderId': order_id, 'time': time}
+
+
+def test_first_poll_returns_everything_oldest_first():
+    cursor = ExecutionCursor(grace_ms=1000)
+    history = [fill('c', 3000), fill('b', 2000), fill('a', 1000)]
+    assert [e['id'] for e in cursor.new_executions('EURUSD', history)] == ['a', 'b', 'c']
+
+
+def test_ascending_history_is_also_returned_oldest_first():
+    cursor = ExecutionCursor(grace_ms=1000)
+    history = [fill('a', 1000), fill('b', 2000), fill('c', 3000)]
+    assert [e['id'] for e in cursor.new_executions('EURUSD', history)] == ['a', 'b', 'c']
+
+
+def test_consumed_fills_are_not_returned_again():
+    cursor = ExecutionCursor(grace_ms=10_000)
+    history = [fill('b', 2000), fill('a', 1000)]
+    cursor.new_executions('EURUSD', history)
+    cursor.consume('EURUSD', history[1])
+    assert [e['id'] for e in cursor.new_executions('EURUSD', history)] == ['b']
+
+
+def test_unconsumed_fills_inside_the_grace_window_are_offered_again():
+    cursor = ExecutionCursor(grace_ms=10_000)
+    history = [fill('a', 1000)]
+    assert cursor.new_executions('EURUSD', history) == history
+    # A fill polled before its order was registered must still be seen later
+    assert cursor.new_executions('EURUSD', history) == history
+
+
+def test_history_behind_the_grace_window_is_skipped():
+    cursor = ExecutionCursor(grace_ms=1000)
+    history = [fill('c', 10_000), fill('b', 9500), fill('a', 1000)]
+    assert [e['id'] for e in cursor.new_executions('EURUSD', history)] == ['a', 'b', 'c']
+    # The cursor is now at 10s, so the unconsumed fill at 1s is no longer offered
+    assert [e['id'] for e in cursor.new_executions('EURUSD', history)] == ['b', 'c']
+
+
+def test_late_fill_inside_the_grace_window_is_returned():
+    cursor = ExecutionCursor(grace_ms=1000)
+    cursor.new_executions('EURUSD', [fill('b', 5000)])
+    history = [fill('b', 5000), fill('late', 4500)]
+    assert [e['id'] for e in cursor.new_executions('EURUSD', history)] == ['late', 'b']
+
+
+def test_instruments_have_independent_cursors():
+    cursor = ExecutionCursor(grace_ms=1000)
+    cursor.new_executions('EURUSD', [fill('a', 100_000)])
+    assert [e['id'] for e in cursor.new_executions('GBPUSD', [fill('g', 1000)])] == ['g']
+
+
+def test_fills_without_an_id_are_keyed_by_order_and_time():
+    cursor = ExecutionCursor(grace_ms=10_000)
+    first = {'orderId': 'O1', 'time': 1000}
+    second = {'orderId': 'O2', 'time': 1000}
+    cursor.consume('EURUSD', first)
+    assert cursor.new_executions('EURUSD', [second, first]) == [second]
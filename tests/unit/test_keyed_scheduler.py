@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from src.workers.keyed_scheduler import KeyedScheduler
+
+
+def test_jobs_for_one_key_run_fifo_one_at_a_time():
+    events = []
+
+    async def job(n, delay):
+        events.append(('start', n))
+        await asyncio.sleep(delay)
+        events.append(('end', n))
+        return n
+
+    async def scenario():
+        scheduler = KeyedScheduler(max_concurrency=8)
+        futures = [scheduler.submit('P1', job, n, delay) for n, delay in enumerate((0.02, 0, 0.01))]
+        return await asyncio.gather(*futures)
+
+    assert asyncio.run(scenario()) == [0, 1, 2]
+    assert events == [('start', 0), ('end', 0), ('start', 1), ('end', 1), ('start', 2), ('end', 2)]
+
+
+def test_different_keys_run_concurrently():
+    async def scenario():
+        scheduler = KeyedScheduler(max_concurrency=8)
+        release = asyncio.Event()
+
+        async def wait_for_release():
+            await release.wait()
+            return 'slow'
+
+        async def unblock():
+            release.set()
+            return 'fast'
+
+        slow = scheduler.submit('P1', wait_for_release)
+        fast = scheduler.submit('P2', unblock)
+        return await asyncio.wait_for(asyncio.gather(slow, fast), 1)
+
+    assert asyncio.run(scenario()) == ['slow', 'fast']
+
+
+def test_max_concurrency_caps_jobs_across_keys():
+    peak = 0
+
+    async def job(scheduler):
+        nonlocal peak
+        peak = max(peak, scheduler.running)
+        await asyncio.sleep(0.005)
+
+    async def scenario():
+        scheduler = KeyedScheduler(max_concurrency=2)
+        await asyncio.gather(*(scheduler.submit(f"P{n}", job, scheduler) for n in range(6)))
+
+    asyncio.run(scenario())
+    assert peak == 2
+
+
+def test_submit_returns_before_the_job_runs():
+    started = []
+
+    async def job():
+        started.append(True)
+
+    async def scenario():
+        scheduler = KeyedScheduler()
+        future = scheduler.submit('P1', job)
+        queued = (list(started), scheduler.depth('P1'))
+        await future
+        return queued
+
+    assert asyncio.run(scenario()) == ([], 1)
+    assert started == [True]
+
+
+def test_a_failing_job_does_not_stop_the_jobs_behind_it():
+    async def fail():
+        raise RuntimeError("order_send failed")
+
+    async def succeed():
+        return 'ok'
+
+    async def scenario():
+        scheduler = KeyedScheduler()
+        failed = scheduler.submit('P1', fail)
+        after = scheduler.submit('P1', succeed)
+        with pytest.raises(RuntimeError):
+            await failed
+        result = await after
+        return result, scheduler.stats()['keys']['P1']
+
+    result, stats = asyncio.run(scenario())
+    assert result == 'ok'
+    assert (stats['completed'], stats['failed']) == (1, 1)
+
+
+def test_cancelled_jobs_are_skipped_and_idle_keys_are_released():
+    ran = []
+
+    async def job(n):
+        ran.append(n)
+
+    async def scenario():
+        scheduler = KeyedScheduler()
+        first = scheduler.submit('P1', job, 0)
+        cancelled = scheduler.submit('P1', job, 1)
+        last = scheduler.submit('P1', job, 2)
+        cancelled.cancel()
+        await asyncio.gather(first, last)
+        await asyncio.sleep(0)
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert ran == [0, 2]
+    assert (stats['active_keys'], stats['queued'], stats['running']) == (0, 0, 0)
+
+
+def test_run_awaits_the_result():
+    async def job(a, b):
+        return a + b
+
+    async def scenario():
+        return await KeyedScheduler().run('P1', job, 2, 3)
+
+    assert asyncio.run(scenario()) == 5
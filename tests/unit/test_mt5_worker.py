@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from src.workers.mt5_worker import MT5Worker
+
+
+class FakeMT5:
+    def __init__(self):
+        self.orders = []
+
+    async def async_execute_market_order(self, trade_data, trace=None):
+        self.orders.append(trade_data['trade_id'])
+        return {'mt5_ticket': 500 + len(self.orders), 'symbol': 'EURUSD', 'volume': 0.1, 'price': 1.1}
+
+
+class FakeDB:
+    """Trade rows by id; `fail_updates` makes that many status updates raise."""
+
+    def __init__(self):
+        self.rows = {}
+        self.fail_updates = 0
+
+    async def async_update_trade_status(self, trade_id, status, update_data):
+        if self.fail_updates:
+            self.fail_updates -= 1
+            raise ConnectionError("database went away")
+        self.rows.setdefault(trade_id, {}).update(status=status, **update_data)
+
+    async def async_get_trade(self, trade_id):
+        row = self.rows.get(trade_id)
+        return {'trade_id': trade_id, **row} if row is not None else None
+
+
+class FakePositions:
+    def request_poll(self):
+        pass
+
+
+def worker_with_fakes():
+    worker = MT5Worker()
+    worker.mt5 = FakeMT5()
+    worker.db = FakeDB()
+    worker.positions = FakePositions()
+    return worker
+
+
+def open_message(trade_id='TV_1', **fields):
+    return {'trade_id': trade_id, 'instrument': 'EURUSD', 'execution_data': {'positionId': 'P1', 'side': 'buy'}, **fields}
+
+
+def test_redelivery_after_a_failed_status_write_records_the_fill_without_reopening():
+    worker = worker_with_fakes()
+    worker.db.fail_updates = 1
+
+    async def scenario():
+        with pytest.raises(ConnectionError):
+            await worker._process_trade(open_message())
+        # The entry stayed pending; XAUTOCLAIM hands it back
+        await worker._process_trade(open_message(redelivered=True))
+
+    asyncio.run(scenario())
+    assert worker.mt5.orders == ['TV_1']
+    assert worker.db.rows['TV_1']['status'] == 'completed'
+    assert worker.db.rows['TV_1']['mt5_ticket'] == 501
+    assert worker._unrecorded_opens == {}
+
+
+def test_failed_status_write_after_a_fill_is_not_recorded_as_failed():
+    worker = worker_with_fakes()
+    worker.db.fail_updates = 1
+
+    async def scenario():
+        with pytest.raises(ConnectionError):
+            await worker._process_trade(open_message())
+
+    asyncio.run(scenario())
+    assert 'TV_1' not in worker.db.rows  # the position is open, so no 'failed' row
+    assert 'TV_1' in worker._unrecorded_opens
+
+
+def test_redelivered_open_already_recorded_is_skipped():
+    worker = worker_with_fakes()
+
+    async def scenario():
+        await worker._process_trade(open_message())
+        # Filled and recorded, but the ack was lost
+        await worker._process_trade(open_message(redelivered=True))
+
+    asyncio.run(scenario())
+    assert worker.mt5.orders == ['TV_1']
+
+
+def test_redelivered_open_that_never_filled_is_opened():
+    worker = worker_with_fakes()
+    asyncio.run(worker._process_trade(open_message(redelivered=True)))
+    assert worker.mt5.orders == ['TV_1']
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from src.services.position_snapshot import PositionEventType, diff_snapshots
+from src.workers.mt5_worker import MT5Worker
+
+
+def position(ticket: int, volume: float = 0.1, sl: float = 0.0, tp: float = 0.0):
+    return SimpleNamespace(ticket=ticket, volume=volume, sl=sl, tp=tp, type=0, symbol='EURUSD')
+
+
+def events_by_ticket(previous, current):
+    return {(event.type, event.ticket) for event in diff_snapshots(previous, current)}
+
+
+def test_diff_reports_opened_and_closed_positions():
+    previous = {'1': position(1)}
+    current = {'2': position(2)}
+    assert events_by_ticket(previous, current) == {
+        (PositionEventType.CLOSED, '1'),
+        (PositionEventType.OPENED, '2')
+    }
+
+
+def test_diff_reports_volume_and_sl_tp_changes():
+    previous = {'1': position(1), '2': position(2), '3': position(3)}
+    current = {'1': position(1, volume=0.05), '2': position(2, sl=1.09), '3': position(3)}
+    assert events_by_ticket(previous, current) == {
+        (PositionEventType.VOLUME_CHANGED, '1'),
+        (PositionEventType.MODIFIED, '2')
+    }
+
+
+def test_closed_event_carries_the_last_seen_position():
+    before = position(1, volume=0.3)
+    [event] = diff_snapshots({'1': before}, {})
+    assert event.position is before and event.previous is before
+
+
+def test_identical_snapshots_produce_no_events():
+    snapshot = {'1': position(1)}
+    assert diff_snapshots(snapshot, dict(snapshot)) == []
+
+
+class RecordingScheduler:
+    def __init__(self):
+        self.keys = []
+
+    async def run(self, key, func, *args):
+        self.keys.append((key, args))
+
+
+def test_close_is_scheduled_on_the_tv_position_key():
+    async def scenario():
+        worker = MT5Worker()
+        worker.loop = asyncio.get_running_loop()
+        worker.scheduler = RecordingScheduler()
+        worker.open_positions = {'100', '200'}
+        worker.ticket_positions = {'100': 'P1'}
+
+        events = diff_snapshots({'100': position(100), '200': position(200)}, {'200': position(200)})
+        await worker.check_mt5_positions({'200': position(200)}, events, time.monotonic())
+        await asyncio.gather(*worker._close_tasks)
+        return worker
+
+    worker = asyncio.run(scenario())
+    # Serialized behind any other work for the same TV position, not just the ticket
+    assert worker.scheduler.keys == [(('position', 'P1'), ('100',))]
+    assert worker.ticket_positions == {}
+    assert worker.open_positions == {'200'}
+
+
+def test_position_opened_and_closed_between_polls_is_still_closed():
+    async def scenario():
+        worker = MT5Worker()
+        worker.loop = asyncio.get_running_loop()
+        worker.scheduler = RecordingScheduler()
+        worker.open_positions = {'300'}
+        worker.ticket_positions = {'300': 'P3'}
+        worker._unconfirmed_opens = {'300': time.monotonic()}
+
+        await worker.check_mt5_positions({}, [], time.monotonic())
+        await asyncio.gather(*worker._close_tasks)
+        return worker
+
+    worker = asyncio.run(scenario())
+    assert worker.scheduler.keys == [(('position', 'P3'), ('300',))]
+    assert worker._unconfirmed_opens == {}
@@ -0,0 +1,152 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.services import sl_coalescer
+from src.services.mt5_api import mt5
+from src.services.sl_coalescer import StopLossCoalescer
+
+POSITION_CLOSED = 10036
+REQUOTE = 10004
+DIGITS = 5
+
+
+class FakeSymbols:
+    """Stands in for SymbolMetadataCache with one 5-digit symbol."""
+
+    def get(self, symbol):
+        return SimpleNamespace(digits=DIGITS, point=10 ** -DIGITS)
+
+
+SYMBOLS = FakeSymbols()
+
+
+class FakeTerminal:
+    """Applies SL modifications to an in-memory book; `gate` holds order_send until set."""
+
+    def __init__(self, tickets):
+        self.book = {ticket: SimpleNamespace(ticket=ticket, sl=0.0) for ticket in tickets}
+        self.sent = []
+        self.reads = 0
+        self.retcode = None  # forced retcode for every order_send
+        self.fail_reads = 0
+        self.gate = None
+
+    async def run(self, priority, name, func, *args):
+        if self.gate is not None and name == 'sl_modify':
+            await self.gate.wait()
+        await asyncio.sleep(0)
+        return func(*args)
+
+    def order_send(self, request, label):
+        self.sent.append((request['position'], request['sl']))
+        if self.retcode is not None:
+            return SimpleNamespace(retcode=self.retcode, comment='forced')
+        position = self.book.get(request['position'])
+        if position is None:
+            return SimpleNamespace(retcode=POSITION_CLOSED, comment='Position closed')
+        # Brokers keep stops at the symbol's digits
+        position.sl = round(request['sl'], DIGITS)
+        return SimpleNamespace(retcode=mt5.TRADE_RETCODE_DONE, comment='Done')
+
+    def positions_get(self):
+        self.reads += 1
+        if self.fail_reads:
+            self.fail_reads -= 1
+            return None
+        return list(self.book.values())
+
+
+@pytest.fixture
+def terminal(monkeypatch):
+    terminal = FakeTerminal((1, 2, 3))
+    monkeypatch.setattr(sl_coalescer, 'MT5_EXECUTOR', terminal)
+    monkeypatch.setattr(sl_coalescer, 'timed_order_send', terminal.order_send)
+    monkeypatch.setattr(sl_coalescer.mt5, 'positions_get', terminal.positions_get)
+    return terminal
+
+
+def test_target_is_applied_and_verified(terminal):
+    async def scenario():
+        coalescer = StopLossCoalescer(SYMBOLS, verify_delay=0)
+        return await coalescer.submit(1, 1.095, None, 'EURUSD'), coalescer.pending
+
+    assert asyncio.run(scenario()) == (True, set())
+    assert terminal.sent == [(1, 1.095)]
+    assert terminal.book[1].sl == 1.095
+
+
+def test_only_the_latest_queued_target_is_sent(terminal):
+    async def scenario():
+        coalescer = StopLossCoalescer(SYMBOLS, verify_delay=0)
+        stale = [coalescer.submit(1, sl, None, 'EURUSD') for sl in (1.091, 1.092)]
+        latest = coalescer.submit(1, 1.093, None, 'EURUSD')
+        return await asyncio.gather(*stale, latest), coalescer.superseded
+
+    assert asyncio.run(scenario()) == ([False, False, True], 2)
+    assert terminal.sent == [(1, 1.093)]
+
+
+def test_target_superseded_in_flight_moves_straight_to_the_new_one(terminal):
+    async def scenario():
+        terminal.gate = asyncio.Event()
+        coalescer = StopLossCoalescer(SYMBOLS, verify_delay=0)
+        first = coalescer.submit(1, 1.091, None, 'EURUSD')
+        await asyncio.sleep(0)  # the driver is now waiting in order_send
+        second = coalescer.submit(1, 1.092, None, 'EURUSD')
+        terminal.gate.set()
+        return await asyncio.gather(first, second)
+
+    assert asyncio.run(scenario()) == [False, True]
+    assert terminal.sent == [(1, 1.091), (1, 1.092)]
+    assert terminal.book[1].sl == 1.092
+
+
+def test_tickets_share_one_verify_read(terminal):
+    async def scenario():
+        coalescer = StopLossCoalescer(SYMBOLS, verify_delay=0.01)
+        return await asyncio.gather(*(coalescer.submit(t, 1.09 + t / 1000, None, 'EURUSD') for t in (1, 2, 3)))
+
+    assert asyncio.run(scenario()) == [True, True, True]
+    assert terminal.reads == 1
+
+
+def test_closed_position_is_not_retried(terminal):
+    async def scenario():
+        coalescer = StopLossCoalescer(SYMBOLS, verify_delay=0)
+        return await coalescer.submit(99, 1.09, None, 'EURUSD')
+
+    assert asyncio.run(scenario()) is False
+    assert terminal.sent == [(99, 1.09)]
+
+
+def test_rejected_modification_is_retried_then_given_up(terminal):
+    terminal.retcode = REQUOTE
+
+    async def scenario():
+        coalescer = StopLossCoalescer(SYMBOLS, max_attempts=2, verify_delay=0)
+        return await coalescer.submit(1, 1.09, None, 'EURUSD'), coalescer.pending
+
+    assert asyncio.run(scenario()) == (False, set())
+    assert terminal.sent == [(1, 1.09), (1, 1.09)]
+
+
+def test_failed_read_back_is_retried(terminal):
+    terminal.fail_reads = 1
+
+    async def scenario():
+        coalescer = StopLossCoalescer(SYMBOLS, verify_delay=0)
+        return await coalescer.submit(1, 1.09, None, 'EURUSD')
+
+    assert asyncio.run(scenario()) is True
+    assert (len(terminal.sent), terminal.reads) == (2, 2)
+
+
+def test_unrounded_target_is_sent_at_symbol_digits_and_verifies_first_time(terminal):
+    async def scenario():
+        coalescer = StopLossCoalescer(SYMBOLS, verify_delay=0)
+        return await coalescer.submit(1, 1.234567, None, 'EURUSD')
+
+    assert asyncio.run(scenario()) is True
+    assert terminal.sent == [(1, 1.23457)]
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.utils.write_behind import JournalWriteError, WriteBehindJournal
+
+
+class FakeDB:
+    """Records applied entries; `fail` maps a trade_id to how many more attempts should fail."""
+
+    def __init__(self):
+        self.applied = []
+        self.batches = []
+        self.fail = {}
+        self.gate = None  # threading.Event that holds the writer thread when set
+
+    @staticmethod
+    def _trade_id(entry):
+        return entry[1]['trade_id'] if entry[0] == 'save' else entry[1]
+
+    def apply_journal_batch(self, entries):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.batches.append(list(entries))
+        failed = []
+        for entry in entries:
+            trade_id = self._trade_id(entry)
+            if self.fail.get(trade_id, 0) > 0:
+                self.fail[trade_id] -= 1
+                failed.append(entry)
+            else:
+                self.applied.append((entry[0], trade_id))
+        return failed
+
+
+def row(trade_id: str) -> dict:
+    return {'trade_id': trade_id}
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_writes_are_applied_in_enqueue_order():
+    db = FakeDB()
+    journal = WriteBehindJournal(db, batch_size=3, retry_delay=0)
+
+    async def scenario():
+        for i in range(5):
+            await journal.save_trade(row(f"T{i}"))
+            await journal.update_trade_status(f"T{i}", 'executed', {})
+        await journal.drain()
+
+    run(scenario())
+    expected = []
+    for i in range(5):
+        expected += [('save', f"T{i}"), ('update', f"T{i}")]
+    assert db.applied == expected
+    assert all(len(batch) <= 3 for batch in db.batches)
+
+
+def test_wait_saved_returns_once_the_row_is_written():
+    db = FakeDB()
+    journal = WriteBehindJournal(db, retry_delay=0)
+
+    async def scenario():
+        await journal.save_trade(row('T1'))
+        await asyncio.wait_for(journal.wait_saved('T1'), 1)
+        return list(db.applied)
+
+    assert run(scenario()) == [('save', 'T1')]
+
+
+def test_failed_entries_are_retried_before_the_next_batch():
+    db = FakeDB()
+    db.fail['T1'] = 2
+    journal = WriteBehindJournal(db, batch_size=1, max_retries=3, retry_delay=0)
+
+    async def scenario():
+        await journal.save_trade(row('T1'))
+        await journal.save_trade(row('T2'))
+        await journal.wait_saved('T1')
+        await journal.drain()
+
+    run(scenario())
+    assert db.applied == [('save', 'T1'), ('save', 'T2')]
+    assert [len(batch) for batch in db.batches] == [1, 1, 1, 1]
+
+
+def test_given_up_insert_raises_from_wait_saved_and_drops_its_updates():
+    db = FakeDB()
+    db.fail['T1'] = 100
+    journal = WriteBehindJournal(db, batch_size=1, max_retries=2, retry_delay=0)
+
+    async def scenario():
+        await journal.save_trade(row('T1'))
+        await journal.update_trade_status('T1', 'executed', {})
+        await journal.save_trade(row('T2'))
+        with pytest.raises(JournalWriteError):
+            await asyncio.wait_for(journal.wait_saved('T1'), 1)
+        await journal.wait_saved('T2')
+        await journal.drain()
+
+    run(scenario())
+    assert db.applied == [('save', 'T2')]
+    # An update queued behind a rejected insert is never sent
+    assert not any(entry[0] == 'update' for batch in db.batches for entry in batch)
+
+
+def test_exception_from_the_database_is_retried():
+    class FlakyDB(FakeDB):
+        calls = 0
+
+        def apply_journal_batch(self, entries):
+            self.calls += 1
+            if self.calls == 1:
+                raise ConnectionError("database went away")
+            return super().apply_journal_batch(entries)
+
+    db = FlakyDB()
+    journal = WriteBehindJournal(db, retry_delay=0)
+
+    async def scenario():
+        await journal.save_trade(row('T1'))
+        await journal.wait_saved('T1')
+
+    run(scenario())
+    assert db.applied == [('save', 'T1')]
+
+
+def test_flush_sync_keeps_the_in_flight_batch_and_the_queue():
+    db = FakeDB()
+    db.gate = threading.Event()
+    db.fail['T1'] = 1  # fails in the running batch, so shutdown must write it again
+    journal = WriteBehindJournal(db, batch_size=1, retry_delay=60)
+
+    async def scenario():
+        await journal.save_trade(row('T1'))
+        await journal.save_trade(row('T2'))
+        while journal._in_flight is None:
+            await asyncio.sleep(0)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(scenario())
+        db.gate.set()
+        journal.flush_sync()
+        loop.run_until_complete(asyncio.sleep(0))  # let the cancelled flusher finish
+    finally:
+        loop.close()
+    assert db.applied == [('save', 'T1'), ('save', 'T2')]